@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.corpus import generate_queries
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# Libraries each query encoder backend imports when it is loaded
+BACKEND_MODULES = {
+    "sentence_transformers": ["sentence_transformers"],
+    "torch": ["torch", "transformers"],
+    "torch_int8": ["torch", "transformers"],
+    "onnx_int8": ["onnxruntime", "transformers"],
+}
+
+# Loads one backend in a fresh interpreter and reports import and load time, memory, encode latency and parity
+_PROBE = """
+import importlib, json, os, sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+for module in {modules!r}:
+    importlib.import_module(module)
+import_s = time.perf_counter() - start
+
+import numpy as np
+from query_encoder import load_query_encoder, encoder_parity
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return float("nan")
+
+start = time.perf_counter()
+encoder = load_query_encoder({model!r}, {backend!r}, {onnx_dir!r})
+load_s = time.perf_counter() - start
+
+queries = {queries!r}
+for query in queries[:5]:
+    encoder.encode([query])
+latencies = []
+for query in queries:
+    start = time.perf_counter()
+    encoder.encode([query])
+    latencies.append((time.perf_counter() - start) * 1000.0)
+start = time.perf_counter()
+encoder.encode(queries, batch_size=32)
+batch_qps = len(queries) / (time.perf_counter() - start)
+
+parity = None
+if {index_path!r}:
+    import faiss
+    import pandas as pd
+    from metadata_store import MetadataStore, metadata_store_path
+    index = faiss.read_index({index_path!r})
+    store_path = metadata_store_path({metadata_path!r})
+    metadata = MetadataStore.open(store_path) if os.path.exists(store_path) else MetadataStore.from_frame(pd.read_csv({metadata_path!r}))
+    parity = encoder_parity(encoder, index, metadata, {parity_sample!r})
+
+print(json.dumps({{
+    "import_s": import_s,
+    "load_s": load_s,
+    "ready_s": import_s + load_s,
+    "encode_p50_ms": float(np.percentile(latencies, 50)),
+    "encode_p99_ms": float(np.percentile(latencies, 99)),
+    "batch_qps": batch_qps,
+    "rss_mb": rss_mb(),
+    "parity": parity,
+}}))
+"""
+
+def probe(backend: str, args, queries: list) -> dict:
+    """
+    Measure one backend in a subprocess, so that each measurement imports its libraries from scratch.
+    """
+    code = _PROBE.format(
+        src=SRC_DIR, modules=BACKEND_MODULES[backend], model=args.model, backend=backend, onnx_dir=args.onnx_dir,
+        queries=queries, index_path=args.index or "", metadata_path=args.metadata, parity_sample=args.parity,
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def startup_s(command: list, repeat: int = 3) -> float:
+    """
+    Return the best wall time of a command over `repeat` runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SRC_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Times `cli.py --help` and `import api`, which no longer load any encoder library.
+    - For each query encoder backend: library import time, model load time, single-query
+      encode p50/p99, batch throughput, resident memory and, with --index, parity with the
+      stored embeddings.
+
+    Example:
+        python src/query_encoder.py --export-onnx
+        python -m benchmarks.bench_encoder --index models/faiss_index --metadata models/reviews_with_metadata.csv
+    """
+    parser = argparse.ArgumentParser(description="Compare the import time, latency and parity of the query encoder backends.")
+    parser.add_argument("--backends", nargs="+", choices=list(BACKEND_MODULES), default=list(BACKEND_MODULES), help="Backends to compare.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="SentenceTransformer model name or local directory.")
+    parser.add_argument("--onnx-dir", default="models/onnx_int8", help="Directory of the ONNX export.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries encoded one at a time.")
+    parser.add_argument("--index", default=None, help="FAISS index to check parity against (optional).")
+    parser.add_argument("--metadata", default="models/reviews_with_metadata.csv", help="Metadata of --index.")
+    parser.add_argument("--parity", type=int, default=1000, help="Reviews compared for parity.")
+    parser.add_argument("--out", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = {
+        "startup": {
+            "cli_help_s": round(startup_s([sys.executable, "cli.py", "--help"]), 3),
+            "import_api_s": round(startup_s([sys.executable, "-c", "import api"]), 3),
+        },
+        "backends": {},
+    }
+    print(f"startup: {json.dumps(results['startup'])}")
+    queries = generate_queries(args.queries)
+    for backend in args.backends:
+        results["backends"][backend] = probe(backend, args, queries)
+        print(f"{backend}: {json.dumps(results['backends'][backend])}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.out}")
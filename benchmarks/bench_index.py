@@ -0,0 +1,136 @@
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from src.index_factory import INDEX_TYPES, DEFAULT_SEARCH_PARAMS, build_index, select_training_sample, apply_search_params
+
+def make_corpus(num_vectors: int, dimension: int, num_queries: int, seed: int = 0) -> tuple:
+    """
+    Generate a clustered synthetic corpus and held-out queries.
+
+    Real sentence embeddings are far from uniform; drawing the vectors around a few
+    hundred centres gives ANN indexes a comparable structure to exploit.
+
+    Args:
+        num_vectors (int): Number of corpus vectors.
+        dimension (int): Dimension of the vectors.
+        num_queries (int): Number of query vectors.
+        seed (int): Random seed.
+
+    Returns:
+        tuple: (corpus, queries) as float32 arrays of unit vectors.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((256, dimension)).astype("float32")
+
+    def sample(n: int) -> np.ndarray:
+        # Generate in chunks so that 10M x 384 corpora do not need a float64 copy
+        out = np.empty((n, dimension), dtype="float32")
+        for start in range(0, n, 100000):
+            stop = min(n, start + 100000)
+            labels = rng.integers(0, len(centres), size=stop - start)
+            out[start:stop] = centres[labels] + 0.6 * rng.standard_normal((stop - start, dimension), dtype="float32")
+        faiss.normalize_L2(out)
+        return out
+
+    return sample(num_vectors), sample(num_queries)
+
+def measure(index, queries: np.ndarray, k: int) -> tuple:
+    """
+    Search the queries one at a time, as the API does.
+
+    Returns:
+        tuple: (result IDs, per-query latencies in milliseconds).
+    """
+    ids = np.empty((len(queries), k), dtype="int64")
+    latencies = np.empty(len(queries))
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        _, ids[i:i + 1] = index.search(queries[i:i + 1], k)
+        latencies[i] = (time.perf_counter() - start) * 1000.0
+    return ids, latencies
+
+def recall_at_k(ids: np.ndarray, truth: np.ndarray) -> float:
+    """
+    Fraction of the exact top-k neighbours found by the approximate search.
+    """
+    found = sum(len(np.intersect1d(row, expected)) for row, expected in zip(ids, truth))
+    return found / truth.size
+
+def bench(num_vectors: int, index_types: list, dimension: int, num_queries: int, k: int, nprobe: int, ef_search: int) -> list:
+    """
+    Build every index type over one corpus and measure it against the flat baseline.
+
+    Returns:
+        list: One result dict per index type.
+    """
+    corpus, queries = make_corpus(num_vectors, dimension, num_queries)
+    ids = np.arange(num_vectors, dtype="int64")
+    params = {"nprobe": nprobe, "efSearch": ef_search}
+
+    results = []
+    truth = None
+    # The flat index runs first: its results are the ground truth
+    for index_type in ["flat"] + [t for t in index_types if t != "flat"]:
+        start = time.perf_counter()
+        index = build_index(index_type, dimension, num_vectors)
+        if not index.is_trained:
+            index.train(select_training_sample(corpus, index))
+        index.add_with_ids(corpus, ids)
+        build_seconds = time.perf_counter() - start
+
+        apply_search_params(index, dict(params, index_type=index_type))
+        found, latencies = measure(index, queries, k)
+        if truth is None:
+            truth = found
+
+        result = {
+            "vectors": num_vectors,
+            "index_type": index_type,
+            f"recall@{k}": round(recall_at_k(found, truth), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "memory_mb": round(len(faiss.serialize_index(index)) / 2**20, 1),
+            "build_s": round(build_seconds, 2),
+        }
+        print(
+            f"{num_vectors:>10,} {index_type:<9} recall@{k}={result[f'recall@{k}']:.3f} "
+            f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms "
+            f"memory={result['memory_mb']:.1f}MB build={result['build_s']:.1f}s"
+        )
+        if index_type in index_types:
+            results.append(result)
+    return results
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Benchmarks recall, search latency and memory of every index type on synthetic corpora.
+
+    Example:
+        python -m benchmarks.bench_index --sizes 10000 100000 1000000 --out results.json
+    """
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Corpus sizes (up to 10000000; large sizes need tens of GB of RAM).")
+    parser.add_argument("--index-types", nargs="+", choices=list(INDEX_TYPES), default=list(INDEX_TYPES), help="Index types to compare.")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector dimension (all-MiniLM-L6-v2: 384).")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of queries per corpus.")
+    parser.add_argument("--k", type=int, default=5, help="Number of neighbours retrieved per query.")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_SEARCH_PARAMS["nprobe"], help="IVF lists scanned per query.")
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_SEARCH_PARAMS["efSearch"], help="HNSW candidate list size per query.")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads (1 matches a single API request).")
+    parser.add_argument("--out", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    all_results = []
+    for size in args.sizes:
+        all_results.extend(bench(size, args.index_types, args.dimension, args.queries, args.k, args.nprobe, args.ef_search))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(all_results, f, indent=2)
+        print(f"Results saved to {args.out}")
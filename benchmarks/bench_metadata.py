@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from src.metadata_store import write_metadata_store
+
+# Loads one metadata format in a fresh interpreter and reports load time, private memory and fetch latency
+_PROBE = """
+import json, sys, time
+import numpy as np
+import pandas as pd
+sys.path.insert(0, {src!r})
+from metadata_store import MetadataStore
+
+def private_mb():
+    # Anonymous (private) memory; pages of the memory-mapped file are shared between workers
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024.0
+    return float("nan")
+
+before = private_mb()
+start = time.perf_counter()
+if {fmt!r} == "csv":
+    store = MetadataStore.from_frame(pd.read_csv({path!r}))
+else:
+    store = MetadataStore.open({path!r})
+load_s = time.perf_counter() - start
+
+rng = np.random.default_rng(0)
+ids = store.ids[rng.integers(0, len(store), size=(1000, 5))]
+latencies = []
+for row in ids:
+    start = time.perf_counter()
+    store.rows(row)
+    latencies.append((time.perf_counter() - start) * 1000.0)
+print(json.dumps({{
+    "load_s": load_s,
+    "private_mb": private_mb() - before,
+    "fetch5_p50_ms": float(np.percentile(latencies, 50)),
+    "fetch5_p99_ms": float(np.percentile(latencies, 99)),
+}}))
+"""
+
+def make_metadata(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate metadata rows shaped like `reviews_with_metadata.csv`, with review-length texts.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array("the drug helped my depression but caused nausea and weight gain after weeks".split())
+    drugs = np.array(["Prozac", "Lexapro", "Zoloft", "Cymbalta", "Wellbutrin", "Effexor"])
+    texts = [" ".join(rng.choice(words, size=rng.integers(20, 120))) for _ in range(num_rows)]
+    df = pd.DataFrame({
+        "drug_name": rng.choice(drugs, size=num_rows),
+        "condition": "Depression",
+        "rating_overall": rng.integers(1, 6, size=num_rows),
+        "text": texts,
+    })
+    df["combined_text"] = "Drug Name: " + df["drug_name"] + " | Review: " + df["text"]
+    df["review_id"] = rng.permutation(num_rows).astype("int64") * 7919 + 1
+    return df
+
+def probe(fmt: str, path: str) -> dict:
+    """
+    Measure one format in a subprocess, so that each measurement starts from a clean heap.
+    """
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    code = _PROBE.format(src=src, fmt=fmt, path=path)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Compares cold-start time, private (per-worker) memory and 5-row fetch latency of the CSV
+      metadata and the memory-mapped columnar store.
+
+    Example:
+        python -m benchmarks.bench_metadata --rows 100000 1000000
+    """
+    parser = argparse.ArgumentParser(description="Compare the CSV and columnar metadata formats.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000], help="Numbers of metadata rows.")
+    parser.add_argument("--out", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_rows in args.rows:
+            df = make_metadata(num_rows)
+            csv_path = os.path.join(tmp, "metadata.csv")
+            store_path = os.path.join(tmp, "metadata.store")
+            df.to_csv(csv_path, index=False)
+            write_metadata_store(df, store_path)
+
+            for fmt, path in [("csv", csv_path), ("store", store_path)]:
+                result = {"rows": num_rows, "format": fmt, "file_mb": os.path.getsize(path) / 2**20, **probe(fmt, path)}
+                results.append(result)
+                print(
+                    f"{num_rows:>10,} {fmt:<6} file={result['file_mb']:.1f}MB load={result['load_s'] * 1000:.1f}ms "
+                    f"private=+{result['private_mb']:.1f}MB fetch5 p50={result['fetch5_p50_ms']:.3f}ms p99={result['fetch5_p99_ms']:.3f}ms"
+                )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.out}")
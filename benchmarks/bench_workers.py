@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.run import SRC_DIR, git_commit, scenario_build
+
+# Ways of running several API workers: (command line, extra environment)
+LAYOUTS = {
+    # Current layout: every worker is spawned fresh and reads its own copy of the index
+    "uvicorn": (["-m", "uvicorn", "api:app", "--app-dir", SRC_DIR, "--host", "127.0.0.1", "--log-level", "warning"], {"INDEX_MMAP": "false"}),
+    # Resources loaded once, index and metadata memory-mapped, workers forked afterwards
+    "preforked": ([os.path.join(SRC_DIR, "serve.py"), "--host", "127.0.0.1", "--log-level", "warning"], {"INDEX_MMAP": "true"}),
+}
+
+def free_port() -> int:
+    """
+    Return a TCP port that is free on the loopback interface.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def descendants(pid: int) -> list:
+    """
+    Return the IDs of every descendant of a process (Linux only).
+    """
+    found = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return found
+    for child in children:
+        found.append(child)
+        found.extend(descendants(child))
+    return found
+
+def memory_mb(pid: int) -> dict:
+    """
+    Return the resident, proportional and private memory of a process in megabytes.
+
+    PSS splits every shared page between the processes mapping it, so the PSS of all
+    workers adds up to the memory they actually use together.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    return {
+        "rss_mb": fields.get("Rss", 0.0),
+        "pss_mb": fields.get("Pss", 0.0),
+        "private_mb": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+def ready_pid(port: int):
+    """
+    Ask /ready on a new connection; return the answering worker's process ID, or None if not ready.
+    """
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=2) as response:
+            return json.loads(response.read())["pid"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def measure_layout(layout: str, workers: int, workdir: str, timeout: float) -> dict:
+    """
+    Start the API with one layout and measure its cold start and memory.
+
+    The cold start is the time from launch until /ready has been answered by `workers`
+    distinct processes, each having loaded and warmed up its resources.
+    """
+    args, env = LAYOUTS[layout]
+    port = free_port()
+    env = dict(os.environ, **env, PYTHONPATH=os.pathsep.join(filter(None, [SRC_DIR, os.environ.get("PYTHONPATH")])))
+    command = [sys.executable] + args + ["--port", str(port), "--workers", str(workers)]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Step 1: poll /ready on fresh connections until every worker has answered
+        seen = set()
+        while len(seen) < workers:
+            if process.poll() is not None:
+                raise Exception(f"Error: The '{layout}' server exited with status {process.returncode}.")
+            if time.perf_counter() - start > timeout:
+                raise Exception(f"Error: The '{layout}' server did not get ready within {timeout}s.")
+            pid = ready_pid(port)
+            if pid is None:
+                time.sleep(0.05)
+            else:
+                seen.add(pid)
+        cold_start = time.perf_counter() - start
+
+        # Step 2: memory of the workers, and of the whole process tree
+        time.sleep(1.0)
+        worker_memory = [memory_mb(pid) for pid in sorted(seen)]
+        tree = [memory_mb(pid) for pid in [process.pid] + descendants(process.pid)]
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def mean(key):
+        return round(sum(memory[key] for memory in worker_memory) / len(worker_memory), 1)
+
+    return {
+        "workers": workers,
+        "cold_start_s": round(cold_start, 2),
+        "worker_rss_mb": mean("rss_mb"),
+        "worker_pss_mb": mean("pss_mb"),
+        "worker_private_mb": mean("private_mb"),
+        "total_pss_mb": round(sum(memory["pss_mb"] for memory in tree), 1),
+    }
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Builds a synthetic vector store (or reuses the one in --workdir).
+    - Starts the API with `uvicorn --workers N` and with `src/serve.py --workers N`, and
+      reports their cold-start time and per-worker RSS, PSS and private memory.
+
+    Example:
+        python -m benchmarks.bench_workers --reviews 100000 --workers 4
+    """
+    parser = argparse.ArgumentParser(description="Compare the memory and cold start of the multi-worker serving layouts.")
+    parser.add_argument("--reviews", type=int, default=100000, help="Synthetic reviews in the corpus.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4], help="Numbers of worker processes.")
+    parser.add_argument("--layouts", nargs="+", choices=list(LAYOUTS), default=list(LAYOUTS), help="Layouts to compare.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for the workers to get ready.")
+    parser.add_argument("--workdir", default=None, help="Directory for the corpus and index (reused if it already holds an index).")
+    parser.add_argument("--out", default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "models"), exist_ok=True)
+    # The warm-up never calls the LLM, but the API expects a key to be configured
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.update({
+        "INDEX_PATH": os.path.join(workdir, "models", "faiss_index"),
+        "METADATA_PATH": os.path.join(workdir, "models", "reviews_with_metadata.csv"),
+    })
+    if not os.path.exists(os.environ["INDEX_PATH"]):
+        print(f"build: {json.dumps(scenario_build(workdir, args.reviews))}")
+
+    results = {"meta": {"commit": git_commit(), "cpus": os.cpu_count(), "args": vars(args)}, "layouts": {}}
+    for workers in args.workers:
+        for layout in args.layouts:
+            result = measure_layout(layout, workers, workdir, args.timeout)
+            results["layouts"].setdefault(layout, []).append(result)
+            print(f"{layout}: {json.dumps(result)}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
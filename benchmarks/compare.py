@@ -0,0 +1,45 @@
+import argparse
+import json
+
+# Metrics compared between two runs; lower is better except for throughput
+TRACKED = ("p50_ms", "p95_ms", "p99_ms", "seconds", "peak_rss_mb", "rss_mb", "throughput_rps", "queries_per_second", "prompt_tokens_mean")
+HIGHER_IS_BETTER = ("throughput_rps", "queries_per_second")
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """
+    Flatten nested results into {"scenario.stage.metric": value} for the tracked metrics.
+    """
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in TRACKED and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Prints the change of every tracked metric between two benchmark result files.
+
+    Example:
+        python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+    """
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline", help="Results of the reference run.")
+    parser.add_argument("candidate", help="Results of the new run.")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    old, new = flatten(baseline["scenarios"]), flatten(candidate["scenarios"])
+    print(f"{'metric':<60} {baseline['meta']['commit']:>12} {candidate['meta']['commit']:>12} {'change':>9}")
+    for path in sorted(set(old) & set(new)):
+        change = (new[path] - old[path]) / old[path] * 100.0 if old[path] else 0.0
+        better = change > 0 if path.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change < 0
+        marker = "" if abs(change) < 5 else (" +" if better else " !")
+        print(f"{path:<60} {old[path]:>12.2f} {new[path]:>12.2f} {change:>8.1f}%{marker}")
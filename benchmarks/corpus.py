@@ -0,0 +1,116 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Vocabulary of the synthetic WebMD-like reviews
+DRUGS = ["Prozac", "Zoloft", "Lexapro", "Celexa", "Paxil", "Cymbalta", "Effexor XR", "Wellbutrin", "Wellbutrin XL",
+         "Remeron", "Trintellix", "Pristiq", "Abilify", "Seroquel", "Lamictal", "Buspirone", "Viibryd", "Fetzima"]
+CONDITIONS = ["Depression", "Major Depressive Disorder", "Bipolar Depression", "Anxiousness associated with Depression",
+              "Anxiety", "Panic Disorder", "Insomnia", "Neuropathic Pain"]
+# Most reviews are about depression, as in the real dataset
+CONDITION_WEIGHTS = [0.40, 0.20, 0.06, 0.06, 0.12, 0.06, 0.05, 0.05]
+GENDERS = ["Female", "Male"]
+AGES = ["13-18", "19-24", "25-34", "35-44", "45-54", "55-64", "65-74", "75 or over"]
+AGE_WEIGHTS = [0.04, 0.12, 0.24, 0.22, 0.18, 0.12, 0.06, 0.02]
+TIMES = ["less than 1 month", "1 to 6 months", "6 months to less than 1 year", "1 to less than 2 years",
+         "2 to less than 5 years", "5 to less than 10 years", "10 years or more"]
+EFFECTS = ["helped my mood", "made me feel like myself again", "did nothing for me", "stopped my crying spells",
+           "gave me energy", "helped me sleep", "took the edge off my anxiety", "worked after a few weeks"]
+SIDE_EFFECTS = ["nausea", "weight gain", "insomnia", "headaches", "dry mouth", "fatigue", "low libido",
+                "vivid dreams", "dizziness", "no side effects"]
+OPENINGS = ["I have been taking {drug} for {time}.", "My doctor put me on {drug}.", "Started {drug} {time} ago.",
+            "After trying several meds, {drug} is the one."]
+
+# Queries sent by the benchmark scenarios, mostly related, a few unrelated
+QUERY_TEMPLATES = [
+    "Which drug works best for depression in {gender_word} aged {low} to {high}?",
+    "Is {drug} effective for treating anxiety along with depression?",
+    "What are the side effects of {drug}?",
+    "What are the best-rated drugs for {gender_word} suffering from depression?",
+    "Does {drug} cause {side_effect}?",
+    "How long does {drug} take to work for major depressive disorder?",
+    "What is the weather like in Paris today?",
+]
+
+def generate_reviews(num_reviews: int, seed: int = 0, missing_rate: float = 0.01) -> pd.DataFrame:
+    """
+    Generate a raw review dump shaped like the WebMD dataset.
+
+    Args:
+        num_reviews (int): Number of reviews.
+        seed (int): Random seed, for reproducible corpora.
+        missing_rate (float): Fraction of reviews with a missing text or rating.
+
+    Returns:
+        pd.DataFrame: The raw reviews, with the columns expected by `preprocess.py`.
+    """
+    rng = np.random.default_rng(seed)
+    drugs = rng.choice(DRUGS, size=num_reviews)
+    times = rng.choice(TIMES, size=num_reviews)
+    effects = rng.choice(EFFECTS, size=num_reviews)
+    side_effects = rng.choice(SIDE_EFFECTS, size=(num_reviews, 2))
+    openings = rng.choice(OPENINGS, size=num_reviews)
+    texts = [
+        f"{opening.format(drug=drug, time=time)} It {effect}, but I had {side[0]} and {side[1]}. Rating it honestly!"
+        for opening, drug, time, effect, side in zip(openings, drugs, times, effects, side_effects)
+    ]
+
+    df = pd.DataFrame({
+        "drug_name": drugs,
+        "condition": rng.choice(CONDITIONS, size=num_reviews, p=CONDITION_WEIGHTS),
+        "gender": rng.choice(GENDERS, size=num_reviews),
+        "age": rng.choice(AGES, size=num_reviews, p=AGE_WEIGHTS),
+        "time_on_drug": times,
+        "date": pd.Timestamp("2008-01-01") + pd.to_timedelta(rng.integers(0, 5000, size=num_reviews), unit="D"),
+        "rating_effectiveness": rng.integers(1, 6, size=num_reviews),
+        "rating_ease_of_use": rng.integers(1, 6, size=num_reviews),
+        "rating_satisfaction": rng.integers(1, 6, size=num_reviews),
+        "rating_overall": rng.integers(1, 6, size=num_reviews).astype(float),
+        "text": texts,
+    })
+    df["date"] = df["date"].dt.strftime("%m/%d/%Y")
+    df.loc[rng.random(num_reviews) < missing_rate, "text"] = np.nan
+    df.loc[rng.random(num_reviews) < missing_rate, "rating_overall"] = np.nan
+    return df
+
+def generate_queries(num_queries: int, seed: int = 1) -> list:
+    """
+    Generate user queries, mostly about depression drugs.
+
+    Args:
+        num_queries (int): Number of queries.
+        seed (int): Random seed.
+
+    Returns:
+        list: The query strings.
+    """
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(num_queries):
+        low = int(rng.integers(2, 7)) * 10
+        queries.append(str(rng.choice(QUERY_TEMPLATES)).format(
+            gender_word=rng.choice(["women", "men"]),
+            low=low,
+            high=low + 10,
+            drug=rng.choice(DRUGS),
+            side_effect=rng.choice(SIDE_EFFECTS[:-1]),
+        ))
+    return queries
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Writes a synthetic raw review dump, to be cleaned with `src/preprocess.py`.
+
+    Example:
+        python -m benchmarks.corpus --reviews 100000 --out data/webmd_reviews.csv
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic WebMD-like review dump.")
+    parser.add_argument("--reviews", type=int, default=10000, help="Number of reviews.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--out", default="data/webmd_reviews.csv", help="Output CSV file.")
+    args = parser.parse_args()
+
+    generate_reviews(args.reviews, args.seed).to_csv(args.out, index=False)
+    print(f"{args.reviews:,} synthetic reviews saved to {args.out}")
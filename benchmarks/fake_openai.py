@@ -0,0 +1,176 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Answer returned to generation prompts, split into `tokens` words
+ANSWER_WORDS = ("Based on the reviews, Lexapro and Zoloft are rated highest by patients in this group, "
+                "with nausea and fatigue as the most common side effects.").split()
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for the OpenAI Chat Completions API with configurable latency.
+
+    Serves `POST /v1/chat/completions`, plain and streamed (server-sent events), in the
+    format expected by the `openai` client. Relevance prompts are answered "Yes"; other
+    prompts get a fixed answer of `tokens` words. Each response waits `latency_ms`
+    (plus up to `jitter_ms`) before the first token and `token_ms` between tokens.
+    A fraction `error_rate` of the requests fails with `error_status` (e.g. 429 or 503).
+
+    Point the application at it with `OPENAI_API_BASE=<server.base_url>`.
+    """
+
+    def __init__(self, latency_ms: float = 500.0, jitter_ms: float = 100.0, token_ms: float = 10.0, tokens: int = 40, port: int = 0,
+                 error_rate: float = 0.0, error_status: int = 429):
+        """
+        Args:
+            latency_ms (float): Time to the first token, in milliseconds.
+            jitter_ms (float): Maximum random extra time to the first token.
+            token_ms (float): Time between two tokens.
+            tokens (int): Number of words of a generated answer.
+            port (int): Port to listen on (0: any free port).
+            error_rate (float): Fraction of the requests answered with an error.
+            error_status (int): HTTP status of those errors.
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.token_ms = token_ms
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """
+        The API base URL, e.g. "http://127.0.0.1:8123/v1".
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        """
+        Serve requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _answer(self, prompt: str) -> list:
+        """
+        Return the words of the answer to a prompt.
+        """
+        if "Respond with 'Yes' or 'No'" in prompt:
+            return ["Yes"]
+        return [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(self.tokens)]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                words = server._answer(prompt)
+                model = body.get("model", "gpt-3.5-turbo")
+                if random.random() < server.error_rate:
+                    self._error(server.error_status)
+                    return
+                time.sleep((server.latency_ms + random.uniform(0, server.jitter_ms)) / 1000.0)
+
+                if body.get("stream"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    for i, word in enumerate(words):
+                        if i:
+                            time.sleep(server.token_ms / 1000.0)
+                        delta = {"content": word if i == 0 else " " + word}
+                        self._event({"object": "chat.completion.chunk", "model": model,
+                                     "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                    self._event({"object": "chat.completion.chunk", "model": model,
+                                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.close_connection = True
+                    return
+
+                time.sleep(server.token_ms * max(0, len(words) - 1) / 1000.0)
+                payload = json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words), "total_tokens": len(prompt.split()) + len(words)},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status: int) -> None:
+                payload = json.dumps({"error": {"message": f"Simulated error {status}", "type": "server_error", "param": None, "code": None}}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _event(self, data: dict) -> None:
+                self.wfile.write(b"data: " + json.dumps(data).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Runs the fake OpenAI server in the foreground.
+
+    Example:
+        python -m benchmarks.fake_openai --port 8900 --latency-ms 800
+        OPENAI_API_BASE=http://127.0.0.1:8900/v1 OPENAI_API_KEY=fake uvicorn src.api:app
+    """
+    parser = argparse.ArgumentParser(description="Local fake OpenAI Chat Completions server.")
+    parser.add_argument("--port", type=int, default=8900, help="Port to listen on.")
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Time to the first token.")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Maximum random extra latency.")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="Time between two tokens.")
+    parser.add_argument("--tokens", type=int, default=40, help="Words per generated answer.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with --error-status.")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of the simulated errors.")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.latency_ms, args.jitter_ms, args.token_ms, args.tokens, args.port, args.error_rate, args.error_status)
+    print(f"Fake OpenAI API listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
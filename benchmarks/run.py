@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.corpus import generate_reviews, generate_queries
+from benchmarks.fake_openai import FakeOpenAIServer
+from benchmarks.stats import StageTimer, summarize, rss_mb
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+SCENARIOS = ["build", "single", "concurrent", "batch"]
+
+# Targets stated in DESIGN.md
+RETRIEVAL_GOAL_MS = 1000.0
+END_TO_END_GOAL_MS = 3000.0
+
+def git_commit() -> str:
+    """
+    Return the current commit hash, with a "-dirty" suffix for uncommitted changes.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_script(args: list, workdir: str) -> dict:
+    """
+    Run a `src/` script in a child process and measure its wall time and peak memory.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=workdir, check=True, stdout=subprocess.DEVNULL)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is the largest child so far, in kilobytes on Linux
+    return {"seconds": round(seconds, 3), "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0, 1)}
+
+def scenario_build(workdir: str, reviews: int) -> dict:
+    """
+    Generate the corpus, then time preprocessing and the vector store build.
+    """
+    raw_path = os.path.join(workdir, "data", "webmd_reviews.csv")
+    generate_reviews(reviews).to_csv(raw_path, index=False)
+    results = {
+        "reviews": reviews,
+        "preprocess": run_script([os.path.join(SRC_DIR, "preprocess.py")], workdir),
+        "vector_store": run_script([os.path.join(SRC_DIR, "vector_store.py")], workdir),
+    }
+    results["index_mb"] = round(os.path.getsize(os.path.join(workdir, "models", "faiss_index")) / 2**20, 1)
+    return results
+
+def scenario_single(queries: list) -> dict:
+    """
+    Answer queries one at a time and time every stage of the pipeline.
+    """
+    from api import get_resources
+    from config import CONTEXT_FETCH_K
+    from context_builder import count_tokens
+    from llm_handler import call_llm
+    from query_retrieval import assemble_prompt
+    from relevance_gate import analyze_query_with_llm
+
+    engine, gate = get_resources()
+    timer = StageTimer()
+    prompt_tokens = []
+    for query in queries:
+        with timer.stage("total"):
+            with timer.stage("retrieval"):
+                with timer.stage("encode"):
+                    query_embedding = engine.encode([query])
+                with timer.stage("gate"):
+                    related = gate.is_related(query, query_embedding[0]) if gate is not None else analyze_query_with_llm(query)
+                if related:
+                    with timer.stage("search"):
+                        rows = engine.retrieve(query, k=CONTEXT_FETCH_K, query_embedding=query_embedding)
+                    with timer.stage("context"):
+                        prompt = assemble_prompt(query, rows, engine, query_embedding)
+                    prompt_tokens.append(count_tokens(prompt))
+            if related:
+                with timer.stage("llm"):
+                    call_llm(prompt, model="gpt-3.5-turbo", max_tokens=300, temperature=0.5)
+
+    stages = timer.summary()
+    return {
+        "stages": stages,
+        "prompt_tokens_mean": round(sum(prompt_tokens) / len(prompt_tokens), 1) if prompt_tokens else None,
+        "goals": {
+            "retrieval_p95_under_1s": stages["retrieval"]["p95_ms"] < RETRIEVAL_GOAL_MS,
+            "end_to_end_p95_under_3s": stages["total"]["p95_ms"] < END_TO_END_GOAL_MS,
+        },
+    }
+
+def scenario_concurrent(queries: list, levels: list, requests_per_level: int) -> dict:
+    """
+    Serve the API with uvicorn and measure `/recommend` latency and throughput at several concurrency levels.
+    """
+    import httpx
+    import uvicorn
+    from api import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/recommend"
+
+    async def load(concurrency: int) -> dict:
+        latencies = []
+        errors = 0
+        counter = iter(range(requests_per_level))
+
+        async def client(http):
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                response = await http.post(url, json={"query": queries[i % len(queries)]})
+                latencies.append((time.perf_counter() - start) * 1000.0)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(timeout=120.0, limits=limits) as http:
+            await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        seconds = time.perf_counter() - start
+        return {"latency": summarize(latencies), "throughput_rps": round(len(latencies) / seconds, 2), "errors": errors}
+
+    try:
+        return {f"concurrency_{level}": asyncio.run(load(level)) for level in levels}
+    finally:
+        server.should_exit = True
+        thread.join()
+
+def scenario_batch(queries: list, workdir: str, concurrency: int) -> dict:
+    """
+    Time the CLI batch mode on a JSONL file of queries.
+    """
+    from cli import run_batch_mode
+
+    input_path = os.path.join(workdir, "batch.jsonl")
+    with open(input_path, "w") as f:
+        for i, query in enumerate(queries):
+            f.write(json.dumps({"id": i, "query": query}) + "\n")
+    start = time.perf_counter()
+    exit_code = run_batch_mode(input_path, os.path.join(workdir, "batch_results.jsonl"), concurrency)
+    seconds = time.perf_counter() - start
+    return {"queries": len(queries), "seconds": round(seconds, 3), "queries_per_second": round(len(queries) / seconds, 2), "exit_code": exit_code}
+
+def main(args) -> dict:
+    """
+    Run the selected scenarios against a synthetic corpus and a fake OpenAI server.
+    """
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.makedirs(os.path.join(workdir, "models"), exist_ok=True)
+
+    llm = FakeOpenAIServer(args.llm_latency_ms, args.llm_jitter_ms, args.llm_token_ms).start()
+    # Settings are read when the modules are imported, so they are set before any import from src/
+    os.environ.update({
+        "OPENAI_API_BASE": llm.base_url,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "INDEX_PATH": os.path.join(workdir, "models", "faiss_index"),
+        "METADATA_PATH": os.path.join(workdir, "models", "reviews_with_metadata.csv"),
+    })
+    if not args.caches:
+        os.environ.update({"LLM_CACHE_ENABLED": "false", "SEMANTIC_CACHE_ENABLED": "false"})
+    sys.path.insert(0, SRC_DIR)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": {},
+    }
+    queries = generate_queries(args.queries)
+    try:
+        if "build" in args.scenarios or not os.path.exists(os.environ["INDEX_PATH"]):
+            results["scenarios"]["build"] = scenario_build(workdir, args.reviews)
+            print(f"build: {json.dumps(results['scenarios']['build'])}")
+
+        rss_before = rss_mb()
+        from api import get_resources
+        get_resources()
+        results["scenarios"]["serving_memory"] = {"rss_mb": round(rss_mb(), 1), "engine_and_gate_mb": round(rss_mb() - rss_before, 1)}
+
+        if "single" in args.scenarios:
+            results["scenarios"]["single"] = scenario_single(queries)
+            print(f"single: {json.dumps(results['scenarios']['single'])}")
+        if "concurrent" in args.scenarios:
+            results["scenarios"]["concurrent"] = scenario_concurrent(queries, args.concurrency, args.requests)
+            print(f"concurrent: {json.dumps(results['scenarios']['concurrent'])}")
+        if "batch" in args.scenarios:
+            results["scenarios"]["batch"] = scenario_batch(queries * max(1, args.requests // len(queries)), workdir, max(args.concurrency))
+            print(f"batch: {json.dumps(results['scenarios']['batch'])}")
+    finally:
+        results["meta"]["llm_requests"] = llm.requests
+        llm.stop()
+    return results
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Runs the end-to-end benchmark and saves the results as JSON.
+
+    Example:
+        python -m benchmarks.run --reviews 20000 --queries 200 --concurrency 1 8 32
+        python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+    """
+    parser = argparse.ArgumentParser(description="End-to-end performance benchmark with a fake OpenAI server.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS, help="Scenarios to run.")
+    parser.add_argument("--reviews", type=int, default=10000, help="Synthetic reviews in the corpus.")
+    parser.add_argument("--queries", type=int, default=100, help="Distinct queries.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrent clients for /recommend.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level.")
+    parser.add_argument("--llm-latency-ms", type=float, default=500.0, help="Fake LLM time to first token.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="Fake LLM random extra latency.")
+    parser.add_argument("--llm-token-ms", type=float, default=10.0, help="Fake LLM time between tokens.")
+    parser.add_argument("--caches", action="store_true", help="Keep the LLM and semantic caches enabled.")
+    parser.add_argument("--workdir", default=None, help="Directory for the corpus and index (reused if it already holds an index).")
+    parser.add_argument("--out", default=None, help="Results file (default: benchmarks/results/<commit>.json).")
+    args = parser.parse_args()
+
+    results = main(args)
+    out = args.out or os.path.join(REPO_ROOT, "benchmarks", "results", f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {out}")
@@ -0,0 +1,65 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+def summarize(samples_ms: list) -> dict:
+    """
+    Summarize latency samples.
+
+    Args:
+        samples_ms (list): Latencies in milliseconds.
+
+    Returns:
+        dict: Count, mean, p50, p95, p99 and max, in milliseconds.
+    """
+    if not samples_ms:
+        return {"count": 0}
+    samples = np.asarray(samples_ms, dtype="float64")
+    return {
+        "count": int(len(samples)),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "max_ms": round(float(samples.max()), 3),
+    }
+
+class StageTimer:
+    """
+    Collects the duration of named pipeline stages over many runs.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time the enclosed block and record it under `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append((time.perf_counter() - start) * 1000.0)
+
+    def summary(self) -> dict:
+        """
+        Return the percentiles of every stage.
+        """
+        return {name: summarize(samples) for name, samples in self.samples.items()}
+
+def rss_mb() -> float:
+    """
+    Return the resident memory of this process in megabytes (Linux only; NaN elsewhere).
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
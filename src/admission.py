@@ -0,0 +1,263 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+#from src.config import ADMISSION_RETRIEVE_CONCURRENCY, ADMISSION_GENERATE_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT  # Uncomment this if using relative imports
+#from src.metrics import record_admission, update_admission, record_coalesced  # Uncomment this if using relative imports
+from config import ADMISSION_RETRIEVE_CONCURRENCY, ADMISSION_GENERATE_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT  # Stage limits
+from metrics import record_admission, update_admission, record_coalesced  # Admission and coalescing metrics
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed because a pipeline stage is over capacity.
+    """
+
+    def __init__(self, stage: str, reason: str, retry_after: float):
+        super().__init__(f"The server is over capacity ({stage}: {reason.replace('_', ' ')}). Please retry later.")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+class StageLimiter:
+    """
+    Concurrency limit of one pipeline stage, with a bounded wait queue.
+
+    At most `limit` requests hold a slot at once. Up to `max_queue` more wait for one,
+    first come first served, for at most `queue_timeout` seconds. A request arriving at
+    a full queue is refused at once, and one still waiting after the timeout is
+    refused, both with `Overloaded`. The wait is therefore bounded instead of
+    growing with the backlog.
+
+    All methods run on the event loop; no lock is needed.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        """
+        Args:
+            name (str): Stage name, used in metrics and errors.
+            limit (int): Maximum number of requests in the stage.
+            max_queue (int): Maximum number of requests waiting for the stage.
+            queue_timeout (float): Maximum wait for a slot, in seconds.
+        """
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+        self._hold_seconds = None  # Moving average of the time a slot is held
+        self.stats = {"admitted": 0, "queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def waiting(self) -> int:
+        """
+        Number of requests waiting for a slot.
+        """
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """
+        Estimate when a slot will be free: the current queue drained at the observed rate.
+        """
+        hold = self._hold_seconds if self._hold_seconds is not None else 1.0
+        return (self.waiting + 1) * hold / self.limit
+
+    def _record(self, result: str) -> None:
+        self.stats[result] += 1
+        record_admission(self.name, result, self.active, self.waiting)
+
+    def _shed(self, reason: str) -> Overloaded:
+        self._record(reason)
+        return Overloaded(self.name, reason, self.retry_after())
+
+    async def acquire(self) -> None:
+        """
+        Take a slot, waiting in the queue if the stage is full.
+
+        Raises:
+            Overloaded: If the queue is full, or no slot frees up within `queue_timeout`.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._record("admitted")
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        update_admission(self.name, self.active, self.waiting)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended: pass it on
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._shed("queue_timeout")
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            update_admission(self.name, self.active, self.waiting)
+        self._record("admitted")
+
+    def release(self, held: float = None) -> None:
+        """
+        Give a slot back, handing it directly to the longest-waiting request.
+
+        Args:
+            held (float): Seconds the slot was held, used for the Retry-After estimate.
+        """
+        if held is not None:
+            self._hold_seconds = held if self._hold_seconds is None else 0.9 * self._hold_seconds + 0.1 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                update_admission(self.name, self.active, self.waiting)
+                return
+        self.active -= 1
+        update_admission(self.name, self.active, self.waiting)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a slot for the duration of an `async with` block.
+        """
+        await self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Return the limits, occupancy and decision counts of the stage.
+        """
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.stats,
+        }
+
+class AdmissionController:
+    """
+    Admission control of the recommendation pipeline.
+
+    Each stage ("retrieve": embedding, relevance gate and search; "generate": context
+    building and the LLM call) has its own concurrency limit and bounded wait queue
+    (see `StageLimiter`), so that a slow LLM does not hold back requests that only
+    need the local stages, and an overload is answered quickly with a 429 rather
+    than with ever-growing latency.
+    """
+
+    def __init__(
+        self,
+        retrieve_concurrency: int = ADMISSION_RETRIEVE_CONCURRENCY,
+        generate_concurrency: int = ADMISSION_GENERATE_CONCURRENCY,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        """
+        Args:
+            retrieve_concurrency (int): Requests in the retrieval stage at once.
+            generate_concurrency (int): Requests in the generation stage at once.
+            max_queue (int): Requests waiting for each stage.
+            queue_timeout (float): Maximum wait for a stage, in seconds.
+        """
+        self.stages = {
+            "retrieve": StageLimiter("retrieve", retrieve_concurrency, max_queue, queue_timeout),
+            "generate": StageLimiter("generate", generate_concurrency, max_queue, queue_timeout),
+        }
+
+    def stage(self, name: str):
+        """
+        Return an async context manager holding a slot of the given stage.
+
+        Raises:
+            Overloaded: On entering, if the stage is over capacity.
+        """
+        return self.stages[name].slot()
+
+    def stats(self) -> dict:
+        """
+        Return the occupancy and decision counts of every stage.
+        """
+        return {name: limiter.snapshot() for name, limiter in self.stages.items()}
+
+def normalize_query(query: str) -> str:
+    """
+    Return the key under which identical queries are coalesced: case and spacing are ignored.
+    """
+    return " ".join(query.casefold().split())
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one execution.
+
+    The first caller for a key starts the work; callers arriving with the same key
+    while it runs wait for the same result (or exception) instead of starting their
+    own. The work is cancelled only when every caller waiting for it has gone away
+    (e.g. disconnected). Results are not kept once the work completes: repeated
+    queries over time are the business of the caches.
+    """
+
+    def __init__(self):
+        self._flights = {}  # key -> [task, number of waiting callers]
+        self.stats = {"leaders": 0, "followers": 0}
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Number of distinct keys being computed.
+        """
+        return len(self._flights)
+
+    async def run(self, key, work):
+        """
+        Return the result of `work()`, sharing it with concurrent calls of the same key.
+
+        Args:
+            key: The coalescing key.
+            work (callable): Returns the coroutine computing the result; called only by the first caller.
+
+        Returns:
+            The result of the shared execution.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(work())
+            flight = self._flights[key] = [task, 0]
+            task.add_done_callback(lambda _, key=key, flight=flight: self._finish(key, flight))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+            record_coalesced()
+
+        task = flight[0]
+        flight[1] += 1
+        try:
+            # Shielded: one caller going away must not cancel the others' result
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                task.cancel()
+
+    def _finish(self, key, flight: list) -> None:
+        """
+        Forget a completed flight, unless a newer one already took its key.
+        """
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Consume the exception of work whose callers all went away
+        task = flight[0]
+        if not task.cancelled():
+            task.exception()
@@ -1,77 +1,578 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext, AsyncExitStack
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-#from src.query_retrieval import query_retrieval  # Uncomment this if using relative imports
-#from src.llm_handler import call_llm            # Uncomment this if using relative imports
+#from src.query_retrieval import query_retrieval_async, query_retrieval_stream_async, map_retrieval_error  # Uncomment this if using relative imports
+#from src.retrieval_engine import get_engine     # Uncomment this if using relative imports
+#from src.relevance_gate import RelevanceGate, is_query_related_async, NOT_RELATED_RESPONSE  # Uncomment this if using relative imports
+#from src.batch_pipeline import run_batch  # Uncomment this if using relative imports
+#from src.llm_handler import get_llm_cache_stats, llm_client, LLMError, LLMRateLimitError  # Uncomment this if using relative imports
+#from src.config import INDEX_PATH, METADATA_PATH, RELEVANCE_GATE, RETRIEVAL_EXECUTOR_WORKERS, BATCH_MAX_QUERIES  # Uncomment this if using relative imports
+#from src.config import METRICS_ENABLED, TIMING_HEADER, CONTEXT_FETCH_K  # Uncomment this if using relative imports
+#from src.admission import AdmissionController, SingleFlight, Overloaded, normalize_query  # Uncomment this if using relative imports
+#from src.config import ADMISSION_CONTROL, REQUEST_COALESCING  # Uncomment this if using relative imports
+#from src.metrics import span, record_request, start_request_timings, stop_request_timings, start_request_prompts, stop_request_prompts, format_timings, render_metrics  # Uncomment this if using relative imports
+
+from query_retrieval import query_retrieval_async, query_retrieval_stream_async, map_retrieval_error  # Retrieval and generation from the FAISS vector database
+from retrieval_engine import get_engine  # Resident FAISS index, metadata and encoder
+from relevance_gate import RelevanceGate, is_query_related_async, NOT_RELATED_RESPONSE  # Local and LLM relevance gates
+from batch_pipeline import run_batch  # Bulk pipeline with shared retrieval work
+from llm_handler import get_llm_cache_stats, llm_client, LLMError, LLMRateLimitError  # LLM cache counters, shared client and its errors
+from config import INDEX_PATH, METADATA_PATH, RELEVANCE_GATE, RETRIEVAL_EXECUTOR_WORKERS, BATCH_MAX_QUERIES  # Shared settings
+from config import METRICS_ENABLED, TIMING_HEADER, CONTEXT_FETCH_K  # Instrumentation settings and number of reviews retrieved
+from admission import AdmissionController, SingleFlight, Overloaded, normalize_query  # Per-stage admission control and request coalescing
+from config import ADMISSION_CONTROL, REQUEST_COALESCING  # Overload protection settings
+from metrics import span, record_request, start_request_timings, stop_request_timings, start_request_prompts, stop_request_prompts, format_timings, render_metrics  # Stage timings and Prometheus metrics
+
+# Bounded pool running the CPU-bound encoder and FAISS work off the event loop
+executor = ThreadPoolExecutor(max_workers=RETRIEVAL_EXECUTOR_WORKERS, thread_name_prefix="retrieval")
+
+# Concurrency limits and bounded queues of the retrieval and generation stages
+admission = AdmissionController()
+
+# Concurrent identical `/recommend` queries share one pipeline run
+single_flight = SingleFlight()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Load the retrieval engine and relevance gate once at startup so that requests
+    never pay for reading the index, the metadata or the embedding model, then warm
+    them up; `/ready` reports the worker as ready from then on.
+    """
+    warm_up()
+    yield
+    await llm_client.aclose()
+
+class TimingMiddleware:
+    """
+    ASGI middleware collecting the stage timings of each HTTP request.
+
+    Records the request duration per route and status code, and adds an `X-Timing`
+    header with the per-stage breakdown (e.g. "load;dur=0.01, encode;dur=4.20, ...,
+    total;dur=830.52") when `TIMING_HEADER` is on or the request sends an `X-Timing`
+    header. Streaming responses report the stages completed before their first byte.
+    Non-streaming responses generated from a RAG prompt also carry its size in tokens in an
+    `X-Prompt-Tokens` header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-from query_retrieval import query_retrieval  # Function to retrieve relevant data from FAISS vector database
-from llm_handler import call_llm  # Function to call the GPT-based language model
+        timings, token = start_request_timings()
+        prompts, prompts_token = start_request_prompts()
+        start = time.perf_counter()
+        status = 500
+        wants_header = TIMING_HEADER or any(name == b"x-timing" for name, _ in scope["headers"])
+
+        async def send_with_timings(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = []
+                if wants_header:
+                    timings["total"] = (time.perf_counter() - start) * 1000.0
+                    headers.append((b"x-timing", format_timings(timings).encode("latin-1")))
+                if prompts:
+                    headers.append((b"x-prompt-tokens", str(sum(prompts)).encode("latin-1")))
+                if headers:
+                    message = {**message, "headers": list(message.get("headers", [])) + headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            stop_request_timings(token)
+            stop_request_prompts(prompts_token)
+            # Label by route template rather than raw path to bound the number of series
+            route = scope.get("route")
+            record_request(getattr(route, "path", "unmatched"), status, time.perf_counter() - start)
 
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(TimingMiddleware)
 
 # Define the structure for incoming API request payloads
 class QueryRequest(BaseModel):
     query: str  # User's query string
 
-def analyze_query_with_llm(query: str) -> bool:
+class BatchQueryRequest(BaseModel):
+    queries: list[str]  # User query strings, answered in order
+
+def get_resources():
+    """
+    Return the retrieval engine and the relevance gate, loading them on first use.
+
+    Returns:
+        tuple: (RetrievalEngine, RelevanceGate or None). The gate is None when
+        `RELEVANCE_GATE` is set to "llm".
+    """
+    if getattr(app.state, "engine", None) is None:
+        app.state.engine = get_engine(INDEX_PATH, METADATA_PATH)
+    if RELEVANCE_GATE == "local" and getattr(app.state, "gate", None) is None:
+        app.state.gate = RelevanceGate(app.state.engine)
+    return app.state.engine, getattr(app.state, "gate", None)
+
+# Query run through the local pipeline stages before a worker reports itself ready
+WARMUP_QUERY = "Which antidepressant works best for women aged 30 to 40 with anxiety?"
+
+def warm_up() -> dict:
+    """
+    Load the resources and run one query through every local stage of the pipeline.
+
+    Encoding, the relevance gate, the FAISS search, the metadata fetch, the context
+    selection and the rating cube are exercised once, so that lazy initialization and
+    the page faults of the memory-mapped index and metadata happen before the first
+    request rather than during it. No LLM call is made.
+
+    Returns:
+        dict: The readiness report served at `/ready`.
+    """
+    start = time.perf_counter()
+    engine, gate = get_resources()
+    query_embedding = engine.encode([WARMUP_QUERY])
+    if gate is not None:
+        # Local decision only: an ambiguous score must not reach the LLM fallback
+        gate.classify(WARMUP_QUERY, query_embedding[0])
+    rows = engine.retrieve(WARMUP_QUERY, k=CONTEXT_FETCH_K, query_embedding=query_embedding)
+    engine.review_vectors(rows)
+    engine.rank_query(WARMUP_QUERY)
+    app.state.warmup = {
+        "status": "ready",
+        "pid": os.getpid(),
+        "vectors": engine.snapshot.index.ntotal,
+        "encoder": engine.encoder_backend,
+        "warmup_ms": round((time.perf_counter() - start) * 1000.0, 2),
+    }
+    return app.state.warmup
+
+def http_error(e: Exception) -> HTTPException:
+    """
+    Translate an error of the recommendation pipeline into the HTTP error returned to the client.
+
+    A request shed by admission control or a call still rate-limited by the OpenAI API
+    becomes a 429 and an unavailable OpenAI API a 503, with a `Retry-After` header when the
+    wait is known; any other error is a 500.
+
+    Args:
+        e (Exception): The error raised by the pipeline.
+
+    Returns:
+        HTTPException: The exception to raise.
+    """
+    if isinstance(e, Overloaded):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    if isinstance(e, LLMError):
+        status_code = 429 if isinstance(e, LLMRateLimitError) else 503
+        headers = {"Retry-After": str(max(1, math.ceil(e.retry_after)))} if e.retry_after else None
+        return HTTPException(status_code=status_code, detail=f"An error occurred: {e}", headers=headers)
+    return HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+def stage(name: str):
+    """
+    Return an async context manager holding a slot of a pipeline stage ("retrieve" or
+    "generate"), or doing nothing when `ADMISSION_CONTROL` is off.
+
+    Raises:
+        Overloaded: On entering, if the stage is over capacity.
+    """
+    return admission.stage(name) if ADMISSION_CONTROL else nullcontext()
+
+async def prepare_recommendation(query: str):
+    """
+    Run the shared first stages of the pipeline: embedding, relevance gate and search.
+
+    The query is embedded once; the relevance gate and the FAISS search then run
+    concurrently, and the search is cancelled if the gate rejects the query.
+
+    Args:
+        query (str): The sanitized user query.
+
+    Returns:
+        tuple or None: (engine, query_embedding, search) for a related query, where
+        `search` is the pending retrieval task, or None if the query is not related.
+
+    Raises:
+        HTTPException: If loading, embedding or the relevance gate fails (see `http_error`).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        with span("load"):
+            engine, gate = await loop.run_in_executor(executor, get_resources)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An error occurred: {map_retrieval_error(e, INDEX_PATH)}")
+
+    # Embed the query once; the embedding is shared by the gate and the search
+    try:
+        with span("encode"):
+            query_embedding = await engine.encode_async(query, executor)
+    except Exception as e:
+        raise http_error(e)
+
+    # Start the FAISS search while the relevance gate decides
+    search = asyncio.ensure_future(engine.retrieve_async(query, CONTEXT_FETCH_K, query_embedding, executor))
+    try:
+        with span("gate"):
+            is_related = await is_query_related_async(query, gate, query_embedding)
+    except BaseException as e:
+        search.cancel()
+        if isinstance(e, Exception):
+            # Rate limiting and unavailability keep their status codes; anything else is a 500
+            raise http_error(e)
+        raise
+    if not is_related:
+        search.cancel()
+        return None
+    return engine, query_embedding, search
+
+async def admit_recommendation(query: str):
+    """
+    Run `prepare_recommendation` under a slot of the retrieval stage, held until the search completes.
+
+    Args:
+        query (str): The sanitized user query.
+
+    Returns:
+        tuple or None: As `prepare_recommendation`; the search task is then done.
+
+    Raises:
+        HTTPException: 429 with `Retry-After` if the retrieval stage is over capacity.
+    """
+    try:
+        async with stage("retrieve"):
+            prepared = await prepare_recommendation(query)
+            if prepared is not None:
+                try:
+                    await asyncio.wait({prepared[2]})
+                except asyncio.CancelledError:
+                    prepared[2].cancel()
+                    raise
+    except Overloaded as e:
+        raise http_error(e)
+    return prepared
+
+async def run_recommendation(query: str) -> dict:
+    """
+    Run the recommendation pipeline for one query without blocking the event loop.
+
+    Each stage runs under its admission slot: the retrieval stage until the search
+    completes, the generation stage until the answer is complete.
+
+    Args:
+        query (str): The sanitized user query.
+
+    Returns:
+        dict: The response containing the recommendation or a clarification message.
+
+    Raises:
+        HTTPException: 429 with `Retry-After` if a stage is over capacity.
+    """
+    prepared = await admit_recommendation(query)
+    if prepared is None:
+        # Return clarification if the query is not relevant
+        return {"response": NOT_RELATED_RESPONSE}
+    engine, query_embedding, search = prepared
+
+    # Process a valid query
+    try:
+        async with stage("generate"):
+            result = await query_retrieval_async(query, engine, executor, query_embedding, retrieval=search)
+        return {"response": result}
+    except Exception as e:
+        # Handle errors during query retrieval
+        raise http_error(e)
+
+async def start_recommendation_stream(query: str):
+    """
+    Start the streaming pipeline and wait for its first piece of text.
+
+    Waiting for the first piece means that errors raised before any text is generated
+    are reported exactly like `/recommend` does, as an HTTP 500 response.
+
+    The generation slot is held until the stream ends, not just until the first piece.
+
+    Args:
+        query (str): The sanitized user query.
+
+    Returns:
+        async iterator: The response pieces, starting with the one already received.
+    """
+    prepared = await admit_recommendation(query)
+
+    slots = AsyncExitStack()
+    try:
+        if prepared is None:
+            deltas = _single(NOT_RELATED_RESPONSE)
+        else:
+            engine, query_embedding, search = prepared
+            await slots.enter_async_context(stage("generate"))
+            deltas = query_retrieval_stream_async(query, engine, executor, query_embedding, retrieval=search)
+        first = await deltas.__anext__()
+    except StopAsyncIteration:
+        await slots.aclose()
+        return _single("")
+    except BaseException as e:
+        await slots.aclose()
+        if isinstance(e, Exception):
+            # Handle errors during query retrieval
+            raise http_error(e)
+        raise
+    return _prepend(first, deltas, slots)
+
+async def _single(text: str):
+    """
+    Async iterator yielding a single piece of text.
+    """
+    yield text
+
+async def _prepend(first: str, deltas, slots: AsyncExitStack = None):
+    """
+    Async iterator yielding `first` and then the remaining pieces of `deltas`,
+    releasing the admission `slots` once the stream ends.
     """
-    Analyze the user's query using GPT-3.5-turbo to check its relevance to depression drug recommendations.
+    try:
+        yield first
+        async for delta in deltas:
+            yield delta
+    finally:
+        if slots is not None:
+            await slots.aclose()
+
+def format_sse(data: dict, event: str = None) -> str:
+    """
+    Format one Server-Sent Event with a JSON payload.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+async def sse_events(deltas):
+    """
+    Turn response pieces into Server-Sent Events.
+
+    Each piece is sent as a `{"delta": ...}` message; the stream ends with a `done`
+    event holding the full response, or an `error` event if generation fails midway.
+    """
+    parts = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield format_sse({"delta": delta})
+    except Exception as e:
+        yield format_sse({"detail": f"An error occurred: {e}"}, event="error")
+        return
+    yield format_sse({"response": "".join(parts)}, event="done")
+
+async def wait_for_disconnect(request: Request, interval: float = 0.1) -> None:
+    """
+    Return once the client behind `request` has disconnected.
+    """
+    while not await request.is_disconnected():
+        await asyncio.sleep(interval)
+
+async def run_until_disconnected(request: Request, coro):
+    """
+    Await `coro`, cancelling it if the client disconnects first.
 
     Args:
-        query (str): The user's query to analyze.
-
-    Returns:
-        bool: True if the query is related to depression drug recommendations, False otherwise.
-    """
-    prompt = (
-        f"You are an assistant that determines whether a query is related to depression drug recommendations. "
-        f"Only respond with 'Yes' or 'No'. Here are examples of related queries:\n"
-        f"- 'Which drug works best for depression in women aged 30 to 40?'\n"
-        f"- 'Is Prozac effective for treating anxiety along with depression?'\n"
-        f"- 'What are the best-rated drugs for men suffering from depression?'\n\n"
-        f"Now analyze the following query:\n"
-        f"'{query}'\n"
-        f"Is this query related to depression drug recommendations? Respond with 'Yes' or 'No' only."
-    )
-    # Call the LLM with the constructed prompt
-    response = call_llm(prompt, max_tokens=10, temperature=0.2)
-    # Return True if the response is "Yes", otherwise False
-    return response.lower() == "yes"
+        request (Request): The incoming HTTP request.
+        coro (coroutine): The work producing the response.
+
+    Returns:
+        The result of `coro`, or an empty 499 response if the client went away.
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if task in done:
+        return task.result()
+    # The client is gone: stop the pipeline (pending LLM calls are aborted)
+    task.cancel()
+    return Response(status_code=499)
 
 @app.post("/recommend")
-def recommend(query_request: QueryRequest):
+async def recommend(query_request: QueryRequest, request: Request):
     """
     API endpoint to provide drug recommendations based on the user's query.
 
     Steps:
-        1. Analyze the query for relevance using the LLM.
-        2. If relevant, retrieve data using FAISS-based query retrieval.
+        1. Embed the query, then analyze it for relevance (locally, or with the LLM for
+           ambiguous queries) while the FAISS search runs.
+        2. If relevant, generate the answer from the retrieved reviews.
         3. Return the response or raise an HTTP exception for errors.
 
+    Concurrent requests for the same query (ignoring case and spacing) share one run of
+    the pipeline, which is cancelled only if every client waiting for it disconnects.
+    When a stage is over capacity the request is refused at once with a 429 and a
+    `Retry-After` header.
+
     Args:
         query_request (QueryRequest): The incoming query request from the user.
+        request (Request): The raw HTTP request, used to detect client disconnects.
 
     Returns:
         dict: The response containing the recommendation or a clarification message.
     """
     # Extract and sanitize the user's query
     query = query_request.query.strip()
+    if REQUEST_COALESCING:
+        work = single_flight.run(normalize_query(query), lambda: run_recommendation(query))
+    else:
+        work = run_recommendation(query)
+    return await run_until_disconnected(request, work)
 
-    # Analyze the query for relevance using the LLM
-    is_related = analyze_query_with_llm(query)
-    if not is_related:
-        # Return clarification if the query is not relevant
-        return {"response": "Your query does not seem related to depression drug recommendations. Please rephrase."}
+@app.post("/recommend/stream")
+async def recommend_stream(query_request: QueryRequest, request: Request):
+    """
+    Streaming variant of `/recommend` using Server-Sent Events.
 
-    # Process a valid query
+    Runs the same pipeline and returns the same status codes as `/recommend` up to the
+    first generated token; the answer is then streamed as `data: {"delta": ...}` events
+    followed by an `event: done` carrying the full response.
+
+    Args:
+        query_request (QueryRequest): The incoming query request from the user.
+        request (Request): The raw HTTP request, used to detect client disconnects.
+
+    Returns:
+        StreamingResponse: The `text/event-stream` response.
+    """
+    query = query_request.query.strip()
+    deltas = await run_until_disconnected(request, start_recommendation_stream(query))
+    if isinstance(deltas, Response):
+        return deltas
+    return StreamingResponse(sse_events(deltas), media_type="text/event-stream")
+
+@app.post("/recommend/batch")
+async def recommend_batch(batch_request: BatchQueryRequest):
+    """
+    API endpoint answering many queries in one request.
+
+    All queries are embedded in one pass and searched with one batched FAISS call;
+    relevance checks and generation then run with bounded LLM concurrency. Results are
+    streamed as newline-delimited JSON, one line per query in input order, as soon as
+    they are ready. A failing query yields a line with an "error" key instead of
+    failing the whole request.
+
+    Args:
+        batch_request (BatchQueryRequest): The incoming queries.
+
+    Returns:
+        StreamingResponse: An `application/x-ndjson` stream of
+        {"index", "query", "response"} or {"index", "query", "error"} objects.
+    """
+    if len(batch_request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_QUERIES} queries.")
+
+    loop = asyncio.get_running_loop()
     try:
-        # Retrieve relevant results using the FAISS vector database
-        result = query_retrieval(query, "models/faiss_index", "models/reviews_with_metadata.csv")
-        return {"response": result}
+        engine, gate = await loop.run_in_executor(executor, get_resources)
     except Exception as e:
-        # Handle errors during query retrieval
-        raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {map_retrieval_error(e, INDEX_PATH)}")
+
+    async def lines():
+        async for result in run_batch(batch_request.queries, engine, gate, executor):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once this worker has loaded and warmed up its resources, 503 before.
+
+    Returns:
+        dict: {"status": "ready", "pid", "vectors", "encoder", "warmup_ms", "store_version"}.
+    """
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None:
+        return JSONResponse({"status": "starting", "pid": os.getpid()}, status_code=503)
+    return {**warmup, "store_version": app.state.engine.version}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    API endpoint reporting the hit and miss counters of the LLM and semantic caches.
+
+    Returns:
+        dict: The counters and hit rate of each cache ("semantic" is None when disabled).
+    """
+    engine = getattr(app.state, "engine", None)
+    semantic_cache = engine.semantic_cache if engine is not None else None
+    return {
+        "llm": get_llm_cache_stats(),
+        "semantic": semantic_cache.stats() if semantic_cache is not None else None,
+    }
+
+@app.get("/batching/stats")
+def batching_stats():
+    """
+    API endpoint reporting the queue depth and batch sizes of the query micro-batchers.
+
+    Returns:
+        dict: The metrics of the encode and search batchers (None when batching is disabled).
+    """
+    engine = getattr(app.state, "engine", None)
+    if engine is None:
+        return {"encode": None, "search": None}
+    return engine.batching_stats()
+
+@app.get("/admission/stats")
+def admission_stats():
+    """
+    API endpoint reporting the load of the pipeline stages and the requests shed or coalesced.
+
+    Returns:
+        dict: Per stage, its limit, queue size, requests active and waiting, and counts of
+        requests admitted and refused ("queue_full", "queue_timeout"); and the number of
+        `/recommend` requests that started a pipeline run ("leaders") or joined one ("followers").
+    """
+    return {**admission.stats(), "coalescing": dict(single_flight.stats, in_flight=single_flight.in_flight)}
+
+@app.get("/metrics")
+def metrics():
+    """
+    API endpoint exporting the instrumentation in the Prometheus text format.
+
+    Series:
+        - rag_stage_duration_seconds{stage}: histogram of each pipeline stage (load, encode,
+          gate, search, faiss_search, metadata, context, cube, generate, llm).
+        - rag_stage_errors_total{stage, error}: exceptions raised by each stage.
+        - rag_request_duration_seconds{path, status}: histogram of HTTP requests.
+        - rag_llm_tokens_total{model, kind}: prompt and completion tokens.
+        - rag_cache_requests_total{cache, result}: hits and misses of the LLM and semantic caches.
+        - rag_prompt_tokens: histogram of the RAG prompt sizes.
+        - rag_llm_retries_total{error}, rag_llm_rejected_total{reason}: LLM calls retried, and
+          refused locally by the circuit breaker.
+        - rag_admission_requests_total{stage, result}: requests admitted to or shed by each stage.
+        - rag_admission_queue_depth{stage}, rag_admission_in_flight{stage}: requests waiting
+          for and holding a slot of each stage.
+        - rag_coalesced_requests_total: requests answered by a concurrent identical one.
+
+    Returns:
+        Response: The `text/plain; version=0.0.4` exposition.
+    """
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # Main entry point to run the FastAPI application
 if __name__ == "__main__":
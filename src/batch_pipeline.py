@@ -0,0 +1,155 @@
+import asyncio
+import json
+from collections import deque
+
+#from src.query_retrieval import query_retrieval_async, map_retrieval_error  # Uncomment this if using relative imports
+#from src.relevance_gate import is_query_related_async, NOT_RELATED_RESPONSE  # Uncomment this if using relative imports
+#from src.config import BATCH_LLM_CONCURRENCY, CONTEXT_FETCH_K  # Uncomment this if using relative imports
+from query_retrieval import query_retrieval_async, map_retrieval_error  # Retrieval and generation stages
+from relevance_gate import is_query_related_async, NOT_RELATED_RESPONSE  # Local and LLM relevance gates
+from config import BATCH_LLM_CONCURRENCY, CONTEXT_FETCH_K  # Maximum number of concurrent LLM calls, reviews retrieved per query
+
+async def _ready(value):
+    """
+    Awaitable that immediately returns `value`.
+    """
+    return value
+
+async def run_batch(queries: list, engine, gate=None, executor=None, concurrency: int = BATCH_LLM_CONCURRENCY):
+    """
+    Answer many queries with shared retrieval work and bounded LLM concurrency.
+
+    Workflow:
+    1. Embed every non-empty query in one encoder pass.
+    2. Retrieve the top `CONTEXT_FETCH_K` reviews of every query with one batched FAISS search.
+    3. Run the relevance gate and the generation of each query, with at most
+       `concurrency` queries talking to the LLM at a time.
+    4. Yield each result in input order as soon as it and all earlier ones are done.
+
+    A failing query produces an item with an "error" key instead of aborting the batch.
+
+    Args:
+        queries (list): The user queries; None marks an invalid input item.
+        engine (RetrievalEngine): The resident retrieval engine.
+        gate (RelevanceGate): The local relevance gate, or None to always ask the LLM.
+        executor (concurrent.futures.Executor): Executor for encoding and search (default: the loop's).
+        concurrency (int): Maximum number of queries processed concurrently.
+
+    Yields:
+        dict: {"index", "query", "response"} or {"index", "query", "error"} per query.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Steps 1-2: shared encoder pass and batched FAISS search over the valid queries
+    positions = [i for i, query in enumerate(queries) if query is not None and query.strip()]
+    texts = [queries[i].strip() for i in positions]
+    rows = {i: row for row, i in enumerate(positions)}
+    batch_error = None
+    if texts:
+        try:
+            embeddings = await loop.run_in_executor(executor, engine.encode, texts)
+            frames = await loop.run_in_executor(executor, engine.retrieve_batch, texts, CONTEXT_FETCH_K, embeddings)
+        except Exception as e:
+            batch_error = f"An error occurred: {map_retrieval_error(e, engine.index_path)}"
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(i: int) -> dict:
+        """
+        Gate and answer the query at position `i`.
+        """
+        query = queries[i]
+        if query is None:
+            return {"index": i, "query": None, "error": "Invalid input: expected a JSON object with a 'query' string."}
+        query = query.strip()
+        if not query:
+            return {"index": i, "query": query, "response": NOT_RELATED_RESPONSE}
+        if batch_error is not None:
+            return {"index": i, "query": query, "error": batch_error}
+
+        row = rows[i]
+        query_embedding = embeddings[row:row + 1]
+        async with semaphore:
+            try:
+                if not await is_query_related_async(query, gate, query_embedding):
+                    return {"index": i, "query": query, "response": NOT_RELATED_RESPONSE}
+                response = await query_retrieval_async(
+                    query, engine, executor, query_embedding, retrieval=_ready(frames[row])
+                )
+                return {"index": i, "query": query, "response": response}
+            except Exception as e:
+                return {"index": i, "query": query, "error": f"An error occurred: {e}"}
+
+    # Steps 3-4: keep a bounded window of tasks in flight and emit them in order
+    window = max(1, concurrency) * 4
+    pending = deque()
+    next_index = 0
+    try:
+        while next_index < len(queries) or pending:
+            while next_index < len(queries) and len(pending) < window:
+                pending.append(asyncio.ensure_future(process(next_index)))
+                next_index += 1
+            yield await pending.popleft()
+    finally:
+        # Stop outstanding work if the consumer goes away
+        for task in pending:
+            task.cancel()
+
+def read_batch_file(input_path: str) -> list:
+    """
+    Read a JSONL batch file.
+
+    Each line must be a JSON object with a "query" string and may carry an "id" that is
+    copied to the output. Blank lines are skipped.
+
+    Args:
+        input_path (str): Path to the input JSONL file.
+
+    Returns:
+        list: One {"id", "query"} dict per line; "query" is None for invalid lines.
+    """
+    items = []
+    with open(input_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                query = record.get("query") if isinstance(record, dict) else None
+                item_id = record.get("id") if isinstance(record, dict) else None
+            except json.JSONDecodeError:
+                query, item_id = None, None
+            items.append({"id": item_id, "query": query if isinstance(query, str) else None})
+    return items
+
+async def run_batch_file(input_path: str, output_path: str, engine, gate=None, executor=None, concurrency: int = BATCH_LLM_CONCURRENCY) -> dict:
+    """
+    Answer every query of a JSONL file and write one JSON result per line, in input order.
+
+    Results are flushed as they become available, so a partially completed run keeps
+    every result written so far.
+
+    Args:
+        input_path (str): Path to the input JSONL file.
+        output_path (str): Path to the output JSONL file.
+        engine (RetrievalEngine): The resident retrieval engine.
+        gate (RelevanceGate): The local relevance gate, or None to always ask the LLM.
+        executor (concurrent.futures.Executor): Executor for encoding and search.
+        concurrency (int): Maximum number of queries processed concurrently.
+
+    Returns:
+        dict: Number of queries processed, answered and failed.
+    """
+    items = read_batch_file(input_path)
+    summary = {"queries": len(items), "answered": 0, "failed": 0}
+
+    with open(output_path, "w") as out:
+        results = run_batch([item["query"] for item in items], engine, gate, executor, concurrency)
+        async for result in results:
+            item_id = items[result["index"]]["id"]
+            if item_id is not None:
+                result["id"] = item_id
+            summary["failed" if "error" in result else "answered"] += 1
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    return summary
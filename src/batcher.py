@@ -0,0 +1,157 @@
+import functools
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import Counter
+from concurrent.futures import Future
+
+# Sentinel telling the worker thread to stop
+_STOP = object()
+
+def _restart_in_child(ref) -> None:
+    """
+    Restart the worker thread of a batcher inherited by a forked process, if it still exists.
+    """
+    batcher = ref()
+    if batcher is not None:
+        batcher._start()
+
+class MicroBatcher:
+    """
+    Dynamic micro-batcher.
+
+    Items submitted from any thread are queued; a single worker thread collects the
+    items arriving within `max_wait_ms` of the first one (up to `max_batch_size`),
+    hands them to `process_batch` in one call and resolves each caller's future with
+    its own result. Under load this turns many batch-size-1 calls into a few large
+    ones; an idle system only pays the short wait.
+
+    `process_batch` receives a list of items and must return a list of results of the
+    same length and order. If it raises, every future of the batch gets the exception.
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 32, max_wait_ms: float = 2.0, name: str = "batcher"):
+        """
+        Start the worker thread.
+
+        Args:
+            process_batch (callable): Function mapping a list of items to a list of results.
+            max_batch_size (int): Maximum number of items processed in one call.
+            max_wait_ms (float): Maximum time to wait for more items after the first one.
+            name (str): Name of the worker thread.
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self._batches = 0
+        self._items = 0
+        self._batch_sizes = Counter()
+        self._start()
+
+        # A forked worker process (see serve.py) inherits the batcher but not its thread
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=functools.partial(_restart_in_child, weakref.ref(self)))
+
+    def _start(self) -> None:
+        """
+        Start the worker thread with an empty queue (and fresh locks, after a fork).
+        """
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        """
+        Queue an item for the next batch.
+
+        Args:
+            item: The item to process.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the item's result. Cancelling it before
+            its batch starts removes the item from the batch.
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self, first) -> tuple:
+        """
+        Collect the batch started by `first`.
+
+        Returns:
+            tuple: (list of (item, future) pairs, True if the batcher is stopping).
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Take what is already queued even once the deadline has passed
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        """
+        Worker loop: collect a batch, process it and resolve the futures.
+        """
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stopping = self._collect(first)
+
+            # Skip items whose caller already gave up
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def close(self) -> None:
+        """
+        Stop the worker thread once the items already queued are processed.
+        """
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        """
+        Return the batching metrics.
+
+        Returns:
+            dict: Current queue depth, number of batches and items processed, average
+            and maximum batch size, and the batch size histogram.
+        """
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+                "max_batch_size": max(self._batch_sizes) if self._batch_sizes else 0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
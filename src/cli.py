@@ -1,47 +1,43 @@
 # Import necessary modules for query retrieval and LLM handling
+import argparse
+import asyncio
 
-#from src.query_retrieval import query_retrieval  # Uncomment this if using relative imports
-#from src.llm_handler import call_llm            # Uncomment this if using relative imports
+#from src.config import INDEX_PATH, METADATA_PATH, RELEVANCE_GATE, BATCH_LLM_CONCURRENCY  # Uncomment this if using relative imports
+from config import INDEX_PATH, METADATA_PATH, RELEVANCE_GATE, BATCH_LLM_CONCURRENCY  # Shared settings
 
-from query_retrieval import query_retrieval      # Import for query retrieval logic
-from llm_handler import call_llm                # Import for handling LLM queries
+# The pipeline modules (pandas, FAISS, the OpenAI client and the encoder) are imported by the
+# commands that use them, so that `--help` and argument errors return immediately
 
-def analyze_query_with_llm(query: str) -> bool:
-    """
-    Analyze the user's query using GPT-3.5-turbo to determine if it is related to depression drug recommendations.
-
-    Args:
-        query (str): The user's query to analyze.
-
-    Returns:
-        bool: True if the query is related to depression drug recommendations, False otherwise.
-    """
-    prompt = (
-        f"You are an assistant that determines whether a query is related to depression drug recommendations. "
-        f"Only respond with 'Yes' or 'No'. Here are examples of related queries:\n"
-        f"- 'Which drug works best for depression in women aged 30 to 40?'\n"
-        f"- 'Is Prozac effective for treating anxiety along with depression?'\n"
-        f"- 'What are the best-rated drugs for men suffering from depression?'\n\n"
-        f"Now analyze the following query:\n"
-        f"'{query}'\n"
-        f"Is this query related to depression drug recommendations? Respond with 'Yes' or 'No' only."
-    )
-    # Call the LLM with the constructed prompt and analyze the response
-    response = call_llm(prompt, max_tokens=10, temperature=0.2)
-    # Return True if the response is "Yes", otherwise False
-    return response.lower() == "yes"
-
-def main():
+def main(stream: bool = True):
     """
     Command-Line Interface (CLI) for querying the depression drug recommendation system.
 
     Steps:
-        1. Accepts user input (queries).
-        2. Analyzes query relevance using the LLM.
+        1. Loads the retrieval engine once and accepts user input (queries).
+        2. Analyzes query relevance locally, using the LLM only for ambiguous queries.
         3. If relevant, retrieves responses using the FAISS vector database.
-        4. Displays the result or handles errors gracefully.
+        4. Displays the result (incrementally when streaming) or handles errors gracefully.
+
+    Args:
+        stream (bool): Print the response as it is generated instead of all at once.
     """
+    #from src.query_retrieval import query_retrieval, query_retrieval_stream  # Uncomment this if using relative imports
+    #from src.retrieval_engine import get_engine     # Uncomment this if using relative imports
+    #from src.relevance_gate import RelevanceGate, analyze_query_with_llm  # Uncomment this if using relative imports
+    from query_retrieval import query_retrieval, query_retrieval_stream  # Import for query retrieval logic
+    from retrieval_engine import get_engine         # Import for the resident retrieval engine
+    from relevance_gate import RelevanceGate, analyze_query_with_llm  # Import for the relevance gates
+
     print("Welcome to the Depression Treatment Q&A CLI!")
+
+    # Load the index, metadata and embedding model once for the whole session
+    try:
+        engine = get_engine(INDEX_PATH, METADATA_PATH)
+        gate = RelevanceGate(engine) if RELEVANCE_GATE == "local" else None
+    except Exception as e:
+        print(f"Could not load the vector store: {e}")
+        return
+
     print("Type your query below or type 'exit' to quit.\n")
 
     while True:
@@ -60,7 +56,7 @@ def main():
 
         # Analyze the query for relevance
         try:
-            is_related = analyze_query_with_llm(query)
+            is_related = gate.is_related(query) if gate else analyze_query_with_llm(query)
         except Exception as e:
             print(f"An unexpected error occurred during query analysis: {e}\n")
             continue
@@ -73,12 +69,84 @@ def main():
             continue
 
         # Process valid query
+        if not stream:
+            try:
+                response = query_retrieval(query, INDEX_PATH, METADATA_PATH, engine=engine)
+                print(f"Response: {response}\n")
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}\n")
+            continue
+
+        # Print the response piece by piece as the LLM generates it
+        started = False
         try:
-            response = query_retrieval(query, "models/faiss_index", "models/reviews_with_metadata.csv")
-            print(f"Response: {response}\n")
+            for delta in query_retrieval_stream(query, INDEX_PATH, METADATA_PATH, engine=engine):
+                if not started:
+                    print("Response: ", end="", flush=True)
+                    started = True
+                print(delta, end="", flush=True)
+            print("\n")
         except Exception as e:
+            if started:
+                print()
             print(f"An unexpected error occurred: {e}\n")
 
+def run_batch_mode(input_path: str, output_path: str, concurrency: int = BATCH_LLM_CONCURRENCY) -> int:
+    """
+    Answer every query of a JSONL file without the interactive loop.
+
+    Args:
+        input_path (str): JSONL file with one {"query": ..., "id": ...} object per line.
+        output_path (str): JSONL file receiving one result per input line, in order.
+        concurrency (int): Maximum number of queries processed concurrently.
+
+    Returns:
+        int: The process exit code (0 if every query was answered, 1 otherwise).
+    """
+    #from src.retrieval_engine import get_engine     # Uncomment this if using relative imports
+    #from src.relevance_gate import RelevanceGate    # Uncomment this if using relative imports
+    #from src.batch_pipeline import run_batch_file  # Uncomment this if using relative imports
+    #from src.llm_handler import llm_client  # Uncomment this if using relative imports
+    from retrieval_engine import get_engine         # Import for the resident retrieval engine
+    from relevance_gate import RelevanceGate        # Import for the local relevance gate
+    from batch_pipeline import run_batch_file       # Import for bulk processing of JSONL files
+    from llm_handler import llm_client              # Import for the shared LLM client
+
+    try:
+        engine = get_engine(INDEX_PATH, METADATA_PATH)
+        gate = RelevanceGate(engine) if RELEVANCE_GATE == "local" else None
+    except Exception as e:
+        print(f"Could not load the vector store: {e}")
+        return 1
+
+    async def run_batch_and_close() -> dict:
+        try:
+            return await run_batch_file(input_path, output_path, engine, gate, concurrency=concurrency)
+        finally:
+            # The LLM connection pool belongs to this event loop
+            await llm_client.aclose()
+
+    try:
+        summary = asyncio.run(run_batch_and_close())
+    except OSError as e:
+        print(f"Could not process the batch: {e}")
+        return 1
+
+    print(f"Processed {summary['queries']} queries: {summary['answered']} answered, {summary['failed']} failed.")
+    print(f"Results saved to {output_path}")
+    return 0 if summary["failed"] == 0 else 1
+
 # Entry point for the CLI application
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Depression Treatment Q&A CLI.")
+    parser.add_argument("--no-stream", action="store_true", help="Print each response only once it is complete.")
+    parser.add_argument("--batch", metavar="IN_JSONL", help="Answer every {\"query\": ...} line of a JSONL file.")
+    parser.add_argument("--out", metavar="OUT_JSONL", help="Output JSONL file for --batch.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_LLM_CONCURRENCY, help="Concurrent queries in --batch mode.")
+    args = parser.parse_args()
+
+    if args.batch:
+        if not args.out:
+            parser.error("--batch requires --out")
+        raise SystemExit(run_batch_mode(args.batch, args.out, args.concurrency))
+    main(stream=not args.no_stream)
@@ -0,0 +1,189 @@
+import os
+
+# Shared settings for the API, CLI and retrieval layer.
+# Every value can be overridden with an environment variable of the same name.
+
+def env_str(name: str, default: str) -> str:
+    """
+    Read a string setting from the environment.
+
+    Args:
+        name (str): Name of the environment variable.
+        default (str): Value used when the variable is not set.
+
+    Returns:
+        str: The configured value.
+    """
+    return os.environ.get(name, default)
+
+def env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment.
+
+    Args:
+        name (str): Name of the environment variable.
+        default (int): Value used when the variable is not set.
+
+    Returns:
+        int: The configured value.
+    """
+    return int(os.environ.get(name, default))
+
+def env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment.
+
+    Args:
+        name (str): Name of the environment variable.
+        default (float): Value used when the variable is not set.
+
+    Returns:
+        float: The configured value.
+    """
+    return float(os.environ.get(name, default))
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting from the environment ("1", "true", "yes" and "on" are truthy).
+
+    Args:
+        name (str): Name of the environment variable.
+        default (bool): Value used when the variable is not set.
+
+    Returns:
+        bool: The configured value.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# Paths of the artifacts written by vector_store.py
+INDEX_PATH = env_str("INDEX_PATH", "models/faiss_index")
+METADATA_PATH = env_str("METADATA_PATH", "models/reviews_with_metadata.csv")
+
+# Embedding model shared by indexing and querying
+EMBEDDING_MODEL = env_str("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Query encoder backend: "sentence_transformers" (fp32, the model that built the index), "torch"
+# (the same fp32 model run directly through transformers), "torch_int8" (dynamically quantized
+# to int8) or "onnx_int8" (int8 ONNX Runtime export written to ONNX_MODEL_DIR by
+# `python src/query_encoder.py --export-onnx`). A quantized backend is checked against
+# QUERY_ENCODER_PARITY_SAMPLE embeddings stored in the index when the engine starts, and
+# rejected if their mean cosine similarity is below QUERY_ENCODER_MIN_COSINE (0: no check)
+QUERY_ENCODER = env_str("QUERY_ENCODER", "sentence_transformers")
+ONNX_MODEL_DIR = env_str("ONNX_MODEL_DIR", "models/onnx_int8")
+QUERY_ENCODER_PARITY_SAMPLE = env_int("QUERY_ENCODER_PARITY_SAMPLE", 64)
+QUERY_ENCODER_MIN_COSINE = env_float("QUERY_ENCODER_MIN_COSINE", 0.98)
+
+# Memory-map the FAISS index rather than copying it into each process, so that API workers
+# share one copy in the page cache
+INDEX_MMAP = env_bool("INDEX_MMAP", True)
+
+# Number of reviews retrieved per query
+TOP_K = env_int("TOP_K", 5)
+
+# Prompt context: CONTEXT_FETCH_K reviews are retrieved, near-duplicates (cosine similarity of
+# at least CONTEXT_DEDUP_THRESHOLD) are dropped, up to TOP_K of the rest are picked by maximal
+# marginal relevance (CONTEXT_MMR_LAMBDA: 1.0 ranks by relevance only, lower values favour
+# diversity) and written as a compact table of at most CONTEXT_TOKEN_BUDGET tokens (0: unlimited)
+CONTEXT_FETCH_K = env_int("CONTEXT_FETCH_K", 15)
+CONTEXT_DEDUP_THRESHOLD = env_float("CONTEXT_DEDUP_THRESHOLD", 0.95)
+CONTEXT_MMR_LAMBDA = env_float("CONTEXT_MMR_LAMBDA", 0.7)
+CONTEXT_TOKEN_BUDGET = env_int("CONTEXT_TOKEN_BUDGET", 800)
+
+# Seconds between two checks for a rebuilt vector store (hot reload)
+RELOAD_CHECK_INTERVAL = env_float("RELOAD_CHECK_INTERVAL", 5.0)
+
+# Local relevance gate: scores at or above the accept threshold are accepted and scores
+# at or below the reject threshold are rejected without an LLM call
+RELEVANCE_GATE = env_str("RELEVANCE_GATE", "local")  # "local" or "llm"
+RELEVANCE_ACCEPT_THRESHOLD = env_float("RELEVANCE_ACCEPT_THRESHOLD", 0.10)
+RELEVANCE_REJECT_THRESHOLD = env_float("RELEVANCE_REJECT_THRESHOLD", -0.02)
+RELEVANCE_CORPUS_SAMPLE = env_int("RELEVANCE_CORPUS_SAMPLE", 500)
+
+# LLM response cache: in-memory LRU tier plus an optional SQLite tier shared across workers
+LLM_CACHE_ENABLED = env_bool("LLM_CACHE_ENABLED", True)
+LLM_CACHE_MAX_ENTRIES = env_int("LLM_CACHE_MAX_ENTRIES", 1024)
+LLM_CACHE_TTL = env_float("LLM_CACHE_TTL", 86400.0)
+LLM_CACHE_PATH = env_str("LLM_CACHE_PATH", "")  # e.g. "models/llm_cache.sqlite"; empty disables the disk tier
+LLM_CACHE_DISK_MAX_ENTRIES = env_int("LLM_CACHE_DISK_MAX_ENTRIES", 100000)
+
+# Semantic answer cache: reuse the answer of a previous query whose embedding is at least
+# this similar (cosine) and, when verification is on, that retrieved the same reviews
+SEMANTIC_CACHE_ENABLED = env_bool("SEMANTIC_CACHE_ENABLED", True)
+SEMANTIC_CACHE_THRESHOLD = env_float("SEMANTIC_CACHE_THRESHOLD", 0.95)
+SEMANTIC_CACHE_MAX_ENTRIES = env_int("SEMANTIC_CACHE_MAX_ENTRIES", 1000)
+SEMANTIC_CACHE_VERIFY_IDS = env_bool("SEMANTIC_CACHE_VERIFY_IDS", True)
+
+# Threads running CPU-bound encoder and FAISS work for the async API
+RETRIEVAL_EXECUTOR_WORKERS = env_int("RETRIEVAL_EXECUTOR_WORKERS", 4)
+
+# Dynamic micro-batching of query encoding and FAISS searches across concurrent requests
+DYNAMIC_BATCHING = env_bool("DYNAMIC_BATCHING", True)
+BATCH_MAX_SIZE = env_int("BATCH_MAX_SIZE", 32)
+BATCH_MAX_WAIT_MS = env_float("BATCH_MAX_WAIT_MS", 2.0)
+
+# Bulk processing (/recommend/batch and `cli.py --batch`)
+BATCH_LLM_CONCURRENCY = env_int("BATCH_LLM_CONCURRENCY", 8)
+BATCH_MAX_QUERIES = env_int("BATCH_MAX_QUERIES", 1000)
+
+# Query-time knobs of approximate (IVF/HNSW) indexes; 0 keeps the values stored with the index
+INDEX_NPROBE = env_int("INDEX_NPROBE", 0)
+INDEX_EF_SEARCH = env_int("INDEX_EF_SEARCH", 0)
+
+# Structured pre-filtering: restrict searches to the reviews matching the gender, age and
+# drug named in the query; subsets up to FILTER_EXACT_MAX reviews are scanned directly
+FILTERED_SEARCH = env_bool("FILTERED_SEARCH", True)
+FILTER_EXACT_MAX = env_int("FILTER_EXACT_MAX", 20000)
+
+# Rating aggregates precomputed by vector_store.py over drug x gender x age x condition.
+# Ranking questions ("Which drug works best for women over 50?") are passed to the LLM as
+# compact statistics next to the retrieved reviews ("context"), answered from them without
+# an LLM call ("direct"), or not detected at all ("off"). Drugs with fewer than
+# RATING_CUBE_MIN_REVIEWS reviews are only ranked when no drug has enough
+RATING_CUBE_MODE = env_str("RATING_CUBE_MODE", "context")
+RATING_CUBE_TOP = env_int("RATING_CUBE_TOP", 5)
+RATING_CUBE_MIN_REVIEWS = env_int("RATING_CUBE_MIN_REVIEWS", 5)
+
+# Per-stage latency histograms, token and cache counters served at /metrics; the X-Timing
+# breakdown header is added to every response when TIMING_HEADER is on, and to requests
+# sending an `X-Timing` header otherwise
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+TIMING_HEADER = env_bool("TIMING_HEADER", False)
+
+# LLM client: pooled keep-alive connections, per-attempt timeouts (seconds; LLM_TIMEOUT bounds
+# a whole async attempt but each read of a sync one), retries with jittered exponential
+# backoff on 429/5xx (not on an exhausted quota), a process-wide concurrency cap, a request
+# rate limit (requests per second; 0 is unlimited) and a circuit breaker that fails fast
+# after LLM_BREAKER_FAILURES consecutive upstream failures, for LLM_BREAKER_RESET seconds
+LLM_POOL_SIZE = env_int("LLM_POOL_SIZE", 32)
+LLM_TIMEOUT = env_float("LLM_TIMEOUT", 30.0)
+LLM_CONNECT_TIMEOUT = env_float("LLM_CONNECT_TIMEOUT", 5.0)
+LLM_MAX_RETRIES = env_int("LLM_MAX_RETRIES", 3)
+LLM_BACKOFF_BASE = env_float("LLM_BACKOFF_BASE", 0.5)
+LLM_BACKOFF_MAX = env_float("LLM_BACKOFF_MAX", 8.0)
+LLM_MAX_CONCURRENCY = env_int("LLM_MAX_CONCURRENCY", 16)
+LLM_RATE_LIMIT = env_float("LLM_RATE_LIMIT", 0.0)
+LLM_RATE_BURST = env_int("LLM_RATE_BURST", 10)
+LLM_BREAKER_FAILURES = env_int("LLM_BREAKER_FAILURES", 5)
+LLM_BREAKER_RESET = env_float("LLM_BREAKER_RESET", 30.0)
+
+# Admission control of /recommend and /recommend/stream: at most ADMISSION_RETRIEVE_CONCURRENCY
+# requests run the encode/gate/search stage (default: one micro-batch) and
+# ADMISSION_GENERATE_CONCURRENCY the generation stage (default: the LLM client's concurrency)
+# at once; up to ADMISSION_MAX_QUEUE more wait for each stage, for at most
+# ADMISSION_QUEUE_TIMEOUT seconds. Requests beyond that are answered 429 with a Retry-After
+# header. Concurrent identical queries share one pipeline run when REQUEST_COALESCING is on
+ADMISSION_CONTROL = env_bool("ADMISSION_CONTROL", True)
+ADMISSION_RETRIEVE_CONCURRENCY = env_int("ADMISSION_RETRIEVE_CONCURRENCY", BATCH_MAX_SIZE)
+ADMISSION_GENERATE_CONCURRENCY = env_int("ADMISSION_GENERATE_CONCURRENCY", LLM_MAX_CONCURRENCY)
+ADMISSION_MAX_QUEUE = env_int("ADMISSION_MAX_QUEUE", 64)
+ADMISSION_QUEUE_TIMEOUT = env_float("ADMISSION_QUEUE_TIMEOUT", 5.0)
+REQUEST_COALESCING = env_bool("REQUEST_COALESCING", True)
+
+# Multi-worker serving (`python src/serve.py`): the index, metadata and models are loaded
+# once and shared by API_WORKERS forked worker processes listening on API_HOST:API_PORT
+API_HOST = env_str("API_HOST", "127.0.0.1")
+API_PORT = env_int("API_PORT", 8000)
+API_WORKERS = env_int("API_WORKERS", 1)
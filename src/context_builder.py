@@ -0,0 +1,234 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import tiktoken
+except ImportError:  # Optional: token counts fall back to a local approximation
+    tiktoken = None
+
+#from src.config import TOP_K, CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_MMR_LAMBDA  # Uncomment this if using relative imports
+from config import TOP_K, CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_MMR_LAMBDA  # Context size and selection settings
+
+# Columns of the compact context table: (metadata column, table heading)
+CONTEXT_COLUMNS = [
+    ("drug_name", "drug"),
+    ("condition", "condition"),
+    ("gender", "gender"),
+    ("age", "age"),
+    ("time_on_drug", "time on drug"),
+    ("rating_overall", "rating"),
+    ("text", "review"),
+]
+
+# Words, numbers and single punctuation marks: the pieces counted by the approximate tokenizer
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# Marks a review shortened to fit the token budget
+ELLIPSIS = "..."
+
+_encoding = None
+
+def _get_encoding():
+    """
+    Return the tiktoken encoding of the chat models, loaded on first use, or None without tiktoken.
+    """
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+def _piece_tokens(piece: str) -> int:
+    """
+    Approximate token count of one word or punctuation mark: long words count as several tokens.
+    """
+    return 1 + (len(piece) - 1) // 8
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text.
+
+    Uses the `cl100k_base` encoding of the OpenAI chat models when `tiktoken` is installed,
+    and otherwise a local approximation that counts words and punctuation marks, long
+    words counting as several tokens.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(_piece_tokens(match[0]) for match in _PIECES.finditer(text))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text to at most `max_tokens` tokens, as counted by `count_tokens`.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The token limit.
+
+    Returns:
+        str: The text itself if it fits, otherwise its longest prefix that fits together
+        with a trailing "..." (empty if even that does not fit).
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Room for the prefix once the ellipsis is counted
+    limit = max_tokens - count_tokens(ELLIPSIS)
+    if limit <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:limit]).rstrip() + ELLIPSIS
+    used = 0
+    for match in _PIECES.finditer(text):
+        used += _piece_tokens(match[0])
+        if used > limit:
+            return text[:match.start()].rstrip() + ELLIPSIS
+    return text
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale vectors to unit length, so that dot products are cosine similarities.
+    """
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def select_reviews(
+    retrieved_metadata: pd.DataFrame,
+    query_embedding: np.ndarray = None,
+    vectors: np.ndarray = None,
+    max_reviews: int = TOP_K,
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+    mmr_lambda: float = CONTEXT_MMR_LAMBDA,
+) -> pd.DataFrame:
+    """
+    Pick the reviews worth sending to the LLM out of an over-fetched candidate list.
+
+    Reviews with the same text as a better-ranked one are dropped. With the candidates'
+    embeddings, reviews are then picked one at a time by maximal marginal relevance:
+    each step takes the review maximizing `mmr_lambda * similarity to the query -
+    (1 - mmr_lambda) * highest similarity to a review already picked`, and drops the
+    remaining candidates at least `dedup_threshold` similar (cosine) to it. Without
+    embeddings, the first `max_reviews` distinct reviews are kept.
+
+    Args:
+        retrieved_metadata (pd.DataFrame): The candidates, most similar first.
+        query_embedding (np.ndarray): The (1, dimension) query embedding.
+        vectors (np.ndarray): The (len(retrieved_metadata), dimension) candidate embeddings.
+        max_reviews (int): Maximum number of reviews selected.
+        dedup_threshold (float): Cosine similarity above which two reviews are near-duplicates.
+        mmr_lambda (float): Weight of relevance against diversity (1.0: relevance only).
+
+    Returns:
+        pd.DataFrame: The selected rows, in selection order.
+    """
+    text_column = "text" if "text" in retrieved_metadata.columns else "combined_text"
+    seen, distinct = set(), []
+    for position, text in enumerate(retrieved_metadata[text_column].tolist()):
+        key = str(text).strip().lower()
+        if key not in seen:
+            seen.add(key)
+            distinct.append(position)
+    if vectors is None or query_embedding is None:
+        return retrieved_metadata.iloc[distinct[:max_reviews]]
+
+    positions = np.array(distinct, dtype="int64")
+    candidates = _normalize_rows(np.asarray(vectors)[positions])
+    relevance = candidates @ _normalize_rows(query_embedding).reshape(-1)
+    similarity = candidates @ candidates.T
+
+    selected = []
+    remaining = np.arange(len(positions))
+    redundancy = np.zeros(len(positions), dtype="float32")
+    while len(remaining) and len(selected) < max_reviews:
+        scores = mmr_lambda * relevance[remaining] - (1.0 - mmr_lambda) * redundancy[remaining]
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[:, best])
+        remaining = remaining[(remaining != best) & (similarity[remaining, best] < dedup_threshold)]
+    return retrieved_metadata.iloc[positions[selected]]
+
+def _cell(value) -> str:
+    """
+    Format one value of the context table on a single line.
+    """
+    if pd.isna(value):
+        return "-"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split()).replace("|", "/")
+
+def format_context(reviews: pd.DataFrame, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Write reviews as a compact table of at most `budget` tokens.
+
+    Each review is one "drug | condition | gender | age | time on drug | rating | review" row
+    under a single heading line, instead of repeating "Drug Name: ... | Condition: ..."
+    labels in every review. Rows are added in order while they fit; the review text of the
+    first row that does not fit is shortened to the remaining budget. Metadata without
+    these columns is written as its `combined_text` lines.
+
+    Args:
+        reviews (pd.DataFrame): The selected reviews.
+        budget (int): The token budget of the context (0: unlimited).
+
+    Returns:
+        str: The context.
+    """
+    columns = [(column, heading) for column, heading in CONTEXT_COLUMNS if column in reviews.columns]
+    if not any(column == "text" for column, _ in columns):
+        lines, prefix = [], None
+        texts = reviews["combined_text"].astype(str).tolist()
+    else:
+        prefix = [" | ".join(heading for _, heading in columns)]
+        lines = list(prefix)
+        values = [reviews[column].tolist() for column, _ in columns]
+        texts = [" | ".join(_cell(value) for value in row) for row in zip(*values)]
+
+    used = sum(count_tokens(line) + 1 for line in lines)
+    for text in texts:
+        tokens = count_tokens(text) + 1
+        if budget and used + tokens > budget:
+            # Shorten the row to the remaining budget, keeping at least a few words of review
+            shortened = truncate_tokens(text, budget - used - 1)
+            if count_tokens(shortened) >= min(tokens, 16):
+                lines.append(shortened)
+            break
+        lines.append(text)
+        used += tokens
+    if prefix is not None and len(lines) == len(prefix):
+        return ""
+    return "\n".join(lines)
+
+def build_context(
+    retrieved_metadata: pd.DataFrame,
+    query_embedding: np.ndarray = None,
+    vectors: np.ndarray = None,
+    max_reviews: int = TOP_K,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """
+    Build the LLM context from the retrieved reviews.
+
+    Selects at most `max_reviews` distinct, diverse reviews (see `select_reviews`) and writes
+    them as a compact table within the token budget (see `format_context`).
+
+    Args:
+        retrieved_metadata (pd.DataFrame): The retrieved rows, most similar first.
+        query_embedding (np.ndarray): The (1, dimension) query embedding, if available.
+        vectors (np.ndarray): The embeddings of the retrieved rows, if available.
+        max_reviews (int): Maximum number of reviews in the context.
+        budget (int): The token budget of the context (0: unlimited).
+
+    Returns:
+        str: The context.
+    """
+    reviews = select_reviews(retrieved_metadata, query_embedding, vectors, max_reviews)
+    return format_context(reviews, budget)
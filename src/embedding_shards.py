@@ -0,0 +1,238 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+
+# Encoder of the current worker process, loaded once by `_init_worker`
+_worker_model = None
+
+def _init_worker(model_name: str, threads: int) -> None:
+    """
+    Load the encoder once per worker process and share the cores between workers.
+    """
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(max(1, threads))
+    _worker_model = SentenceTransformer(model_name)
+
+def _encode_shard(texts: list, path: str, batch_size: int) -> int:
+    """
+    Encode one shard and write it as a float16 `.npy` file.
+
+    The file is written under a temporary name and renamed when complete, so a shard
+    file that exists is always whole.
+
+    Returns:
+        int: The embedding dimension.
+    """
+    embeddings = _worker_model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    shard = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype="float16", shape=embeddings.shape)
+    shard[:] = embeddings
+    shard.flush()
+    del shard
+    os.replace(path + ".tmp", path)
+    return embeddings.shape[1]
+
+def shard_fingerprint(keys) -> str:
+    """
+    Fingerprint the content of a shard, e.g. from the review IDs and content hashes of its rows.
+
+    Args:
+        keys (iterable): One string per row; changing any row changes the fingerprint.
+
+    Returns:
+        str: A hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for key in keys:
+        digest.update(str(key).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+def _read_manifest(shard_dir: str) -> dict:
+    """
+    Load the manifest of a shard directory, or None if there is none.
+    """
+    try:
+        with open(os.path.join(shard_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _write_manifest(shard_dir: str, manifest: dict) -> None:
+    """
+    Save the manifest atomically, so an interrupted run leaves the previous checkpoint intact.
+    """
+    path = os.path.join(shard_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def embed_sharded(
+    texts: list,
+    keys: list,
+    shard_dir: str,
+    model_name: str,
+    shard_size: int = 20000,
+    workers: int = 1,
+    batch_size: int = 64,
+) -> "ShardedEmbeddings":
+    """
+    Embed a corpus shard by shard, resuming from the shards of an interrupted run.
+
+    Workflow:
+    1. Split the corpus into shards of `shard_size` texts and fingerprint each one.
+    2. Skip the shards that the manifest records as complete with the same fingerprint
+       and model, so an interrupted (or repeated) run only encodes what is missing.
+    3. Encode the remaining shards in `workers` processes, each loading the model once
+       and using its share of the CPU cores.
+    4. Write each shard to a float16 `.npy` file and record it in the manifest as soon
+       as it is done.
+
+    Shard files left by a previous run over a larger corpus are deleted, and the model
+    is not loaded at all when every shard is reused.
+
+    Args:
+        texts (list): The texts to embed.
+        keys (list): One string per text identifying its content (e.g. review ID and content hash).
+        shard_dir (str): Directory of the shard files and manifest.
+        model_name (str): Name of the SentenceTransformer model.
+        shard_size (int): Number of texts per shard.
+        workers (int): Number of encoder processes; 1 encodes in this process.
+        batch_size (int): Encoder batch size.
+
+    Returns:
+        ShardedEmbeddings: Memory-mapped view of all the embeddings, in input order.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+
+    # Step 1: Plan the shards
+    shards = []
+    for number, start in enumerate(range(0, len(texts), shard_size)):
+        stop = min(len(texts), start + shard_size)
+        shards.append({
+            "file": f"shard_{number:05d}.npy",
+            "start": start,
+            "stop": stop,
+            "fingerprint": shard_fingerprint(keys[start:stop]),
+        })
+
+    # Step 2: Reuse the complete shards of a previous run with the same model
+    previous = _read_manifest(shard_dir)
+    done = {}
+    if previous is not None and previous.get("model") == model_name:
+        done = {shard["file"]: shard for shard in previous["shards"] if shard.get("complete")}
+    manifest = {"model": model_name, "dimension": previous.get("dimension") if previous else None, "shards": shards}
+    todo = []
+    for shard in shards:
+        old = done.get(shard["file"])
+        shard["complete"] = (
+            old is not None
+            and old["fingerprint"] == shard["fingerprint"]
+            and os.path.exists(os.path.join(shard_dir, shard["file"]))
+        )
+        if not shard["complete"]:
+            todo.append(shard)
+    _write_manifest(shard_dir, manifest)
+
+    # Shards past the end of a corpus that shrank are no longer in the manifest
+    planned = {shard["file"] for shard in shards}
+    for name in os.listdir(shard_dir):
+        if name.startswith("shard_") and name.endswith(".npy") and name not in planned:
+            os.remove(os.path.join(shard_dir, name))
+    print(f"Embedding {len(todo)} of {len(shards)} shards ({len(shards) - len(todo)} reused from a previous run).")
+
+    def finish(shard: dict, dimension: int) -> None:
+        shard["complete"] = True
+        manifest["dimension"] = dimension
+        _write_manifest(shard_dir, manifest)
+        completed = sum(s["complete"] for s in shards)
+        elapsed = time.monotonic() - start_time
+        print(f"Shard {shard['file']} done ({completed}/{len(shards)}, {elapsed:.0f}s elapsed).")
+
+    # Steps 3-4: Encode the missing shards and checkpoint each one
+    start_time = time.monotonic()
+    if workers <= 1 and todo:
+        _init_worker(model_name, os.cpu_count() or 1)
+        for shard in todo:
+            path = os.path.join(shard_dir, shard["file"])
+            finish(shard, _encode_shard(texts[shard["start"]:shard["stop"]], path, batch_size))
+    elif todo:
+        # Spawned workers do not inherit the parent's torch thread pools
+        context = multiprocessing.get_context("spawn")
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(model_name, threads)) as pool:
+            pending = deque()
+            for shard in todo:
+                path = os.path.join(shard_dir, shard["file"])
+                pending.append((shard, pool.submit(_encode_shard, texts[shard["start"]:shard["stop"]], path, batch_size)))
+                # Keep the texts of at most two shards per worker in flight
+                while len(pending) >= 2 * workers or (pending and pending[0][1].done()):
+                    shard_done, future = pending.popleft()
+                    finish(shard_done, future.result())
+            while pending:
+                shard_done, future = pending.popleft()
+                finish(shard_done, future.result())
+
+    return ShardedEmbeddings(shard_dir)
+
+class ShardedEmbeddings:
+    """
+    Read-only, memory-mapped view of the embeddings written by `embed_sharded`.
+
+    Embeddings are stored as float16 and returned as float32, a block at a time, so the
+    full matrix never has to be in memory.
+    """
+
+    def __init__(self, shard_dir: str):
+        """
+        Open the shards recorded in the manifest.
+
+        Raises:
+            ValueError: If the manifest is missing or some shards are incomplete.
+        """
+        manifest = _read_manifest(shard_dir)
+        if manifest is None or not all(shard["complete"] for shard in manifest["shards"]):
+            raise ValueError(f"The embedding shards in {shard_dir} are missing or incomplete.")
+        self.shards = [
+            (shard["start"], np.load(os.path.join(shard_dir, shard["file"]), mmap_mode="r"))
+            for shard in manifest["shards"]
+        ]
+        self.dimension = manifest["dimension"]
+        self._starts = np.array([start for start, _ in self.shards], dtype="int64")
+        self._length = self.shards[-1][0] + len(self.shards[-1][1]) if self.shards else 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, positions) -> np.ndarray:
+        """
+        Gather the embeddings at the given sorted positions.
+
+        Returns:
+            np.ndarray: A (len(positions), dimension) float32 array.
+        """
+        positions = np.asarray(positions, dtype="int64")
+        out = np.empty((len(positions), self.dimension), dtype="float32")
+        owners = np.searchsorted(self._starts, positions, side="right") - 1
+        for owner in np.unique(owners):
+            selected = owners == owner
+            start, shard = self.shards[owner]
+            out[selected] = shard[positions[selected] - start]
+        return out
+
+    def iter_blocks(self):
+        """
+        Yield (start, float32 block) pairs, one per shard, in order.
+        """
+        for start, shard in self.shards:
+            yield start, np.asarray(shard, dtype="float32")
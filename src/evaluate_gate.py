@@ -0,0 +1,127 @@
+import argparse
+import json
+import time
+
+#from src.retrieval_engine import get_engine  # Uncomment this if using relative imports
+#from src.relevance_gate import RelevanceGate, analyze_query_with_llm, RELATED_EXAMPLES, UNRELATED_EXAMPLES  # Uncomment this if using relative imports
+#from src.config import INDEX_PATH, METADATA_PATH, RELEVANCE_ACCEPT_THRESHOLD, RELEVANCE_REJECT_THRESHOLD  # Uncomment this if using relative imports
+from retrieval_engine import get_engine  # Resident FAISS index, metadata and encoder
+from relevance_gate import RelevanceGate, analyze_query_with_llm, RELATED_EXAMPLES, UNRELATED_EXAMPLES  # Relevance gates
+from config import INDEX_PATH, METADATA_PATH, RELEVANCE_ACCEPT_THRESHOLD, RELEVANCE_REJECT_THRESHOLD  # Gate settings
+
+# Labelled queries held out from the examples the gate's centroids are built from
+GATE_EVAL_PATH = "data/gate_eval.jsonl"
+
+def load_queries(file_path: str = GATE_EVAL_PATH) -> list:
+    """
+    Load the evaluation queries.
+
+    Args:
+        file_path (str): JSONL file with one {"query": ..., "label": true/false} object per line
+            (the label is optional). Defaults to the held-out set in `data/gate_eval.jsonl`.
+
+    Returns:
+        list: A list of (query, label) tuples; label is None when unknown.
+
+    Raises:
+        ValueError: If a query is one of the gate's own labelled examples, which would
+        make the evaluation in-sample.
+    """
+    examples = set(RELATED_EXAMPLES) | set(UNRELATED_EXAMPLES)
+    queries = []
+    with open(file_path, "r") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if item["query"] in examples:
+                    raise ValueError(f"Error: '{item['query']}' is one of the gate's labelled examples.")
+                queries.append((item["query"], item.get("label")))
+    return queries
+
+def evaluate_gate(gate: RelevanceGate, queries: list) -> dict:
+    """
+    Compare the local relevance gate with the LLM gate on a set of queries.
+
+    Args:
+        gate (RelevanceGate): The local gate to evaluate.
+        queries (list): A list of (query, label) tuples.
+
+    Returns:
+        dict: A report with the share of queries decided locally, the agreement rate with
+        the LLM gate on those queries, the average local scoring latency and, over the
+        labelled queries, the accuracy of the local gate, the LLM gate and the combined
+        decision (local when decided, LLM otherwise).
+    """
+    decided = agreed = 0
+    labelled = labelled_decided = local_correct = llm_correct = gate_correct = 0
+    local_seconds = 0.0
+    rows = []
+
+    for query, label in queries:
+        # Encode outside the timed section: the embedding is shared with retrieval
+        embedding = gate.engine.encode([query])[0]
+        start = time.perf_counter()
+        local = gate.classify(query, embedding)
+        local_seconds += time.perf_counter() - start
+
+        llm = analyze_query_with_llm(query)
+        if local is not None:
+            decided += 1
+            agreed += int(local == llm)
+        if label is not None:
+            labelled += 1
+            llm_correct += int(llm == label)
+            gate_correct += int((llm if local is None else local) == label)
+            if local is not None:
+                labelled_decided += 1
+                local_correct += int(local == label)
+        rows.append({"query": query, "label": label, "score": gate.score(embedding), "local": local, "llm": llm})
+
+    total = len(queries)
+    return {
+        "queries": total,
+        "labelled": labelled,
+        "accept_threshold": gate.accept_threshold,
+        "reject_threshold": gate.reject_threshold,
+        "decided_locally": decided / total if total else 0.0,
+        "sent_to_llm": (total - decided) / total if total else 0.0,
+        "agreement_with_llm": agreed / decided if decided else 0.0,
+        "local_accuracy": local_correct / labelled_decided if labelled_decided else 0.0,
+        "llm_accuracy": llm_correct / labelled if labelled else 0.0,
+        "gate_accuracy": gate_correct / labelled if labelled else 0.0,
+        "avg_local_ms": 1000 * local_seconds / total if total else 0.0,
+        "rows": rows,
+    }
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Runs every query through the local gate and the LLM gate and prints the agreement and accuracy report.
+    """
+    parser = argparse.ArgumentParser(description="Measure the agreement of the local relevance gate with the LLM gate.")
+    parser.add_argument("--queries", default=GATE_EVAL_PATH, help=f"JSONL file of {{\"query\": ..., \"label\": ...}} objects (default: {GATE_EVAL_PATH}).")
+    parser.add_argument("--accept-threshold", type=float, default=RELEVANCE_ACCEPT_THRESHOLD)
+    parser.add_argument("--reject-threshold", type=float, default=RELEVANCE_REJECT_THRESHOLD)
+    parser.add_argument("--verbose", action="store_true", help="Print the score and both decisions for every query.")
+    args = parser.parse_args()
+
+    gate = RelevanceGate(
+        get_engine(INDEX_PATH, METADATA_PATH),
+        accept_threshold=args.accept_threshold,
+        reject_threshold=args.reject_threshold,
+    )
+    report = evaluate_gate(gate, load_queries(args.queries))
+
+    if args.verbose:
+        for row in report["rows"]:
+            print(f"{row['score']:+.3f}  label={row['label']!s:5}  local={row['local']!s:5}  llm={row['llm']!s:5}  {row['query']}")
+    print(f"Queries evaluated:       {report['queries']}")
+    print(f"Decided locally:         {report['decided_locally']:.1%}")
+    print(f"Sent to the LLM:         {report['sent_to_llm']:.1%}")
+    print(f"Agreement with LLM gate: {report['agreement_with_llm']:.1%}")
+    if report["labelled"]:
+        print(f"Labelled queries:        {report['labelled']}")
+        print(f"Local gate accuracy:     {report['local_accuracy']:.1%} (queries decided locally)")
+        print(f"LLM gate accuracy:       {report['llm_accuracy']:.1%}")
+        print(f"Combined gate accuracy:  {report['gate_accuracy']:.1%}")
+    print(f"Average local decision:  {report['avg_local_ms']:.3f} ms")
@@ -0,0 +1,230 @@
+import json
+import math
+import os
+
+import faiss
+import numpy as np
+
+# Supported index types and the FAISS factory string of each
+INDEX_TYPES = {
+    "flat": "Flat",            # Exact brute-force search
+    "ivf_flat": "IVF{nlist},Flat",    # Inverted lists over full vectors
+    "ivf_pq": "IVF{nlist},PQ{pq_m}",  # Inverted lists over product-quantized codes
+    "hnsw": "HNSW{hnsw_m},Flat",      # Hierarchical navigable small-world graph
+    "sq8": "SQ8",              # Brute-force search over 8-bit scalar-quantized vectors
+}
+
+# Default query-time knobs, stored next to the index and applied when it is loaded
+DEFAULT_SEARCH_PARAMS = {"nprobe": 16, "efSearch": 64}
+
+def default_nlist(num_vectors: int) -> int:
+    """
+    Choose the number of IVF lists for a corpus: about 4 * sqrt(n), with at least
+    39 training points per list.
+
+    Args:
+        num_vectors (int): Number of vectors in the corpus.
+
+    Returns:
+        int: The number of inverted lists.
+    """
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+def build_index(index_type: str, dimension: int, num_vectors: int, nlist: int = None, pq_m: int = 16, hnsw_m: int = 32) -> faiss.Index:
+    """
+    Create an empty FAISS index of the requested type, addressed by review ID.
+
+    IVF indexes store the review IDs in their inverted lists and keep a direct map from
+    ID to list entry, so that vectors can be reconstructed and removed by review ID. The
+    other types are wrapped in `IndexIDMap2`. (An ID map around an IVF index would break
+    both: IVF indexes do not renumber their entries when vectors are removed.)
+
+    Args:
+        index_type (str): One of `INDEX_TYPES`.
+        dimension (int): Dimension of the embeddings.
+        num_vectors (int): Expected corpus size, used to size the IVF lists.
+        nlist (int): Number of IVF lists (default: `default_nlist(num_vectors)`).
+        pq_m (int): Number of PQ sub-quantizers; must divide `dimension`.
+        hnsw_m (int): Number of HNSW neighbours per node.
+
+    Returns:
+        faiss.Index: The untrained index.
+
+    Raises:
+        ValueError: If the index type is unknown or the parameters are invalid.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}.")
+    if index_type == "ivf_pq" and dimension % pq_m != 0:
+        raise ValueError(f"pq_m ({pq_m}) must divide the embedding dimension ({dimension}).")
+
+    description = INDEX_TYPES[index_type].format(
+        nlist=nlist or default_nlist(num_vectors), pq_m=pq_m, hnsw_m=hnsw_m
+    )
+    index = faiss.index_factory(dimension, description, faiss.METRIC_L2)
+    if isinstance(index, faiss.IndexIVF):
+        enable_reconstruct(index)
+        return index
+    return faiss.IndexIDMap2(index)
+
+def enable_reconstruct(index: faiss.Index) -> None:
+    """
+    Give an IVF index the direct map needed to reconstruct vectors by ID, if it has none.
+
+    The hash table map accepts any ID and supports removals. It is saved with the index;
+    indexes written without it get one when they are loaded. Other index types are left as they are.
+
+    Args:
+        index (faiss.Index): The index, possibly wrapped in an ID map.
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+def select_training_sample(embeddings: np.ndarray, index: faiss.Index, max_points: int = 100000, seed: int = 0) -> np.ndarray:
+    """
+    Pick the vectors used to train an IVF or PQ index.
+
+    Takes a uniform random sample large enough for the index's quantizers (64 points
+    per IVF list, and at least 39 points per centroid of the 256-entry PQ codebooks),
+    capped at `max_points`.
+
+    Args:
+        embeddings (np.ndarray): The corpus embeddings, or any object indexable by an array
+            of positions (e.g. `ShardedEmbeddings`).
+        index (faiss.Index): The index to train.
+        max_points (int): Upper bound on the sample size.
+        seed (int): Random seed, for reproducible builds.
+
+    Returns:
+        np.ndarray: The training vectors.
+    """
+    wanted = 39 * 256
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        wanted = max(wanted, 64 * ivf.nlist)
+    wanted = min(len(embeddings), wanted, max_points)
+
+    if wanted >= len(embeddings):
+        positions = np.arange(len(embeddings))
+    else:
+        rng = np.random.default_rng(seed)
+        positions = np.sort(rng.choice(len(embeddings), size=wanted, replace=False))
+    return np.asarray(embeddings[positions], dtype="float32")
+
+def supports_removal(index_type: str) -> bool:
+    """
+    Return True if vectors can be removed from this index type (needed by incremental updates).
+    """
+    return index_type != "hnsw"
+
+def params_path(index_path: str) -> str:
+    """
+    Return the path of the JSON file holding an index's type and query-time knobs.
+    """
+    return index_path + ".json"
+
+def write_index_params(index_path: str, params: dict) -> None:
+    """
+    Save the index type and query-time knobs next to the index.
+
+    Args:
+        index_path (str): Path of the FAISS index file.
+        params (dict): The parameters, e.g. {"index_type": "ivf_flat", "nprobe": 16}.
+    """
+    path = params_path(index_path)
+    with open(path + ".tmp", "w") as f:
+        json.dump(params, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def read_index_params(index_path: str) -> dict:
+    """
+    Load the parameters saved by `write_index_params`.
+
+    Args:
+        index_path (str): Path of the FAISS index file.
+
+    Returns:
+        dict: The parameters, or {"index_type": "flat"} for stores written without them.
+    """
+    try:
+        with open(params_path(index_path), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"index_type": "flat"}
+
+def read_index(index_path: str, mmap: bool = False) -> faiss.Index:
+    """
+    Read a FAISS index, optionally memory-mapping its vectors instead of copying them to memory.
+
+    A memory-mapped index is backed by the page cache: its pages are loaded on first access
+    and shared by every process mapping the same file (e.g. the API workers), rather than
+    duplicated in each one. The flat and HNSW vector storage (`IO_FLAG_MMAP_IFC`) and the IVF
+    inverted lists (`IO_FLAG_MMAP`) are mapped; FAISS builds or index types that cannot be
+    mapped are read into memory as usual.
+
+    IVF indexes can always reconstruct vectors by ID once loaded (see `enable_reconstruct`).
+
+    Args:
+        index_path (str): Path of the FAISS index file.
+        mmap (bool): Whether to memory-map the index.
+
+    Returns:
+        faiss.Index: The index.
+    """
+    index = None
+    if mmap:
+        # Flat and HNSW storage (FAISS 1.9 and later) first, then IVF inverted lists
+        for flag in (getattr(faiss, "IO_FLAG_MMAP_IFC", None), faiss.IO_FLAG_MMAP):
+            if flag is None:
+                continue
+            try:
+                index = faiss.read_index(index_path, flag)
+                break
+            except RuntimeError:
+                continue
+    if index is None:
+        index = faiss.read_index(index_path)
+    enable_reconstruct(index)
+    return index
+
+def apply_search_params(index: faiss.Index, params: dict) -> None:
+    """
+    Apply the query-time knobs (`nprobe` for IVF, `efSearch` for HNSW) to a loaded index.
+
+    Knobs that do not apply to the index type are ignored.
+
+    Args:
+        index (faiss.Index): The loaded index.
+        params (dict): The parameters read with `read_index_params`.
+    """
+    space = faiss.ParameterSpace()
+    if "nprobe" in params and faiss.try_extract_index_ivf(index) is not None:
+        space.set_index_parameter(index, "nprobe", int(params["nprobe"]))
+    if "efSearch" in params and params.get("index_type") == "hnsw":
+        space.set_index_parameter(index, "efSearch", int(params["efSearch"]))
+
+def search_parameters(params: dict, selector: faiss.IDSelector = None) -> faiss.SearchParameters:
+    """
+    Build per-search parameters restricting a search to the IDs accepted by `selector`.
+
+    IVF and HNSW indexes ignore their own knobs when given search parameters, so the
+    stored `nprobe` / `efSearch` are carried over.
+
+    Args:
+        params (dict): The parameters read with `read_index_params`.
+        selector (faiss.IDSelector): Selector over review IDs.
+
+    Returns:
+        faiss.SearchParameters: Parameters to pass to `index.search(..., params=...)`.
+    """
+    index_type = params.get("index_type", "flat")
+    if index_type in ("ivf_flat", "ivf_pq"):
+        search_params = faiss.SearchParametersIVF(sel=selector)
+        search_params.nprobe = int(params.get("nprobe", DEFAULT_SEARCH_PARAMS["nprobe"]))
+    elif index_type == "hnsw":
+        search_params = faiss.SearchParametersHNSW(sel=selector)
+        search_params.efSearch = int(params.get("efSearch", DEFAULT_SEARCH_PARAMS["efSearch"]))
+    else:
+        search_params = faiss.SearchParameters(sel=selector)
+    return search_params
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt so that trivially different prompts share a cache entry.
+
+    Collapses runs of whitespace and strips leading/trailing whitespace.
+
+    Args:
+        prompt (str): The raw prompt.
+
+    Returns:
+        str: The normalized prompt.
+    """
+    return " ".join(prompt.split())
+
+def make_cache_key(model: str, prompt: str, max_tokens: int, temperature: float) -> str:
+    """
+    Build the cache key of an LLM call.
+
+    Args:
+        model (str): The model name.
+        prompt (str): The prompt (normalized before hashing).
+        max_tokens (int): Maximum number of tokens in the response.
+        temperature (float): The sampling temperature.
+
+    Returns:
+        str: A SHA-256 hex digest identifying the call.
+    """
+    payload = json.dumps([model, normalize_prompt(prompt), int(max_tokens), float(temperature)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """
+    Two-tier cache for LLM responses.
+
+    - Memory tier: a per-process LRU dictionary bounded by `max_entries`.
+    - Disk tier (optional): a SQLite database bounded by `disk_max_entries` and shared by
+      every process pointing at the same file, e.g. several uvicorn workers.
+
+    Entries older than `ttl` seconds are treated as misses in both tiers. Hit and miss
+    counters are available through `stats()`.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0, disk_path: str = None, disk_max_entries: int = 100000):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of entries kept in memory.
+            ttl (float): Time-to-live of an entry in seconds (0 disables expiry).
+            disk_path (str): Path of the SQLite database; None or "" disables the disk tier.
+            disk_max_entries (int): Maximum number of entries kept on disk.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path or None
+        self.disk_max_entries = disk_max_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (created_at, value)
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        if self.disk_path:
+            directory = os.path.dirname(self.disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                # WAL lets several worker processes read while one writes
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection to the disk tier, commit on success and always close it.
+        """
+        conn = sqlite3.connect(self.disk_path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        """
+        Return True if an entry created at `created_at` is past its TTL.
+        """
+        return self.ttl > 0 and now - created_at > self.ttl
+
+    def get(self, key: str):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): The cache key (see `make_cache_key`).
+
+        Returns:
+            str or None: The cached response, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None and not self._expired(row[1], now):
+                        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, row[1], row[0])
+                        with self._lock:
+                            self._counters["hits"] += 1
+                            self._counters["disk_hits"] += 1
+                        return row[0]
+            except sqlite3.Error:
+                # A busy or broken disk tier must never fail the LLM call
+                pass
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): The cache key (see `make_cache_key`).
+            value (str): The LLM response.
+        """
+        now = time.time()
+        self._remember(key, now, value)
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                        (key, value, now, now),
+                    )
+                    # Enforce the size cap by dropping the least recently used entries
+                    excess = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.disk_max_entries
+                    if excess > 0:
+                        conn.execute(
+                            "DELETE FROM llm_cache WHERE key IN "
+                            "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                            (excess,),
+                        )
+            except sqlite3.Error:
+                pass
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        """
+        Insert an entry in the memory tier, evicting the least recently used ones.
+        """
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove every entry from both tiers and reset the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            for name in self._counters:
+                self._counters[name] = 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: hits, memory_hits, disk_hits, misses, hit_rate and the memory tier size.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -1,41 +1,474 @@
-import openai
+import asyncio
+import itertools
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import aiohttp
+import openai
+import requests
+
+#from src.llm_cache import LLMCache, make_cache_key  # Uncomment this if using relative imports
+#from src.config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_PATH, LLM_CACHE_DISK_MAX_ENTRIES  # Uncomment this if using relative imports
+#from src.config import LLM_POOL_SIZE, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX  # Uncomment this if using relative imports
+#from src.config import LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT, LLM_RATE_BURST, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET  # Uncomment this if using relative imports
+#from src.metrics import span, record_cache, record_llm_tokens, record_llm_retry, record_llm_rejected  # Uncomment this if using relative imports
+#from src.resilience import TokenBucket, CircuitBreaker, ConcurrencyLimiter, backoff_delay  # Uncomment this if using relative imports
+from llm_cache import LLMCache, make_cache_key  # Two-tier LLM response cache
+from config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_PATH, LLM_CACHE_DISK_MAX_ENTRIES  # Cache settings
+from config import LLM_POOL_SIZE, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX  # Connection and retry settings
+from config import LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT, LLM_RATE_BURST, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET  # Load limiting settings
+from metrics import span, record_cache, record_llm_tokens, record_llm_retry, record_llm_rejected  # Stage timings, cache, token and retry counters
+from resilience import TokenBucket, CircuitBreaker, ConcurrencyLimiter, backoff_delay  # Rate limiting, circuit breaking, concurrency limit and backoff
+
+# Process-wide response cache shared by every call_llm caller
+llm_cache = LLMCache(
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    ttl=LLM_CACHE_TTL,
+    disk_path=LLM_CACHE_PATH,
+    disk_max_entries=LLM_CACHE_DISK_MAX_ENTRIES,
+)
 
-# Set OpenAI API key from environment variable or config file
-def set_openai_api_key():
+# Load the OpenAI API key from environment variable or config file
+def load_api_key() -> str:
     """
-    Set the OpenAI API key from the environment variable or config file.
+    Read the OpenAI API key from the environment variable or config file.
 
     Priority:
     1. Environment variable `OPENAI_API_KEY`.
     2. Config file located at `config/openai_api_key.txt`.
 
+    Returns:
+        str: The API key.
+
     Raises:
         Exception: If the API key is not found in either source.
     """
     if "OPENAI_API_KEY" in os.environ:
-        openai.api_key = os.environ["OPENAI_API_KEY"]
-    else:
-        # Load API key from the configuration file
-        try:
-            with open("config/openai_api_key.txt", "r") as f:
-                openai.api_key = f.read().strip()
-        except FileNotFoundError:
-            raise Exception(
-                "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable "
-                "or create a config/openai_api_key.txt file with your API key."
+        return os.environ["OPENAI_API_KEY"]
+    # Load API key from the configuration file
+    try:
+        with open("config/openai_api_key.txt", "r") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise Exception(
+            "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable "
+            "or create a config/openai_api_key.txt file with your API key."
+        )
+
+class LLMError(Exception):
+    """
+    Base class of the LLM errors reported to API clients with a specific status code.
+
+    Attributes:
+        retry_after (float): Seconds after which the call may succeed, or None if unknown.
+    """
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class LLMRateLimitError(LLMError):
+    """
+    Raised when the OpenAI API still rate-limits the call (HTTP 429) after every retry.
+    """
+
+class LLMUnavailableError(LLMError):
+    """
+    Raised when the OpenAI API times out, is unreachable or returns 5xx errors after every
+    retry, and while the circuit breaker is open.
+    """
+
+def _is_upstream_failure(e: Exception) -> bool:
+    """
+    Return whether an error means the OpenAI API is unhealthy (5xx, timeout, connection error).
+    """
+    if isinstance(e, (openai.error.ServiceUnavailableError, openai.error.Timeout,
+                      openai.error.APIConnectionError, openai.error.TryAgain)):
+        return True
+    # Other 5xx responses are raised as APIError
+    return isinstance(e, openai.error.APIError) and (e.http_status is None or e.http_status >= 500)
+
+def _is_quota_exhausted(e: Exception) -> bool:
+    """
+    Return whether an error is a 429 sent because the account has no quota left, which retrying cannot fix.
+    """
+    if not isinstance(e, openai.error.RateLimitError):
+        return False
+    error = getattr(e, "error", None) or {}
+    return "insufficient_quota" in (e.code, error.get("code"), error.get("type"))
+
+def _retry_after(e: Exception):
+    """
+    Return the `Retry-After` delay sent with an error response, in seconds, or None.
+    """
+    value = (getattr(e, "headers", None) or {}).get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class LLMClient:
+    """
+    Shared, resilient client of the OpenAI Chat Completions API.
+
+    - The API key is read once, on first use.
+    - Connections are kept alive in pools of `pool_size`: one `requests` session shared by
+      all threads, and one `aiohttp` session per event loop.
+    - Rate-limit (429), 5xx, timeout and connection errors are retried up to `max_retries`
+      times with jittered exponential backoff, honouring `Retry-After`.
+    - At most `max_concurrency` requests are in flight in the process, from threads and
+      event loops alike; a token bucket spaces requests out to `rate_limit` per second.
+    - Each attempt has a connect timeout and a `timeout`. Async attempts must complete
+      within `timeout` seconds in total (the aiohttp total timeout, which for a stream
+      covers every chunk). Sync attempts fail when the API sends nothing for `timeout`
+      seconds (the `requests` read timeout, which bounds each read, not the whole response).
+    - After `breaker_failures` consecutive upstream failures, calls fail fast with
+      `LLMUnavailableError` for `breaker_reset` seconds instead of waiting on timeouts.
+
+    Errors that retrying cannot fix (authentication, invalid requests, a 429 sent because
+    the account's quota is exhausted) are raised unchanged.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 32,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_concurrency: int = 16,
+        rate_limit: float = 0.0,
+        rate_burst: int = 10,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+    ):
+        """
+        Args:
+            pool_size (int): Maximum number of pooled connections.
+            timeout (float): Time allowed for one attempt (async) or for each read (sync), in seconds.
+            connect_timeout (float): Time allowed to connect, in seconds.
+            max_retries (int): Retries after the first attempt.
+            backoff_base (float): Maximum delay before the first retry, doubled for each retry.
+            backoff_max (float): Maximum delay before any retry.
+            max_concurrency (int): Maximum number of requests in flight in the process.
+            rate_limit (float): Maximum requests per second (0: unlimited).
+            rate_burst (int): Requests allowed at once above the rate.
+            breaker_failures (int): Consecutive upstream failures that open the circuit (0: never).
+            breaker_reset (float): Seconds the circuit stays open.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+
+        self._lock = threading.Lock()
+        self._api_key = None
+        self._session = None
+        self._limiter = ConcurrencyLimiter(max_concurrency)  # Shared by threads and event loops
+        self._sessions = weakref.WeakKeyDictionary()  # event loop -> aiohttp session
+
+    @property
+    def api_key(self) -> str:
+        """
+        The OpenAI API key, read on first use.
+        """
+        if self._api_key is None:
+            with self._lock:
+                if self._api_key is None:
+                    self._api_key = load_api_key()
+        return self._api_key
+
+    def _request(self, kwargs: dict) -> dict:
+        """
+        Return the arguments of `openai.ChatCompletion.create` for one call.
+        """
+        return dict(kwargs, api_key=self.api_key, request_timeout=(self.connect_timeout, self.timeout))
+
+    def _ensure_session(self) -> None:
+        """
+        Install the pooled `requests` session used by the `openai` package in every thread.
+        """
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                openai.requestssession = session
+                self._session = session
+
+    def _loop_session(self):
+        """
+        Return the pooled `aiohttp` session of the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    def _admit(self) -> float:
+        """
+        Check the circuit breaker and take a rate-limit token.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+
+        Raises:
+            LLMUnavailableError: If the circuit is open.
+        """
+        if not self.breaker.allow():
+            record_llm_rejected("circuit_open")
+            raise LLMUnavailableError(
+                "OpenAI API Error: the LLM service is unavailable, please retry later.",
+                retry_after=self.breaker.retry_after(),
             )
+        return self.rate_limiter.reserve()
+
+    def _on_error(self, e: Exception, attempt: int) -> float:
+        """
+        Record a failed attempt and decide whether to retry it.
+
+        Returns:
+            float: The backoff delay before the next attempt.
+
+        Raises:
+            LLMRateLimitError: If the call is still rate-limited after the last retry.
+            LLMUnavailableError: If the upstream is still failing after the last retry, or the circuit opened.
+            Exception: The original error, if retrying cannot fix it.
+        """
+        upstream_failure = _is_upstream_failure(e)
+        if upstream_failure:
+            self.breaker.record_failure()
+        else:
+            # The API answered, so it is healthy even if the call failed
+            self.breaker.record_success()
+
+        # An exhausted quota is reported with a 429 too, but waiting does not restore it
+        rate_limited = isinstance(e, openai.error.RateLimitError) and not _is_quota_exhausted(e)
+        if not (upstream_failure or rate_limited):
+            raise e
+        if attempt >= self.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+            if rate_limited:
+                raise LLMRateLimitError(f"OpenAI API Error: {e}", retry_after=_retry_after(e)) from e
+            raise LLMUnavailableError(f"OpenAI API Error: {e}", retry_after=self.breaker.retry_after() or None) from e
+        record_llm_retry(type(e).__name__)
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, _retry_after(e))
+
+    def _call(self, kwargs: dict, hold_slot: bool = False):
+        """
+        Send a request with retries from a thread.
+
+        Args:
+            kwargs (dict): Arguments of `openai.ChatCompletion.create`.
+            hold_slot (bool): Keep the concurrency slot after returning (released by the caller).
+        """
+        self._ensure_session()
+        request = self._request(kwargs)
+        for attempt in itertools.count():
+            delay = self._admit()
+            if delay:
+                time.sleep(delay)
+            self._limiter.acquire()
+            try:
+                response = openai.ChatCompletion.create(**request)
+            except BaseException as e:
+                self._limiter.release()
+                if not isinstance(e, Exception):
+                    raise
+                delay = self._on_error(e, attempt)
+            else:
+                self.breaker.record_success()
+                if not hold_slot:
+                    self._limiter.release()
+                return response
+            time.sleep(delay)
+
+    async def _acall(self, kwargs: dict, hold_slot: bool = False):
+        """
+        Send a request with retries from the running event loop (see `_call`).
+        """
+        session = self._loop_session()
+        request = self._request(kwargs)
+        token = openai.aiosession.set(session)
+        try:
+            for attempt in itertools.count():
+                delay = self._admit()
+                if delay:
+                    await asyncio.sleep(delay)
+                await self._limiter.acquire_async()
+                try:
+                    response = await openai.ChatCompletion.acreate(**request)
+                except BaseException as e:
+                    self._limiter.release()
+                    if not isinstance(e, Exception):
+                        raise
+                    delay = self._on_error(e, attempt)
+                else:
+                    self.breaker.record_success()
+                    if not hold_slot:
+                        self._limiter.release()
+                    return response
+                await asyncio.sleep(delay)
+        finally:
+            openai.aiosession.reset(token)
+
+    def create(self, **kwargs):
+        """
+        Create a chat completion; takes the arguments of `openai.ChatCompletion.create`.
+        """
+        return self._call(kwargs)
+
+    async def acreate(self, **kwargs):
+        """
+        Create a chat completion without blocking the event loop.
+        """
+        return await self._acall(kwargs)
+
+    def stream(self, **kwargs):
+        """
+        Create a streamed chat completion and yield its chunks.
+
+        Only the request is retried: an error after the first chunk is raised to the caller.
+        The concurrency slot is held until the stream is exhausted or closed.
+        """
+        chunks = self._call(dict(kwargs, stream=True), hold_slot=True)
+        try:
+            yield from chunks
+        finally:
+            self._limiter.release()
+
+    async def astream(self, **kwargs):
+        """
+        Async counterpart of `stream`.
+        """
+        chunks = await self._acall(dict(kwargs, stream=True), hold_slot=True)
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self._limiter.release()
+
+    async def aclose(self) -> None:
+        """
+        Close the connection pool of the running event loop.
+        """
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+# Process-wide client shared by every call_llm caller
+llm_client = LLMClient(
+    pool_size=LLM_POOL_SIZE,
+    timeout=LLM_TIMEOUT,
+    connect_timeout=LLM_CONNECT_TIMEOUT,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE,
+    backoff_max=LLM_BACKOFF_MAX,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    rate_limit=LLM_RATE_LIMIT,
+    rate_burst=LLM_RATE_BURST,
+    breaker_failures=LLM_BREAKER_FAILURES,
+    breaker_reset=LLM_BREAKER_RESET,
+)
+
+def _record_usage(model: str, response) -> None:
+    """
+    Count the prompt and completion tokens reported in a chat completion response.
+    """
+    usage = response.get("usage") or {}
+    record_llm_tokens(model, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+
+def _build_messages(prompt: str) -> list:
+    """
+    Build the chat messages sent to the LLM for a prompt.
+    """
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},  # System message
+        {"role": "user", "content": prompt},  # User's input prompt
+    ]
+
+def _cache_key(model: str, prompt: str, max_tokens: int, temperature: float, use_cache: bool):
+    """
+    Return the response cache key of a call, or None when the cache is not used.
+    """
+    if not (use_cache and LLM_CACHE_ENABLED):
+        return None
+    return make_cache_key(model, prompt, max_tokens, temperature)
+
+def _cached(cache_key):
+    """
+    Return the cached response of a call, or None on a miss or without cache.
+    """
+    if cache_key is None:
+        return None
+    cached = llm_cache.get(cache_key)
+    record_cache("llm", cached is not None)
+    return cached
+
+def _store(cache_key, content: str) -> str:
+    """
+    Cache the response of a call, if the cache is used, and return it.
+    """
+    if cache_key is not None:
+        llm_cache.set(cache_key, content)
+    return content
+
+@contextmanager
+def _translated_errors():
+    """
+    Translate the errors raised inside the block into the errors reported by `call_llm`.
+
+    Rate limiting and unavailability (`LLMError`) keep their type, for the API's status codes.
+    """
+    try:
+        yield
+    except LLMError:
+        raise
+    except openai.error.AuthenticationError as e:
+        # Handle authentication errors
+        raise Exception(f"Authentication Error: {e}")
+    except openai.error.OpenAIError as e:
+        # Handle general OpenAI API errors
+        raise Exception(f"OpenAI API Error: {e}")
+    except Exception as e:
+        # Handle any other unexpected errors
+        raise Exception(f"An unexpected error occurred: {e}")
+
+def _content(model: str, response) -> str:
+    """
+    Count the tokens of a chat completion response and return its stripped text.
+    """
+    _record_usage(model, response)
+    return response["choices"][0]["message"]["content"].strip()
 
 # Centralized method to call the LLM
-def call_llm(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, temperature: float = 0.5) -> str:
+def call_llm(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, temperature: float = 0.5, use_cache: bool = True) -> str:
     """
     Call the OpenAI LLM (Language Model) with the provided prompt and parameters.
 
+    Responses are cached on (model, normalized prompt, max_tokens, temperature), so
+    repeated prompts are answered without an API call.
+
     Args:
         prompt (str): The input prompt for the LLM.
         model (str): The model to use (default: "gpt-3.5-turbo").
         max_tokens (int): Maximum number of tokens in the LLM's response.
         temperature (float): The sampling temperature to control randomness (default: 0.7).
+        use_cache (bool): Whether to read and write the response cache (default: True).
 
     Returns:
         str: The LLM's generated response.
@@ -46,30 +479,184 @@ def call_llm(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, t
             - OpenAIError: When the API encounters issues.
             - General errors related to unexpected issues.
     """
-    try:
-        # Ensure the OpenAI API key is set
-        set_openai_api_key()
+    # Serve repeated prompts from the cache
+    cache_key = _cache_key(model, prompt, max_tokens, temperature, use_cache)
+    cached = _cached(cache_key)
+    if cached is not None:
+        return cached
 
+    with _translated_errors():
         # Call the OpenAI API with the prompt and parameters
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},  # System message
-                {"role": "user", "content": prompt},  # User's input prompt
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
+        with span("llm"):
+            response = llm_client.create(model=model, messages=_build_messages(prompt), max_tokens=max_tokens, temperature=temperature)
+        content = _content(model, response)
+    return _store(cache_key, content)
 
-        # Extract and return the response content
-        return response["choices"][0]["message"]["content"].strip()
+# Non-blocking counterpart of call_llm for the async API
+async def call_llm_async(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, temperature: float = 0.5, use_cache: bool = True) -> str:
+    """
+    Call the OpenAI LLM without blocking the event loop.
 
-    except openai.error.AuthenticationError as e:
-        # Handle authentication errors
-        raise Exception(f"Authentication Error: {e}")
-    except openai.error.OpenAIError as e:
-        # Handle general OpenAI API errors
-        raise Exception(f"OpenAI API Error: {e}")
-    except Exception as e:
-        # Handle any other unexpected errors
-        raise Exception(f"An unexpected error occurred: {e}")
+    Same parameters, caching and error handling as `call_llm`. Cancelling the awaiting
+    task aborts the HTTP request.
+
+    Args:
+        prompt (str): The input prompt for the LLM.
+        model (str): The model to use (default: "gpt-3.5-turbo").
+        max_tokens (int): Maximum number of tokens in the LLM's response.
+        temperature (float): The sampling temperature to control randomness.
+        use_cache (bool): Whether to read and write the response cache (default: True).
+
+    Returns:
+        str: The LLM's generated response.
+
+    Raises:
+        Exception: If any error occurs during the API call (see `call_llm`).
+    """
+    # Serve repeated prompts from the cache
+    cache_key = _cache_key(model, prompt, max_tokens, temperature, use_cache)
+    cached = _cached(cache_key)
+    if cached is not None:
+        return cached
+
+    with _translated_errors():
+        # Call the OpenAI API asynchronously with the prompt and parameters
+        with span("llm"):
+            response = await llm_client.acreate(model=model, messages=_build_messages(prompt), max_tokens=max_tokens, temperature=temperature)
+        content = _content(model, response)
+    return _store(cache_key, content)
+
+class _DeltaStripper:
+    """
+    Strip leading and trailing whitespace from a stream of deltas, so that the joined
+    stream matches the stripped response returned by `call_llm`.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.pending = ""  # Whitespace held back until more text follows
+        self.parts = []
+
+    def feed(self, delta: str) -> str:
+        """
+        Return the part of `delta` that can be emitted now.
+        """
+        if not self.started:
+            delta = delta.lstrip()
+            if not delta:
+                return ""
+            self.started = True
+        text = self.pending + delta
+        stripped = text.rstrip()
+        self.pending = text[len(stripped):]
+        self.parts.append(stripped)
+        return stripped
+
+    @property
+    def content(self) -> str:
+        """
+        The full stripped response emitted so far.
+        """
+        return "".join(self.parts)
+
+def _delta_of(chunk) -> str:
+    """
+    Extract the text delta of a streamed chat completion chunk.
+    """
+    return chunk["choices"][0].get("delta", {}).get("content") or ""
+
+def call_llm_stream(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, temperature: float = 0.5, use_cache: bool = True):
+    """
+    Stream the LLM's response as text deltas.
+
+    Same parameters, caching and error handling as `call_llm`. A cached response is
+    yielded as a single delta; a streamed response is cached once it completes.
+
+    Args:
+        prompt (str): The input prompt for the LLM.
+        model (str): The model to use (default: "gpt-3.5-turbo").
+        max_tokens (int): Maximum number of tokens in the LLM's response.
+        temperature (float): The sampling temperature to control randomness.
+        use_cache (bool): Whether to read and write the response cache (default: True).
+
+    Yields:
+        str: Successive pieces of the response; joined, they equal `call_llm`'s result.
+
+    Raises:
+        Exception: If any error occurs during the API call (see `call_llm`).
+    """
+    # Serve repeated prompts from the cache
+    cache_key = _cache_key(model, prompt, max_tokens, temperature, use_cache)
+    cached = _cached(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    stripper = _DeltaStripper()
+    with _translated_errors():
+        # Call the OpenAI API in streaming mode
+        with span("llm"):
+            chunks = llm_client.stream(model=model, messages=_build_messages(prompt), max_tokens=max_tokens, temperature=temperature)
+            # Streamed responses carry no usage; each content chunk is one token
+            tokens = 0
+            for chunk in chunks:
+                delta = _delta_of(chunk)
+                tokens += bool(delta)
+                text = stripper.feed(delta)
+                if text:
+                    yield text
+        record_llm_tokens(model, 0, tokens)
+
+    # Cache the complete response
+    _store(cache_key, stripper.content)
+
+async def call_llm_stream_async(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 100, temperature: float = 0.5, use_cache: bool = True):
+    """
+    Async counterpart of `call_llm_stream`.
+
+    Args:
+        prompt (str): The input prompt for the LLM.
+        model (str): The model to use (default: "gpt-3.5-turbo").
+        max_tokens (int): Maximum number of tokens in the LLM's response.
+        temperature (float): The sampling temperature to control randomness.
+        use_cache (bool): Whether to read and write the response cache (default: True).
+
+    Yields:
+        str: Successive pieces of the response.
+
+    Raises:
+        Exception: If any error occurs during the API call (see `call_llm`).
+    """
+    # Serve repeated prompts from the cache
+    cache_key = _cache_key(model, prompt, max_tokens, temperature, use_cache)
+    cached = _cached(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    stripper = _DeltaStripper()
+    with _translated_errors():
+        # Call the OpenAI API asynchronously in streaming mode
+        with span("llm"):
+            chunks = llm_client.astream(model=model, messages=_build_messages(prompt), max_tokens=max_tokens, temperature=temperature)
+            # Streamed responses carry no usage; each content chunk is one token
+            tokens = 0
+            async for chunk in chunks:
+                delta = _delta_of(chunk)
+                tokens += bool(delta)
+                text = stripper.feed(delta)
+                if text:
+                    yield text
+        record_llm_tokens(model, 0, tokens)
+
+    # Cache the complete response
+    _store(cache_key, stripper.content)
+
+def get_llm_cache_stats() -> dict:
+    """
+    Return the hit and miss counters of the LLM response cache.
+
+    Returns:
+        dict: See `LLMCache.stats`.
+    """
+    return llm_cache.stats()
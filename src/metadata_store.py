@@ -0,0 +1,290 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# File signature of the columnar metadata format, followed by the header length
+MAGIC = b"RVMETA01"
+# Data sections start on 64-byte boundaries so that numpy views are aligned
+ALIGNMENT = 64
+
+def metadata_store_path(metadata_path: str) -> str:
+    """
+    Return the path of the columnar store written next to a metadata CSV file.
+
+    Args:
+        metadata_path (str): Path to the metadata CSV file, e.g. "models/reviews_with_metadata.csv".
+
+    Returns:
+        str: The columnar store path, e.g. "models/reviews_with_metadata.store".
+    """
+    return os.path.splitext(metadata_path)[0] + ".store"
+
+def _encode_strings(values: pd.Series) -> tuple:
+    """
+    Encode a text column as UTF-8 offsets into one blob, plus a mask of missing values.
+
+    Returns:
+        tuple: (offsets int64 array of length n + 1, blob bytes, valid bool array).
+    """
+    valid = values.notna().to_numpy()
+    encoded = [str(value).encode("utf-8") if ok else b"" for value, ok in zip(values.tolist(), valid)]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded), valid
+
+def write_metadata_store(df: pd.DataFrame, path: str, id_column: str = "review_id") -> None:
+    """
+    Write the metadata in a compact columnar format that can be memory-mapped.
+
+    Layout: the magic bytes, the header length, a JSON header describing every column,
+    then one aligned section per array. Numeric columns are stored as raw numpy arrays;
+    text columns as an int64 offset array into a UTF-8 blob. When `id_column` exists, the
+    sorted IDs and their row positions are stored too, so rows can be fetched by ID with a
+    binary search instead of a hash index built at load time.
+
+    The file is replaced atomically, so running engines never read a half-written store.
+
+    Args:
+        df (pd.DataFrame): The metadata rows, in index order.
+        path (str): Path of the store file.
+        id_column (str): Name of the unique integer ID column.
+
+    Raises:
+        ValueError: If the ID column contains duplicate values.
+    """
+    sections = []
+    columns = []
+
+    def add_section(data) -> dict:
+        """
+        Queue an array or bytes object for writing and return its descriptor.
+        """
+        if isinstance(data, np.ndarray):
+            data = np.ascontiguousarray(data)
+            descriptor = {"dtype": data.dtype.str, "count": int(data.size)}
+            payload = data.tobytes()
+        else:
+            descriptor = {"dtype": "|u1", "count": len(data)}
+            payload = data
+        sections.append((descriptor, payload))
+        return descriptor
+
+    for name in df.columns:
+        values = df[name]
+        if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            columns.append({"name": name, "kind": "numeric", "data": add_section(values.to_numpy())})
+        else:
+            offsets, blob, valid = _encode_strings(values)
+            columns.append({
+                "name": name,
+                "kind": "string",
+                "offsets": add_section(offsets),
+                "blob": add_section(blob),
+                "valid": add_section(valid),
+            })
+
+    header = {"rows": len(df), "columns": columns, "id_column": None}
+    if id_column in df.columns:
+        ids = df[id_column].to_numpy(dtype="int64")
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        if len(sorted_ids) > 1 and (sorted_ids[1:] == sorted_ids[:-1]).any():
+            raise ValueError(f"The metadata contains duplicate values in '{id_column}'.")
+        header["id_column"] = id_column
+        header["sorted_ids"] = add_section(sorted_ids)
+        header["id_order"] = add_section(order.astype("int64"))
+
+    # Assign the aligned offsets, which depend on the header size
+    def layout(start: int) -> int:
+        position = start
+        for descriptor, payload in sections:
+            position = -(-position // ALIGNMENT) * ALIGNMENT
+            descriptor["offset"] = position
+            position += len(payload)
+        return position
+
+    data_start = 0
+    while True:
+        layout(data_start)
+        encoded_header = json.dumps(header).encode("utf-8")
+        needed = -(-(len(MAGIC) + 8 + len(encoded_header)) // ALIGNMENT) * ALIGNMENT
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(MAGIC)
+        f.write(len(encoded_header).to_bytes(8, "little"))
+        f.write(encoded_header)
+        for descriptor, payload in sections:
+            f.write(b"\0" * (descriptor["offset"] - f.tell()))
+            f.write(payload)
+    os.replace(path + ".tmp", path)
+
+class MetadataStore:
+    """
+    Read-only view of the review metadata, fetched row by row.
+
+    A store opened with `open` memory-maps the columnar file: opening it reads only the
+    header, fetching k rows touches only their pages, and every process serving the same
+    file shares one copy in the page cache. `from_frame` wraps an already loaded DataFrame
+    (e.g. a legacy CSV store) behind the same interface.
+
+    Attributes:
+        columns (list): Column names, in their original order.
+        ids (np.ndarray): The review ID of every row, or None for stores without IDs.
+    """
+
+    def __init__(self, num_rows: int, columns: dict, ids=None, sorted_ids=None, id_order=None):
+        self._num_rows = num_rows
+        self._columns = columns
+        self.columns = list(columns)
+        self.ids = ids
+        self._sorted_ids = sorted_ids
+        self._id_order = id_order
+
+    @classmethod
+    def open(cls, path: str) -> "MetadataStore":
+        """
+        Memory-map a store written by `write_metadata_store`.
+
+        Args:
+            path (str): Path of the store file.
+
+        Returns:
+            MetadataStore: The store.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a metadata store.
+        """
+        buffer = np.memmap(path, dtype="uint8", mode="r")
+        if len(buffer) < len(MAGIC) + 8 or bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a metadata store.")
+        header_length = int.from_bytes(bytes(buffer[len(MAGIC):len(MAGIC) + 8]), "little")
+        header = json.loads(bytes(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length]))
+
+        def view(descriptor: dict) -> np.ndarray:
+            return np.frombuffer(buffer, dtype=np.dtype(descriptor["dtype"]), count=descriptor["count"], offset=descriptor["offset"])
+
+        columns = {}
+        for column in header["columns"]:
+            if column["kind"] == "numeric":
+                columns[column["name"]] = view(column["data"])
+            else:
+                columns[column["name"]] = _StringColumn(view(column["offsets"]), view(column["blob"]), view(column["valid"]))
+
+        if header["id_column"] is None:
+            return cls(header["rows"], columns)
+        return cls(
+            header["rows"],
+            columns,
+            ids=columns[header["id_column"]],
+            sorted_ids=view(header["sorted_ids"]),
+            id_order=view(header["id_order"]),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, id_column: str = "review_id") -> "MetadataStore":
+        """
+        Wrap a loaded DataFrame.
+
+        Args:
+            df (pd.DataFrame): The metadata rows.
+            id_column (str): Name of the unique integer ID column, if present.
+
+        Returns:
+            MetadataStore: The store.
+
+        Raises:
+            ValueError: If the ID column contains duplicate values.
+        """
+        columns = {name: df[name].to_numpy() for name in df.columns}
+        if id_column not in df.columns:
+            return cls(len(df), columns)
+        ids = df[id_column].to_numpy(dtype="int64")
+        order = np.argsort(ids, kind="stable")
+        sorted_ids = ids[order]
+        if len(sorted_ids) > 1 and (sorted_ids[1:] == sorted_ids[:-1]).any():
+            raise ValueError(f"The metadata contains duplicate values in '{id_column}'.")
+        return cls(len(df), columns, ids=ids, sorted_ids=sorted_ids, id_order=order)
+
+    def __len__(self) -> int:
+        return self._num_rows
+
+    def positions(self, ids) -> np.ndarray:
+        """
+        Map review IDs to row positions with a binary search.
+
+        Args:
+            ids (array-like): The review IDs.
+
+        Returns:
+            np.ndarray: The row position of each ID, or -1 for unknown IDs.
+        """
+        ids = np.asarray(ids, dtype="int64")
+        if self._sorted_ids is None or len(ids) == 0 or self._num_rows == 0:
+            return np.full(len(ids), -1, dtype="int64")
+        slots = np.minimum(np.searchsorted(self._sorted_ids, ids), self._num_rows - 1)
+        found = self._sorted_ids[slots] == ids
+        return np.where(found, self._id_order[slots], -1).astype("int64")
+
+    def take(self, positions) -> pd.DataFrame:
+        """
+        Materialize the rows at the given positions.
+
+        Args:
+            positions (array-like): Row positions.
+
+        Returns:
+            pd.DataFrame: The rows, in the given order, indexed by review ID when the
+            store has IDs and by position otherwise.
+        """
+        positions = np.asarray(positions, dtype="int64")
+        data = {name: column[positions] for name, column in self._columns.items()}
+        index = self.ids[positions] if self.ids is not None else positions
+        return pd.DataFrame(data, index=pd.Index(np.asarray(index, dtype="int64")), columns=self.columns)
+
+    def rows(self, ids) -> pd.DataFrame:
+        """
+        Fetch rows by review ID (or by position for stores without IDs), skipping unknown ones.
+
+        Args:
+            ids (array-like): The review IDs, e.g. the labels returned by a FAISS search.
+
+        Returns:
+            pd.DataFrame: The rows, in the given order.
+        """
+        if self.ids is None:
+            positions = np.asarray(ids, dtype="int64")
+            return self.take(positions[(positions >= 0) & (positions < self._num_rows)])
+        positions = self.positions(ids)
+        return self.take(positions[positions >= 0])
+
+    def keys(self, positions) -> np.ndarray:
+        """
+        Return the FAISS labels (review IDs, or positions for stores without IDs) of the given rows.
+        """
+        positions = np.asarray(positions, dtype="int64")
+        return self.ids[positions] if self.ids is not None else positions
+
+class _StringColumn:
+    """
+    A memory-mapped text column: UTF-8 values addressed through an offset array.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, valid: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+        self.valid = valid
+
+    def __getitem__(self, positions: np.ndarray) -> np.ndarray:
+        values = np.empty(len(positions), dtype=object)
+        for i, position in enumerate(positions):
+            if self.valid[position]:
+                values[i] = self.blob[self.offsets[position]:self.offsets[position + 1]].tobytes().decode("utf-8")
+            else:
+                values[i] = np.nan
+        return values
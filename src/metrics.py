@@ -0,0 +1,396 @@
+import threading
+import time
+from contextvars import ContextVar
+
+#from src.config import METRICS_ENABLED  # Uncomment this if using relative imports
+from config import METRICS_ENABLED  # Whether spans and counters are recorded
+
+# Upper bounds (seconds) of the latency histogram buckets, from sub-millisecond searches to slow LLM calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upper bounds of the prompt size histogram buckets, in tokens
+TOKEN_BUCKETS = (100, 200, 400, 600, 800, 1000, 1500, 2000, 3000, 4000, 8000)
+
+# Per-request stage timings (stage -> milliseconds), set by the API for the duration of a request
+_request_timings = ContextVar("request_timings", default=None)
+
+# Per-request prompt sizes (tokens), set by the API for the duration of a request
+_request_prompts = ContextVar("request_prompts", default=None)
+
+def _escape(value) -> str:
+    """
+    Escape a label value for the Prometheus text format.
+    """
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """
+    Format a label set, e.g. `{stage="encode",le="0.01"}`.
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    """
+    Format a sample value, without a trailing ".0" for whole numbers.
+    """
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """
+    A monotonically increasing counter with labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        """
+        Add `amount` to the series of the given label values.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        """
+        Return the current value of one series.
+        """
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def samples(self) -> list:
+        """
+        Return the Prometheus sample lines of every series.
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}" for values, value in items]
+
+class Gauge:
+    """
+    A value with labels that can go up and down (e.g. a queue depth).
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def set(self, value: float, *label_values) -> None:
+        """
+        Set the series of the given label values.
+        """
+        with self._lock:
+            self._values[label_values] = value
+
+    def value(self, *label_values) -> float:
+        """
+        Return the current value of one series.
+        """
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def samples(self) -> list:
+        """
+        Return the Prometheus sample lines of every series.
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}" for values, value in items]
+
+class Histogram:
+    """
+    A histogram with labels and fixed cumulative buckets (latencies by default).
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *label_values) -> None:
+        """
+        Record one observation in the series of the given label values.
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *label_values) -> int:
+        """
+        Return the number of observations of one series.
+        """
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[-1] if series is not None else 0
+
+    def samples(self) -> list:
+        """
+        Return the Prometheus bucket, sum and count lines of every series.
+        """
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        lines = []
+        for values, series in items:
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), series[:-2] + [series[-1]]):
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+class MetricsRegistry:
+    """
+    The set of metrics exported at `/metrics`.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """
+        Add a metric to the registry and return it.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics
+registry = MetricsRegistry()
+stage_seconds = registry.register(Histogram(
+    "rag_stage_duration_seconds", "Duration of each pipeline stage.", ("stage",)))
+stage_errors = registry.register(Counter(
+    "rag_stage_errors_total", "Exceptions raised by each pipeline stage.", ("stage", "error")))
+request_seconds = registry.register(Histogram(
+    "rag_request_duration_seconds", "Duration of HTTP requests.", ("path", "status")))
+llm_tokens = registry.register(Counter(
+    "rag_llm_tokens_total", "Tokens sent to and generated by the LLM.", ("model", "kind")))
+cache_requests = registry.register(Counter(
+    "rag_cache_requests_total", "Lookups of the LLM and semantic caches.", ("cache", "result")))
+prompt_tokens = registry.register(Histogram(
+    "rag_prompt_tokens", "Size of the RAG prompts sent to the LLM, in tokens.", buckets=TOKEN_BUCKETS))
+llm_retries = registry.register(Counter(
+    "rag_llm_retries_total", "LLM calls retried after a rate-limit or upstream error.", ("error",)))
+llm_rejected = registry.register(Counter(
+    "rag_llm_rejected_total", "LLM calls refused without reaching the API.", ("reason",)))
+admission_requests = registry.register(Counter(
+    "rag_admission_requests_total", "Admission decisions of each pipeline stage.", ("stage", "result")))
+admission_queue_depth = registry.register(Gauge(
+    "rag_admission_queue_depth", "Requests waiting for a slot of each pipeline stage.", ("stage",)))
+admission_in_flight = registry.register(Gauge(
+    "rag_admission_in_flight", "Requests holding a slot of each pipeline stage.", ("stage",)))
+coalesced_requests = registry.register(Counter(
+    "rag_coalesced_requests_total", "Requests answered by the pipeline run of an identical in-flight query."))
+
+class _Span:
+    """
+    Times a block and records it as one stage (see `span`).
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.start
+        stage_seconds.observe(elapsed, self.stage)
+        # Cancellation is not a failure of the stage
+        if exc_type is not None and issubclass(exc_type, Exception):
+            stage_errors.inc(self.stage, exc_type.__name__)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed * 1000.0
+        return False
+
+class _NoopSpan:
+    """
+    Span used when metrics are disabled: enters and exits without any work.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(stage: str):
+    """
+    Time a block of the pipeline as one stage.
+
+    The duration is added to the `rag_stage_duration_seconds` histogram and, inside a
+    request started with `start_request_timings`, to that request's timings. An
+    exception escaping the block is counted in `rag_stage_errors_total` and re-raised
+    unchanged. When `METRICS_ENABLED` is off this returns a shared no-op context manager.
+
+    Works in sync and async code (`with span("encode"): ...`).
+
+    Args:
+        stage (str): The stage name, e.g. "encode", "search" or "generate".
+
+    Returns:
+        A context manager.
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_SPAN
+    return _Span(stage)
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Count one lookup of a cache ("llm" or "semantic").
+    """
+    if METRICS_ENABLED:
+        cache_requests.inc(cache, "hit" if hit else "miss")
+
+def record_llm_tokens(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """
+    Count the tokens of one LLM call.
+    """
+    if METRICS_ENABLED:
+        llm_tokens.inc(model, "prompt", amount=prompt_tokens)
+        llm_tokens.inc(model, "completion", amount=completion_tokens)
+
+def record_prompt(tokens: int) -> None:
+    """
+    Record the size of one RAG prompt, in the histogram and in the current request's prompt sizes.
+    """
+    if METRICS_ENABLED:
+        prompt_tokens.observe(tokens)
+        prompts = _request_prompts.get()
+        if prompts is not None:
+            prompts.append(tokens)
+
+def record_llm_retry(error: str) -> None:
+    """
+    Count one retried LLM call, by the name of the error that caused it.
+    """
+    if METRICS_ENABLED:
+        llm_retries.inc(error)
+
+def record_llm_rejected(reason: str) -> None:
+    """
+    Count one LLM call refused locally (e.g. "circuit_open").
+    """
+    if METRICS_ENABLED:
+        llm_rejected.inc(reason)
+
+def record_admission(stage: str, result: str, in_flight: int, waiting: int) -> None:
+    """
+    Count one admission decision of a pipeline stage ("admitted", "queue_full" or
+    "queue_timeout") and update the stage's occupancy gauges.
+    """
+    if METRICS_ENABLED:
+        admission_requests.inc(stage, result)
+        update_admission(stage, in_flight, waiting)
+
+def update_admission(stage: str, in_flight: int, waiting: int) -> None:
+    """
+    Update the occupancy gauges of a pipeline stage.
+    """
+    if METRICS_ENABLED:
+        admission_in_flight.set(in_flight, stage)
+        admission_queue_depth.set(waiting, stage)
+
+def record_coalesced() -> None:
+    """
+    Count one request that joined the pipeline run of an identical in-flight query.
+    """
+    if METRICS_ENABLED:
+        coalesced_requests.inc()
+
+def record_request(path: str, status: int, seconds: float) -> None:
+    """
+    Record the duration of one HTTP request.
+    """
+    if METRICS_ENABLED:
+        request_seconds.observe(seconds, path, str(status))
+
+def start_request_timings():
+    """
+    Start collecting the stage timings of the current request.
+
+    Spans entered in this context, and in tasks and executor calls started from it with
+    a copy of the context, add their durations to the returned dict.
+
+    Returns:
+        tuple: (timings dict, token for `stop_request_timings`).
+    """
+    timings = {}
+    return timings, _request_timings.set(timings)
+
+def stop_request_timings(token) -> None:
+    """
+    Stop collecting the stage timings started with `start_request_timings`.
+    """
+    _request_timings.reset(token)
+
+def start_request_prompts():
+    """
+    Start collecting the prompt sizes of the current request (see `start_request_timings`).
+
+    Returns:
+        tuple: (list of prompt sizes in tokens, token for `stop_request_prompts`).
+    """
+    prompts = []
+    return prompts, _request_prompts.set(prompts)
+
+def stop_request_prompts(token) -> None:
+    """
+    Stop collecting the prompt sizes started with `start_request_prompts`.
+    """
+    _request_prompts.reset(token)
+
+def format_timings(timings: dict) -> str:
+    """
+    Format stage timings for the `X-Timing` header, in the `Server-Timing` syntax.
+
+    Example: "load;dur=0.01, encode;dur=4.20, gate;dur=0.15, search;dur=1.73, generate;dur=812.40".
+    """
+    return ", ".join(f"{stage};dur={ms:.2f}" for stage, ms in timings.items())
+
+def render_metrics() -> str:
+    """
+    Return every metric in the Prometheus text exposition format.
+    """
+    return registry.render()
@@ -1,5 +1,41 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 
+# Conditions kept in the cleaned dataset
+RELEVANT_CONDITIONS = r"(?i)depression|major depressive disorder|bipolar depression|anxiousness associated with depression"
+
+def _clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filter and clean a block of raw reviews.
+
+    Every step works row by row, so cleaning a file chunk by chunk gives the same rows
+    as cleaning it at once.
+
+    Args:
+        df (pd.DataFrame): Raw reviews.
+
+    Returns:
+        pd.DataFrame: The cleaned reviews.
+    """
+    # Filter for rows where the 'condition' column contains relevant conditions
+    df = df[df["condition"].str.contains(RELEVANT_CONDITIONS, na=False)]
+
+    # Drop rows with missing values in the 'text' or 'rating_overall' columns
+    df = df.dropna(subset=["text", "rating_overall"])
+
+    # Clean text data: convert to lowercase and remove non-alphabetic characters
+    df["text"] = df["text"].str.lower().str.replace(r"[^a-z\s]", "", regex=True)
+
+    return df
+
 def preprocess_data(file_path: str) -> pd.DataFrame:
     """
     Preprocess the raw WebMD reviews dataset.
@@ -19,35 +55,232 @@ def preprocess_data(file_path: str) -> pd.DataFrame:
     # Load raw data from the CSV file
     df = pd.read_csv(file_path)
 
-    # Filter for rows where the 'condition' column contains relevant conditions
-    relevant_conditions = r"(?i)depression|major depressive disorder|bipolar depression|anxiousness associated with depression"
-    df = df[df["condition"].str.contains(relevant_conditions, na=False)]
+    # Steps 2-4: filter and clean the reviews
+    return _clean_chunk(df)
 
-    # Drop rows with missing values in the 'text' or 'rating_overall' columns
-    df = df.dropna(subset=["text", "rating_overall"])
+def _common_dtype(current, new):
+    """
+    Combine the dtypes inferred for one column in two chunks, as pandas does for a whole file.
+    """
+    if current is None or current == new:
+        return new
+    numeric = [pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in (current, new)]
+    if all(numeric):
+        return np.result_type(current, new)
+    return np.dtype(object)
 
-    # Clean text data: convert to lowercase and remove non-alphabetic characters
-    df["text"] = df["text"].str.lower().str.replace(r"[^a-z\s]", "", regex=True)
+def infer_dtypes(file_path: str, chunk_size: int) -> dict:
+    """
+    Infer the dtype of every column over the whole file, one chunk at a time.
 
-    return df
+    Chunks are parsed independently, so a column holding integers in one chunk and missing
+    values in another would be written as "5" and "5.0". Reading every chunk with the
+    dtypes of the whole file keeps the streaming output identical to `preprocess_data`.
+
+    Args:
+        file_path (str): Path to the raw CSV file.
+        chunk_size (int): Number of rows parsed at a time.
+
+    Returns:
+        dict: Maps each column to its dtype.
+    """
+    dtypes = {}
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+        for column in chunk.columns:
+            # An all-missing block says nothing about the column's type
+            if chunk[column].isna().all():
+                dtypes.setdefault(column, None)
+                continue
+            dtypes[column] = _common_dtype(dtypes.get(column), chunk[column].dtype)
+    return {column: dtype for column, dtype in dtypes.items() if dtype is not None}
+
+class _ParquetWriter:
+    """
+    Append cleaned chunks to a Parquet file (requires the optional `pyarrow` package).
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet output requires pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self._writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+def preprocess_streaming(
+    file_path: str,
+    output_path: str,
+    chunk_size: int = 100000,
+    workers: int = None,
+    output_format: str = "csv",
+    report_every: float = 5.0,
+) -> dict:
+    """
+    Preprocess a raw dataset of any size with bounded memory, using all CPU cores.
+
+    Workflow:
+    1. Infer the column dtypes over the whole file (see `infer_dtypes`).
+    2. Read the file in chunks of `chunk_size` rows.
+    3. Filter and clean the chunks in a pool of `workers` processes, with at most two
+       chunks per worker in flight.
+    4. Append the cleaned chunks to the output, in input order, as they complete.
+
+    Memory use depends on the chunk size and number of workers, not on the file size. The
+    CSV output is byte-identical to `preprocess_data(file_path).to_csv(output_path, index=False)`.
+
+    Args:
+        file_path (str): Path to the raw dataset file (CSV format).
+        output_path (str): Path of the cleaned dataset.
+        chunk_size (int): Number of rows per chunk.
+        workers (int): Number of worker processes (default: number of CPUs).
+        output_format (str): "csv", or "parquet" (requires pyarrow).
+        report_every (float): Seconds between two progress reports; 0 disables them.
+
+    Returns:
+        dict: Rows read and written, chunks, elapsed seconds and throughput.
+    """
+    if output_format not in ("csv", "parquet"):
+        raise ValueError(f"Unknown output format '{output_format}'. Choose 'csv' or 'parquet'.")
+    workers = workers or os.cpu_count() or 1
+    total_bytes = os.path.getsize(file_path)
+    start = time.monotonic()
+    last_report = start
+    summary = {"rows_read": 0, "rows_written": 0, "chunks": 0}
+
+    # Step 1: Dtypes of the whole file, so that every chunk is parsed consistently
+    dtypes = infer_dtypes(file_path, chunk_size)
+
+    parquet = _ParquetWriter(output_path + ".tmp") if output_format == "parquet" else None
+    csv_file = open(output_path + ".tmp", "w", newline="") if output_format == "csv" else None
+
+    def write(cleaned: pd.DataFrame) -> None:
+        if parquet is not None:
+            parquet.write(cleaned)
+        else:
+            # The header is written once, with the first chunk
+            cleaned.to_csv(csv_file, index=False, header=summary["chunks"] == 0)
+        summary["rows_written"] += len(cleaned)
+        summary["chunks"] += 1
+
+    try:
+        with open(file_path, "rb") as raw, ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            # Steps 2-3: read chunks and hand them to the pool, keeping the number in flight bounded
+            for chunk in pd.read_csv(raw, chunksize=chunk_size, dtype=dtypes):
+                summary["rows_read"] += len(chunk)
+                pending.append(pool.submit(_clean_chunk, chunk))
+                # Step 4: write finished chunks in order
+                while pending and (len(pending) >= 2 * workers or pending[0].done()):
+                    write(pending.popleft().result())
+
+                now = time.monotonic()
+                if report_every and now - last_report >= report_every:
+                    last_report = now
+                    elapsed = now - start
+                    print(
+                        f"{raw.tell() / total_bytes:6.1%} read | {summary['rows_read']:,} rows read, "
+                        f"{summary['rows_written']:,} written | {summary['rows_read'] / elapsed:,.0f} rows/s, "
+                        f"{raw.tell() / elapsed / 2**20:.1f} MB/s"
+                    )
+            while pending:
+                write(pending.popleft().result())
+    finally:
+        if parquet is not None:
+            parquet.close()
+        if csv_file is not None:
+            csv_file.close()
+    os.replace(output_path + ".tmp", output_path)
+
+    elapsed = time.monotonic() - start
+    summary["seconds"] = elapsed
+    summary["rows_per_second"] = summary["rows_read"] / elapsed if elapsed else 0.0
+    summary["mb_per_second"] = total_bytes / elapsed / 2**20 if elapsed else 0.0
+    return summary
+
+def _file_digest(path: str) -> str:
+    """
+    Return the SHA-256 digest of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verify_streaming(file_path: str, chunk_size: int = 100000, workers: int = None) -> bool:
+    """
+    Check that the streaming path writes exactly the same CSV bytes as the in-memory path.
+
+    The in-memory path loads the whole file, so run the check on a dataset that fits in RAM.
+
+    Args:
+        file_path (str): Path to the raw dataset file (CSV format).
+        chunk_size (int): Number of rows per chunk of the streaming path.
+        workers (int): Number of worker processes of the streaming path.
+
+    Returns:
+        bool: True if both outputs are byte-identical.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        in_memory_path = os.path.join(tmp, "in_memory.csv")
+        streaming_path = os.path.join(tmp, "streaming.csv")
+        preprocess_data(file_path).to_csv(in_memory_path, index=False)
+        preprocess_streaming(file_path, streaming_path, chunk_size=chunk_size, workers=workers, report_every=0)
+        return _file_digest(in_memory_path) == _file_digest(streaming_path)
 
 if __name__ == "__main__":
     """
     Main execution block:
-    1. Calls the `preprocess_data` function to clean the dataset.
+    1. Calls the `preprocess_data` function to clean the dataset (or `preprocess_streaming` with `--stream`).
     2. Saves the preprocessed data to a new CSV file.
     """
+    parser = argparse.ArgumentParser(description="Clean the raw WebMD reviews dataset.")
+    parser.add_argument("--input", default="data/webmd_reviews.csv", help="Raw dataset (CSV).")
+    parser.add_argument("--output", default="data/cleaned_reviews.csv", help="Cleaned dataset.")
+    parser.add_argument("--stream", action="store_true", help="Process the file in chunks over a process pool, with bounded memory.")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows per chunk in streaming mode.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes in streaming mode (default: number of CPUs).")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Output format in streaming mode.")
+    parser.add_argument("--verify", action="store_true", help="Check that streaming and in-memory outputs are byte-identical.")
+    args = parser.parse_args()
+
     # Input file path
-    input_file = "data/webmd_reviews.csv"
-    
+    input_file = args.input
+
     # Output file path
-    output_file = "data/cleaned_reviews.csv"
-
-    # Preprocess the data
-    data = preprocess_data(input_file)
-    
-    # Save the cleaned data to a new CSV file
-    data.to_csv(output_file, index=False)
-    
+    output_file = args.output
+
+    if args.verify:
+        identical = verify_streaming(input_file, chunk_size=args.chunk_size, workers=args.workers)
+        print("Streaming output is byte-identical to the in-memory output." if identical else "Streaming output DIFFERS from the in-memory output.")
+        raise SystemExit(0 if identical else 1)
+
+    if args.stream:
+        # Preprocess the data chunk by chunk and append it to the output
+        summary = preprocess_streaming(input_file, output_file, args.chunk_size, args.workers, args.format)
+        print(
+            f"Preprocessed {summary['rows_read']:,} rows into {summary['rows_written']:,} in {summary['seconds']:.1f}s "
+            f"({summary['rows_per_second']:,.0f} rows/s, {summary['mb_per_second']:.1f} MB/s)"
+        )
+    else:
+        # Preprocess the data
+        data = preprocess_data(input_file)
+
+        # Save the cleaned data to a new CSV file
+        data.to_csv(output_file, index=False)
+
     # Print success message
     #print(f"Preprocessed data saved to {output_file}")
@@ -0,0 +1,320 @@
+import argparse
+import os
+
+import numpy as np
+
+#from src.config import EMBEDDING_MODEL, QUERY_ENCODER, ONNX_MODEL_DIR, TOP_K  # Uncomment this if using relative imports
+#from src.config import QUERY_ENCODER_PARITY_SAMPLE, QUERY_ENCODER_MIN_COSINE  # Uncomment this if using relative imports
+from config import EMBEDDING_MODEL, QUERY_ENCODER, ONNX_MODEL_DIR, TOP_K  # Encoder model, backend and export location
+from config import QUERY_ENCODER_PARITY_SAMPLE, QUERY_ENCODER_MIN_COSINE  # Parity check settings
+
+# Query encoder backends, from the reference implementation to the fastest
+ENCODER_BACKENDS = ["sentence_transformers", "torch", "torch_int8", "onnx_int8"]
+
+# Token limit of all-MiniLM-L6-v2; longer texts are truncated, as by SentenceTransformer
+MAX_SEQ_LENGTH = 256
+
+# File name of the quantized model in the ONNX export directory
+ONNX_MODEL_FILE = "model_int8.onnx"
+
+def hub_model_name(model_name: str) -> str:
+    """
+    Return the Hugging Face Hub name of a SentenceTransformer model.
+
+    SentenceTransformer resolves short names such as "all-MiniLM-L6-v2" to the
+    "sentence-transformers" organization; `transformers` needs the full name.
+    """
+    if os.path.isdir(model_name) or "/" in model_name:
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Scale embeddings to unit length.
+    """
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return (embeddings / np.maximum(norms, 1e-12)).astype("float32")
+
+class TransformerQueryEncoder:
+    """
+    Sentence encoder running a transformer without the `sentence_transformers` package.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline of SentenceTransformer: tokenization
+    truncated to 256 tokens, mean pooling of the token embeddings over the attention
+    mask, and L2 normalization. Subclasses provide the forward pass.
+    """
+
+    def __init__(self, tokenizer, max_length: int = MAX_SEQ_LENGTH):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.dimension = None
+
+    def _forward(self, inputs: dict) -> np.ndarray:
+        """
+        Return the (batch, tokens, dimension) token embeddings of tokenized inputs.
+        """
+        raise NotImplementedError
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Encode texts into normalized float32 embeddings, like `SentenceTransformer.encode`.
+
+        Args:
+            texts (str or list): A text or a list of texts.
+            batch_size (int): Number of texts per forward pass.
+
+        Returns:
+            np.ndarray: A (dimension,) array for a single text, or a (len(texts), dimension) array.
+        """
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            tokens = self._forward(inputs)
+            mask = inputs["attention_mask"][..., None].astype("float32")
+            batches.append((tokens * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9))
+        if not batches:
+            return np.empty((0, self.dimension or 0), dtype="float32")
+        embeddings = _normalize(np.vstack(batches))
+        self.dimension = embeddings.shape[1]
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """
+        Return the embedding dimension.
+        """
+        if self.dimension is None:
+            self.encode(["dimension"])
+        return self.dimension
+
+class TorchQueryEncoder(TransformerQueryEncoder):
+    """
+    PyTorch query encoder, optionally with its linear layers dynamically quantized to int8.
+
+    Dynamic quantization stores the weights of every `nn.Linear` layer as int8 and
+    quantizes activations on the fly, which speeds up CPU inference of small
+    transformers with little loss of accuracy. No calibration data is needed.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, quantize: bool = True):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        name = hub_model_name(model_name)
+        super().__init__(AutoTokenizer.from_pretrained(name))
+        self._torch = torch
+        model = AutoModel.from_pretrained(name).eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def _forward(self, inputs: dict) -> np.ndarray:
+        with self._torch.inference_mode():
+            output = self.model(**{name: self._torch.from_numpy(value) for name, value in inputs.items()})
+        return output.last_hidden_state.float().numpy()
+
+class OnnxQueryEncoder(TransformerQueryEncoder):
+    """
+    ONNX Runtime query encoder over the int8 model written by `export_onnx_int8`.
+    """
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx_int8 query encoder requires onnxruntime: pip install onnxruntime")
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"No ONNX model at '{model_path}'. Run `python src/query_encoder.py --export-onnx` first.")
+        super().__init__(AutoTokenizer.from_pretrained(model_dir))
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def _forward(self, inputs: dict) -> np.ndarray:
+        feeds = {name: inputs[name].astype("int64") for name in self.input_names if name in inputs}
+        return self.session.run(None, feeds)[0]
+
+def load_query_encoder(model_name: str = EMBEDDING_MODEL, backend: str = QUERY_ENCODER, onnx_dir: str = ONNX_MODEL_DIR):
+    """
+    Load the query encoder of the given backend.
+
+    The libraries of a backend (PyTorch, transformers, sentence_transformers, ONNX
+    Runtime) are imported here rather than when the module is imported, so that tools
+    that never encode a query start quickly.
+
+    Args:
+        model_name (str): Name of the SentenceTransformer model (the one that built the index).
+        backend (str): One of ENCODER_BACKENDS.
+        onnx_dir (str): Directory of the ONNX export, for the "onnx_int8" backend.
+
+    Returns:
+        An encoder with SentenceTransformer's `encode` and `get_sentence_embedding_dimension`.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    if backend == "sentence_transformers":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+    if backend == "torch":
+        return TorchQueryEncoder(model_name, quantize=False)
+    if backend == "torch_int8":
+        return TorchQueryEncoder(model_name, quantize=True)
+    if backend == "onnx_int8":
+        return OnnxQueryEncoder(onnx_dir)
+    raise ValueError(f"Unknown query encoder '{backend}'. Choose one of: {', '.join(ENCODER_BACKENDS)}.")
+
+def export_onnx_int8(model_name: str = EMBEDDING_MODEL, output_dir: str = ONNX_MODEL_DIR) -> str:
+    """
+    Export the embedding model to ONNX and quantize its weights to int8.
+
+    Requires `onnx` and `onnxruntime` in addition to PyTorch and transformers, at export
+    time only.
+
+    Args:
+        model_name (str): Name of the SentenceTransformer model.
+        output_dir (str): Directory receiving the quantized model and the tokenizer files.
+
+    Returns:
+        str: Path of the quantized model.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise ImportError("Exporting the ONNX query encoder requires onnx and onnxruntime: pip install onnx onnxruntime")
+
+    name = hub_model_name(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    model = AutoModel.from_pretrained(name).eval()
+    tokenizer.save_pretrained(output_dir)
+
+    # Step 1: fp32 export with dynamic batch and sequence dimensions
+    inputs = tokenizer(["An example review of an antidepressant."], return_tensors="pt")
+    input_names = list(inputs.keys())
+    fp32_path = os.path.join(output_dir, "model_fp32.onnx")
+    dynamic_axes = {input_name: {0: "batch", 1: "tokens"} for input_name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "tokens"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            model, (dict(inputs),), fp32_path, input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes, opset_version=17, dynamo=False,
+        )
+
+    # Step 2: int8 weights, written under a temporary name then renamed
+    output_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, output_path + ".tmp", weight_type=QuantType.QInt8)
+    os.replace(output_path + ".tmp", output_path)
+    os.remove(fp32_path)
+    return output_path
+
+def encoder_parity(encoder, index, metadata, sample_size: int = QUERY_ENCODER_PARITY_SAMPLE, k: int = TOP_K):
+    """
+    Measure how closely an encoder reproduces the embeddings stored in the FAISS index.
+
+    Reviews spread evenly over the index are encoded again from their `combined_text`
+    (the text indexed by `vector_store.py`) and compared with their stored vectors, by
+    cosine similarity and by the overlap of the `k` nearest neighbours each vector
+    retrieves.
+
+    Args:
+        encoder: The query encoder.
+        index (faiss.Index): The FAISS index.
+        metadata (MetadataStore): The metadata of the indexed reviews.
+        sample_size (int): Number of reviews compared.
+        k (int): Number of neighbours compared per review.
+
+    Returns:
+        dict or None: {"reviews", "cosine_mean", "cosine_min", "cosine_p01", "neighbour_overlap"},
+        or None if the index is empty or cannot reconstruct its vectors (e.g. one built outside vector_store.py).
+    """
+    if sample_size <= 0 or index.ntotal == 0:
+        return None
+    positions = np.linspace(0, index.ntotal - 1, num=min(sample_size, index.ntotal)).astype("int64")
+    # Indexes written by vector_store.py reconstruct vectors by review ID
+    try:
+        stored = index.reconstruct_batch(np.asarray(metadata.keys(positions), dtype="int64"))
+    except RuntimeError:
+        return None
+    texts = metadata.take(positions)["combined_text"].astype(str).tolist()
+    encoded = np.asarray(encoder.encode(texts), dtype="float32")
+    cosine = (_normalize(stored) * _normalize(encoded)).sum(axis=1)
+
+    # Searched as queries are, with the encoder's own output
+    k = min(k, index.ntotal)
+    _, expected = index.search(stored, k)
+    _, found = index.search(encoded, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected.tolist(), found.tolist())])
+    return {
+        "reviews": len(positions),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        "cosine_p01": float(np.percentile(cosine, 1)),
+        "neighbour_overlap": float(overlap),
+    }
+
+def check_encoder_parity(encoder, index, metadata, sample_size: int = QUERY_ENCODER_PARITY_SAMPLE, min_cosine: float = QUERY_ENCODER_MIN_COSINE):
+    """
+    Reject an encoder that disagrees with the embeddings stored in the index.
+
+    Args:
+        encoder: The query encoder.
+        index (faiss.Index): The FAISS index.
+        metadata (MetadataStore): The metadata of the indexed reviews.
+        sample_size (int): Number of reviews compared (0: no check).
+        min_cosine (float): Lowest accepted mean cosine similarity.
+
+    Returns:
+        dict or None: The parity report (see `encoder_parity`), None if not checked.
+
+    Raises:
+        ValueError: If the mean cosine similarity is below `min_cosine`.
+    """
+    report = encoder_parity(encoder, index, metadata, sample_size)
+    if report is not None and report["cosine_mean"] < min_cosine:
+        raise ValueError(
+            f"The query encoder disagrees with the indexed embeddings: mean cosine similarity "
+            f"{report['cosine_mean']:.4f} < {min_cosine} over {report['reviews']} reviews. "
+            f"Check EMBEDDING_MODEL or use QUERY_ENCODER=sentence_transformers."
+        )
+    return report
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Exports the int8 ONNX query encoder (--export-onnx), and/or
+    - Reports the parity of a backend with the embeddings stored in the FAISS index (--parity).
+
+    Example:
+        python src/query_encoder.py --export-onnx
+        python src/query_encoder.py --backend onnx_int8 --parity 1000
+    """
+    parser = argparse.ArgumentParser(description="Export and check the quantized query encoders.")
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default=QUERY_ENCODER, help="Query encoder backend.")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="SentenceTransformer model name or local directory.")
+    parser.add_argument("--onnx-dir", default=ONNX_MODEL_DIR, help="Directory of the ONNX export.")
+    parser.add_argument("--export-onnx", action="store_true", help="Export the model to int8 ONNX in --onnx-dir.")
+    parser.add_argument("--parity", type=int, default=0, metavar="N", help="Compare N reviews encoded by the backend with the index.")
+    args = parser.parse_args()
+
+    if args.export_onnx:
+        print(f"Quantized ONNX model saved to {export_onnx_int8(args.model, args.onnx_dir)}")
+    if args.parity:
+        #from src.config import INDEX_PATH, METADATA_PATH  # Uncomment this if using relative imports
+        #from src.retrieval_engine import RetrievalEngine  # Uncomment this if using relative imports
+        from config import INDEX_PATH, METADATA_PATH  # Store location
+        from retrieval_engine import RetrievalEngine  # Index and metadata loading
+
+        engine = RetrievalEngine(INDEX_PATH, METADATA_PATH, args.model, encoder_backend=args.backend, onnx_dir=args.onnx_dir, auto_reload=False, check_parity=False)
+        report = encoder_parity(engine.model, engine.snapshot.index, engine.snapshot.metadata, args.parity)
+        print(report if report is not None else "The index cannot reconstruct its vectors; parity cannot be measured.")
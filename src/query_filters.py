@@ -0,0 +1,209 @@
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Metadata columns with a precomputed inverted index, usable as search constraints
+FILTER_COLUMNS = ["gender", "age", "drug_name"]
+
+# Words naming a gender, mapped to the normalized values of the `gender` column
+GENDER_PATTERNS = {
+    "female": re.compile(r"\b(?:women|woman|females?|ladies|lady|girls?|mothers?|moms?|wives|wife)\b"),
+    "male": re.compile(r"\b(?:men|man|males?|gentlemen|guys?|boys?|fathers?|dads?|husbands?)\b"),
+}
+
+# Age expressions, each mapped to an inclusive (low, high) range of years
+AGE_PATTERNS = [
+    # "aged 30 to 40", "between 30 and 40", "ages 30-40"
+    (re.compile(r"\b(?:aged?|ages|between)\s+(\d{1,2})\s*(?:-|to|and)\s*(\d{1,2})\b"), lambda m: (int(m[1]), int(m[2]))),
+    # "30-40 year olds", "30 to 40 years old"
+    (re.compile(r"\b(\d{1,2})\s*(?:-|to)\s*(\d{1,2})\s*(?:years?|yrs?|y/?o)\b"), lambda m: (int(m[1]), int(m[2]))),
+    # "over 65", "older than 50"
+    (re.compile(r"\b(?:over|above|older than)\s+(\d{1,2})\b"), lambda m: (int(m[1]), 200)),
+    # "under 25", "younger than 18"
+    (re.compile(r"\b(?:under|below|younger than)\s+(\d{1,2})\b"), lambda m: (0, int(m[1]))),
+    # "in my 30s", "people in their 40's"
+    (re.compile(r"\b([1-9])0'?s\b"), lambda m: (int(m[1]) * 10, int(m[1]) * 10 + 9)),
+    # "35 year old", "35-year-old", "aged 35"
+    (re.compile(r"\b(\d{1,2})[- ]?(?:years?|yrs?)[- ]?old\b"), lambda m: (int(m[1]), int(m[1]))),
+    (re.compile(r"\baged?\s+(\d{1,2})\b"), lambda m: (int(m[1]), int(m[1]))),
+    (re.compile(r"\b(?:teens?|teenagers?|adolescents?)\b"), lambda m: (13, 19)),
+    (re.compile(r"\b(?:elderly|seniors?|older adults)\b"), lambda m: (65, 200)),
+]
+
+def _normalize_value(value) -> str:
+    """
+    Normalize a metadata value for matching: lowercase, surrounding whitespace removed.
+    """
+    return str(value).strip().lower()
+
+def parse_age_bucket(bucket: str):
+    """
+    Parse an age bucket of the dataset, e.g. "25-34" or "75 or over".
+
+    Returns:
+        tuple or None: The inclusive (low, high) range, or None if the bucket is not a range.
+    """
+    match = re.match(r"^\s*(\d+)\s*-\s*(\d+)\s*$", bucket)
+    if match:
+        return int(match[1]), int(match[2])
+    match = re.match(r"^\s*(\d+)\s*(?:\+|or over|and over|or older)\s*$", bucket)
+    if match:
+        return int(match[1]), 200
+    return None
+
+class FilterIndex:
+    """
+    Inverted indexes over the structured review columns.
+
+    For every (column, value) pair of `FILTER_COLUMNS`, the sorted review IDs of the
+    matching reviews. Constraints on one column are OR-ed (e.g. two age buckets) and
+    constraints on different columns AND-ed, by merging the sorted ID lists, so the cost
+    of a filter depends on the size of the lists involved rather than on the corpus size.
+    """
+
+    def __init__(self, lists: dict):
+        """
+        Args:
+            lists (dict): Maps (column, normalized value) to a sorted int64 array of review IDs.
+        """
+        self.lists = lists
+        self.drug_pattern = None
+        drugs = sorted(self.values("drug_name"), key=len, reverse=True)
+        if drugs:
+            # Longest names first, so "wellbutrin xl" wins over "wellbutrin"
+            self.drug_pattern = re.compile(r"(?<!\w)(" + "|".join(re.escape(drug) for drug in drugs) + r")(?!\w)")
+
+    def values(self, column: str) -> list:
+        """
+        Return the normalized values of a column.
+        """
+        return [value for col, value in self.lists if col == column]
+
+    def ids(self, filters: dict) -> np.ndarray:
+        """
+        Return the review IDs matching every constraint.
+
+        Args:
+            filters (dict): Maps a column to the list of accepted normalized values.
+
+        Returns:
+            np.ndarray: The sorted matching review IDs (possibly empty).
+        """
+        matching = None
+        for column, values in filters.items():
+            lists = [self.lists.get((column, value), np.empty(0, dtype="int64")) for value in values]
+            column_ids = lists[0] if len(lists) == 1 else np.unique(np.concatenate(lists))
+            matching = column_ids if matching is None else np.intersect1d(matching, column_ids, assume_unique=True)
+        return matching if matching is not None else np.empty(0, dtype="int64")
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a NumPy `.npz` file, replacing the previous one atomically.
+        """
+        keys = list(self.lists)
+        arrays = [self.lists[key] for key in keys]
+        offsets = np.zeros(len(arrays) + 1, dtype="int64")
+        np.cumsum([len(ids) for ids in arrays], out=offsets[1:])
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            columns=np.array([column for column, _ in keys], dtype=str),
+            values=np.array([value for _, value in keys], dtype=str),
+            offsets=offsets,
+            ids=np.concatenate(arrays) if arrays else np.empty(0, dtype="int64"),
+        )
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "FilterIndex":
+        """
+        Read an index written by `save`.
+        """
+        with np.load(path) as data:
+            columns, values, offsets, ids = data["columns"], data["values"], data["offsets"], data["ids"]
+        lists = {
+            (str(column), str(value)): ids[offsets[i]:offsets[i + 1]]
+            for i, (column, value) in enumerate(zip(columns, values))
+        }
+        return cls(lists)
+
+def filter_index_path(metadata_path: str) -> str:
+    """
+    Return the path of the filter index written next to a metadata CSV file.
+    """
+    return os.path.splitext(metadata_path)[0] + ".filters.npz"
+
+def build_filter_index(df: pd.DataFrame, columns: list = FILTER_COLUMNS, id_column: str = "review_id") -> FilterIndex:
+    """
+    Build the inverted indexes of the structured columns.
+
+    Args:
+        df (pd.DataFrame): The metadata rows, with a review ID column.
+        columns (list): Columns to index; missing columns are skipped.
+        id_column (str): Name of the review ID column.
+
+    Returns:
+        FilterIndex: The index.
+    """
+    lists = {}
+    ids = df[id_column].to_numpy(dtype="int64")
+    for column in columns:
+        if column not in df.columns:
+            continue
+        values = df[column].map(_normalize_value, na_action="ignore")
+        for value, positions in values.groupby(values).indices.items():
+            lists[(column, value)] = np.sort(ids[positions])
+    return FilterIndex(lists)
+
+def parse_query_filters(query: str, filter_index: FilterIndex) -> dict:
+    """
+    Extract gender, age and drug constraints from a user query.
+
+    Only values present in the data are returned: a gender must be a value of the
+    `gender` column, an age range is mapped to the overlapping age buckets, and a drug
+    must be named exactly as in the `drug_name` column (case-insensitive). A query naming
+    both genders is not constrained on gender.
+
+    Args:
+        query (str): The user's query, e.g. "Prozac for women aged 30 to 40".
+        filter_index (FilterIndex): The index providing the known values.
+
+    Returns:
+        dict: Maps each constrained column to the accepted normalized values, e.g.
+        {"gender": ["female"], "age": ["25-34", "35-44"], "drug_name": ["prozac"]}.
+    """
+    text = query.lower()
+    filters = {}
+
+    # Gender: exactly one gender mentioned
+    genders = [gender for gender, pattern in GENDER_PATTERNS.items() if pattern.search(text)]
+    if len(genders) == 1 and genders[0] in filter_index.values("gender"):
+        filters["gender"] = genders
+
+    # Age: the first age expression, mapped to the buckets it overlaps
+    for pattern, to_range in AGE_PATTERNS:
+        match = pattern.search(text)
+        if match is None:
+            continue
+        low, high = sorted(to_range(match))
+        buckets = []
+        for bucket in filter_index.values("age"):
+            bounds = parse_age_bucket(bucket)
+            if bounds is not None and bounds[0] <= high and bounds[1] >= low:
+                buckets.append(bucket)
+        if buckets:
+            filters["age"] = sorted(buckets)
+        break
+
+    # Drugs: every drug name of the dataset mentioned in the query
+    if filter_index.drug_pattern is not None:
+        drugs = sorted(set(filter_index.drug_pattern.findall(text)))
+        if drugs:
+            filters["drug_name"] = drugs
+
+    return filters
@@ -1,25 +1,308 @@
-import faiss
+import asyncio
+import contextvars
+
 import pandas as pd
-from sentence_transformers import SentenceTransformer
-#from src.llm_handler import call_llm# Uncomment this if using relative imports
-from llm_handler import call_llm  # Centralized LLM interaction utility
 
-def query_retrieval(user_query: str, index_path: str, metadata_path: str) -> str:
+#from src.llm_handler import call_llm, call_llm_async, call_llm_stream, call_llm_stream_async, LLMError  # Uncomment this if using relative imports
+#from src.retrieval_engine import RetrievalEngine, IndexLoadError, get_engine  # Uncomment this if using relative imports
+#from src.rating_cube import format_ranking, format_ranking_context  # Uncomment this if using relative imports
+#from src.context_builder import build_context, count_tokens  # Uncomment this if using relative imports
+from llm_handler import call_llm, call_llm_async, call_llm_stream, call_llm_stream_async, LLMError  # Centralized LLM interaction utility
+from retrieval_engine import RetrievalEngine, IndexLoadError, get_engine  # Resident FAISS index, metadata and encoder
+from rating_cube import format_ranking, format_ranking_context  # Answers and LLM context from the rating cube
+from context_builder import build_context, count_tokens  # Token-budgeted, deduplicated review context
+#from src.config import SEMANTIC_CACHE_VERIFY_IDS, RATING_CUBE_MODE, CONTEXT_FETCH_K  # Uncomment this if using relative imports
+#from src.metrics import span, record_cache, record_prompt  # Uncomment this if using relative imports
+from config import SEMANTIC_CACHE_VERIFY_IDS, RATING_CUBE_MODE, CONTEXT_FETCH_K  # Semantic cache verification, ranking fast path, reviews retrieved
+from metrics import span, record_cache, record_prompt  # Stage timings, cache counters and prompt sizes
+
+def build_prompt(
+    user_query: str,
+    retrieved_metadata: pd.DataFrame,
+    statistics: str = None,
+    query_embedding=None,
+    vectors=None,
+) -> str:
+    """
+    Build the RAG prompt from the user's query and the retrieved reviews.
+
+    The reviews are deduplicated, narrowed down to the most relevant and diverse ones and
+    written as a compact table within the context token budget (see `build_context`).
+
+    Args:
+        user_query (str): The user's query.
+        retrieved_metadata (pd.DataFrame): The retrieved metadata rows, most similar first.
+        statistics (str): Rating statistics over all matching reviews, if any.
+        query_embedding (np.ndarray): The (1, dimension) query embedding, for diversity selection.
+        vectors (np.ndarray): The embeddings of the retrieved rows, for deduplication and diversity selection.
+
+    Returns:
+        str: The prompt sent to the LLM.
+    """
+    context = build_context(retrieved_metadata, query_embedding, vectors)
+    statistics = f"Statistics:\n{statistics}\n\n" if statistics else ""
+    return (
+        f"You are an expert assistant for depression drug recommendations. Based on the following context, "
+        f"answer the user's question concisely and accurately:\n\n"
+        f"{statistics}"
+        f"Context:\n{context}\n\n"
+        f"User Query: {user_query}\n\n"
+        f"Response:"
+    )
+
+def assemble_prompt(user_query: str, retrieved_metadata: pd.DataFrame, engine: RetrievalEngine, query_embedding, ranking: dict = None) -> str:
+    """
+    Build the prompt of a query from its over-fetched reviews and record its size.
+
+    Args:
+        user_query (str): The user's query.
+        retrieved_metadata (pd.DataFrame): The retrieved metadata rows, most similar first.
+        engine (RetrievalEngine): The engine holding the reviews' embeddings.
+        query_embedding (np.ndarray): The (1, dimension) query embedding.
+        ranking (dict): The rating-cube ranking of a ranking question, if any.
+
+    Returns:
+        str: The prompt sent to the LLM.
+    """
+    with span("context"):
+        vectors = engine.review_vectors(retrieved_metadata)
+        statistics = format_ranking_context(ranking) if ranking else None
+        prompt = build_prompt(user_query, retrieved_metadata, statistics, query_embedding, vectors)
+    record_prompt(count_tokens(prompt))
+    return prompt
+
+def rank_from_cube(user_query: str, engine: RetrievalEngine):
+    """
+    Return the rating-cube ranking answering the query, if it is a ranking question.
+
+    Returns:
+        dict or None: The ranking, or None when the query is not a ranking question or the
+        fast path is disabled (`RATING_CUBE_MODE` "off").
+    """
+    if RATING_CUBE_MODE == "off":
+        return None
+    return engine.rank_query(user_query)
+
+def _discard(retrieval) -> None:
+    """
+    Stop a search started by the caller whose result is no longer needed.
+    """
+    if hasattr(retrieval, "cancel"):
+        retrieval.cancel()
+    elif hasattr(retrieval, "close"):
+        # A coroutine that was never awaited
+        retrieval.close()
+
+def map_retrieval_error(e: Exception, index_path: str) -> Exception:
+    """
+    Translate an exception raised while retrieving or generating into the user-facing error.
+
+    Args:
+        e (Exception): The original exception.
+        index_path (str): Path to the FAISS index file, used in the message.
+
+    Returns:
+        Exception: The exception to raise. LLM rate limiting and unavailability (`LLMError`)
+        are returned unchanged, so that the API can answer 429 or 503.
+    """
+    if isinstance(e, LLMError):
+        return e
+    if isinstance(e, IndexLoadError):
+        # Handle errors related to loading the FAISS index
+        return Exception(f"Error: Could not read FAISS index from path {index_path}. Please ensure the index exists.")
+    if isinstance(e, (FileNotFoundError, ValueError)):
+        # Handle missing files and validation errors for the metadata file
+        return Exception(f"Error: {e}")
+    # Handle any other unexpected errors
+    return Exception(f"An unexpected error occurred during query retrieval: {e}")
+
+# Generation settings of the RAG answer, shared by every variant of the pipeline
+GENERATION_PARAMS = {"model": "gpt-3.5-turbo", "max_tokens": 300, "temperature": 0.5}
+
+class PreparedQuery:
+    """
+    A query taken through the steps shared by every variant of the pipeline, up to the LLM call.
+
+    The sync, async and streaming pipelines all run the same steps (see `prepare` and
+    `prepare_async`): rating cube, query embedding, semantic cache, retrieval and prompt.
+    They differ only in how they call the LLM, after which `finish` caches the answer.
+
+    Attributes:
+        user_query (str): The user's query.
+        engine (RetrievalEngine): The engine answering the query.
+        query_embedding (np.ndarray): The (1, dimension) query embedding, once computed.
+        ranking (dict): The rating-cube ranking of a ranking question, if any.
+        retrieved_ids (list): Review IDs of the retrieved contexts, once searched.
+        answer (str): The answer found without the LLM (rating cube or semantic cache), or None.
+        prompt (str): The prompt to send to the LLM when `answer` is None.
+    """
+
+    def __init__(self, user_query: str, engine: RetrievalEngine, query_embedding=None):
+        self.user_query = user_query
+        self.engine = engine
+        self.cache = engine.semantic_cache
+        self.version = engine.version
+        self.query_embedding = query_embedding
+        self.ranking = None
+        self.retrieved_ids = None
+        self.answer = None
+        self.prompt = None
+
+def _rank(prepared: PreparedQuery) -> None:
+    """
+    Look up the rating-cube ranking of the query, answering it directly when `RATING_CUBE_MODE` is "direct".
+    """
+    prepared.ranking = rank_from_cube(prepared.user_query, prepared.engine)
+    if prepared.ranking is not None and RATING_CUBE_MODE == "direct":
+        prepared.answer = format_ranking(prepared.ranking)
+
+def _lookup_cache(prepared: PreparedQuery) -> None:
+    """
+    Reuse the answer of a near-duplicate query, if any.
+
+    Before the search (`retrieved_ids` not known yet) the cache is only checked when
+    `SEMANTIC_CACHE_VERIFY_IDS` is disabled; after it, only when it is enabled.
+    """
+    if prepared.cache is None or SEMANTIC_CACHE_VERIFY_IDS != (prepared.retrieved_ids is not None):
+        return
+    cached = prepared.cache.lookup(prepared.query_embedding, retrieved_ids=prepared.retrieved_ids, version=prepared.version)
+    record_cache("semantic", cached is not None)
+    prepared.answer = cached
+
+def _complete(prepared: PreparedQuery, retrieved_metadata: pd.DataFrame) -> None:
+    """
+    Check the cache against the retrieved contexts, then build the prompt if there was no hit.
+    """
+    prepared.retrieved_ids = retrieved_metadata.index.tolist()
+    _lookup_cache(prepared)
+    if prepared.answer is None:
+        prepared.prompt = assemble_prompt(
+            prepared.user_query, retrieved_metadata, prepared.engine, prepared.query_embedding, prepared.ranking
+        )
+
+def prepare(user_query: str, engine: RetrievalEngine) -> PreparedQuery:
+    """
+    Run the steps of the pipeline before the LLM call.
+
+    Workflow:
+    1. Rank the drugs of ranking questions ("best drug for women over 50") from the rating
+       cube; the ranking is the answer when `RATING_CUBE_MODE` is "direct".
+    2. Generate an embedding for the user's query.
+    3. Retrieve the `CONTEXT_FETCH_K` most relevant contexts using the FAISS index.
+    4. Return the cached answer of a near-duplicate query that retrieved the same contexts, if any.
+    5. Keep the most relevant distinct contexts within the token budget and build the prompt
+       (with the rating statistics of a ranking question when `RATING_CUBE_MODE` is "context").
+
+    With `SEMANTIC_CACHE_VERIFY_IDS` disabled, the cache is checked before the FAISS
+    search, so near-duplicate queries skip both the search and the LLM call.
+
+    Args:
+        user_query (str): The user's query.
+        engine (RetrievalEngine): The retrieval engine.
+
+    Returns:
+        PreparedQuery: The query with either its `answer` or its `prompt`.
+    """
+    prepared = PreparedQuery(user_query, engine)
+
+    # Step 1: Answer ranking questions from the rating cube
+    _rank(prepared)
+    if prepared.answer is not None:
+        return prepared
+
+    # Step 2: Generate embedding for the user's query
+    with span("encode"):
+        prepared.query_embedding = engine.encode([user_query])
+    _lookup_cache(prepared)
+    if prepared.answer is not None:
+        return prepared
+
+    # Step 3: Retrieve the most relevant contexts (over-fetched for deduplication and diversity)
+    with span("search"):
+        retrieved_metadata = engine.retrieve(user_query, k=CONTEXT_FETCH_K, query_embedding=prepared.query_embedding)
+
+    # Steps 4-5: Reuse a cached answer or build the prompt
+    _complete(prepared, retrieved_metadata)
+    return prepared
+
+async def prepare_async(
+    user_query: str,
+    engine: RetrievalEngine,
+    executor=None,
+    query_embedding=None,
+    retrieval=None,
+) -> PreparedQuery:
+    """
+    Async counterpart of `prepare`.
+
+    Encoding and FAISS search are CPU-bound and run in the engine's micro-batchers (or
+    in `executor` when batching is disabled); the rating cube lookup and the prompt
+    assembly run in `executor`, so nothing blocks the event loop. Callers that already computed the query
+    embedding, or started the search (e.g. concurrently with the relevance gate), pass
+    them in; the search is cancelled if it turns out not to be needed.
+
+    Args:
+        user_query (str): The user's query.
+        engine (RetrievalEngine): The resident retrieval engine.
+        executor (concurrent.futures.Executor): Executor for encoding and search (default: the loop's).
+        query_embedding (np.ndarray): The (1, dimension) query embedding, if already computed.
+        retrieval (awaitable): A pending `engine.retrieve_async` call started by the caller.
+
+    Returns:
+        PreparedQuery: The query with either its `answer` or its `prompt`.
+    """
+    loop = asyncio.get_running_loop()
+    prepared = PreparedQuery(user_query, engine, query_embedding)
+    try:
+        # Run in a copy of the caller's context so that the stage timings reach its request
+        if RATING_CUBE_MODE != "off":
+            await loop.run_in_executor(executor, contextvars.copy_context().run, _rank, prepared)
+        if prepared.answer is not None:
+            return prepared
+
+        if prepared.query_embedding is None:
+            with span("encode"):
+                prepared.query_embedding = await engine.encode_async(user_query, executor)
+        _lookup_cache(prepared)
+        if prepared.answer is not None:
+            return prepared
+
+        if retrieval is None:
+            retrieval = engine.retrieve_async(user_query, CONTEXT_FETCH_K, prepared.query_embedding, executor)
+        with span("search"):
+            retrieved_metadata = await retrieval
+        retrieval = None
+
+        # Re-encoding the reviews, tokenizing and MMR selection are CPU-bound
+        await loop.run_in_executor(executor, contextvars.copy_context().run, _complete, prepared, retrieved_metadata)
+        return prepared
+    finally:
+        if retrieval is not None:
+            _discard(retrieval)
+
+def finish(prepared: PreparedQuery, response: str) -> str:
+    """
+    Cache the LLM's answer to a prepared query and return it.
+    """
+    if prepared.cache is not None:
+        prepared.cache.add(prepared.query_embedding, response, prepared.retrieved_ids, version=prepared.version)
+    return response
+
+def query_retrieval(user_query: str, index_path: str, metadata_path: str, engine: RetrievalEngine = None) -> str:
     """
     Retrieve relevant context for a user query from a FAISS vector store and metadata.
 
     Workflow:
-    1. Load the FAISS index and metadata file.
-    2. Validate the metadata file contains the 'combined_text' column.
-    3. Generate an embedding for the user's query.
-    4. Retrieve the top 5 most relevant contexts using the FAISS index.
-    5. Combine the retrieved contexts and pass them, along with the query, to the LLM.
-    6. Return the LLM's response.
+    1. Get the resident retrieval engine (the index, metadata and encoder are loaded once per process).
+    2. Answer from the rating cube or the semantic cache, or retrieve the relevant contexts
+       and build the prompt (see `prepare`).
+    3. Pass the prompt to the LLM and return its response.
 
     Args:
         user_query (str): The user's query.
         index_path (str): Path to the FAISS index file.
         metadata_path (str): Path to the metadata CSV file.
+        engine (RetrievalEngine): A preloaded engine to use instead of the shared one for the given paths.
 
     Returns:
         str: A response generated using the relevant context.
@@ -28,46 +311,136 @@ def query_retrieval(user_query: str, index_path: str, metadata_path: str) -> str
         Exception: If an error occurs during any step of the process.
     """
     try:
-        # Step 1: Load FAISS index and metadata file
-        index = faiss.read_index(index_path)
-        metadata = pd.read_csv(metadata_path)
-
-        # Step 2: Validate that the metadata contains the 'combined_text' column
-        if "combined_text" not in metadata.columns:
-            raise ValueError("The metadata file does not contain the 'combined_text' column.")
-
-        # Step 3: Generate embedding for the user's query
-        model = SentenceTransformer("all-MiniLM-L6-v2")  # Load a pre-trained SentenceTransformer model
-        query_embedding = model.encode([user_query])  # Encode the query into an embedding
-
-        # Step 4: Retrieve the top 5 most relevant contexts
-        distances, indices = index.search(query_embedding, k=5)  # Perform a nearest neighbor search
-        retrieved_metadata = metadata.iloc[indices[0]]  # Get metadata for the retrieved indices
-
-        # Step 5: Combine the top contexts into a single string
-        context = "\n".join(retrieved_metadata["combined_text"].astype(str).tolist())
-
-        # Step 6: Use the context and query to generate a response via the LLM
-        prompt = (
-            f"You are an expert assistant for depression drug recommendations. Based on the following context, "
-            f"answer the user's question concisely and accurately:\n\n"
-            f"Context:\n{context}\n\n"
-            f"User Query: {user_query}\n\n"
-            f"Response:"
-        )
-        response = call_llm(prompt, model="gpt-3.5-turbo", max_tokens=300, temperature=0.5)
+        # Step 1: Get the resident engine (loads and validates the index and metadata on first use)
+        if engine is None:
+            with span("load"):
+                engine = get_engine(index_path, metadata_path)
 
-        return response
+        # Step 2: Answer without the LLM, or build the prompt
+        prepared = prepare(user_query, engine)
+        if prepared.answer is not None:
+            return prepared.answer
+
+        # Step 3: Use the context and query to generate a response via the LLM
+        with span("generate"):
+            response = call_llm(prepared.prompt, **GENERATION_PARAMS)
+        return finish(prepared, response)
+
+    except Exception as e:
+        raise map_retrieval_error(e, index_path)
+
+async def query_retrieval_async(
+    user_query: str,
+    engine: RetrievalEngine,
+    executor=None,
+    query_embedding=None,
+    retrieval=None,
+) -> str:
+    """
+    Async counterpart of `query_retrieval` for the API.
+
+    The steps before the LLM call run as in `prepare_async`; the LLM call is awaited on
+    the event loop.
+
+    Args:
+        user_query (str): The user's query.
+        engine (RetrievalEngine): The resident retrieval engine.
+        executor (concurrent.futures.Executor): Executor for encoding and search (default: the loop's).
+        query_embedding (np.ndarray): The (1, dimension) query embedding, if already computed.
+        retrieval (awaitable): A pending `engine.retrieve_async` call started by the caller.
+
+    Returns:
+        str: A response generated using the relevant context.
+
+    Raises:
+        Exception: If an error occurs during any step of the process.
+    """
+    try:
+        prepared = await prepare_async(user_query, engine, executor, query_embedding, retrieval)
+        if prepared.answer is not None:
+            return prepared.answer
+
+        with span("generate"):
+            response = await call_llm_async(prepared.prompt, **GENERATION_PARAMS)
+        return finish(prepared, response)
+
+    except Exception as e:
+        raise map_retrieval_error(e, engine.index_path)
+
+def query_retrieval_stream(user_query: str, index_path: str, metadata_path: str, engine: RetrievalEngine = None):
+    """
+    Streaming counterpart of `query_retrieval`: yields the response as it is generated.
+
+    Retrieval, semantic caching and error handling are the same as in `query_retrieval`;
+    an answer found without the LLM is yielded as a single piece, and a generated answer
+    is cached once the stream completes.
+
+    Args:
+        user_query (str): The user's query.
+        index_path (str): Path to the FAISS index file.
+        metadata_path (str): Path to the metadata CSV file.
+        engine (RetrievalEngine): A preloaded engine to use instead of the shared one for the given paths.
+
+    Yields:
+        str: Successive pieces of the response.
+
+    Raises:
+        Exception: If an error occurs during any step of the process.
+    """
+    try:
+        if engine is None:
+            with span("load"):
+                engine = get_engine(index_path, metadata_path)
+        prepared = prepare(user_query, engine)
+        if prepared.answer is not None:
+            yield prepared.answer
+            return
+
+        parts = []
+        with span("generate"):
+            for delta in call_llm_stream(prepared.prompt, **GENERATION_PARAMS):
+                parts.append(delta)
+                yield delta
+        finish(prepared, "".join(parts))
+
+    except Exception as e:
+        raise map_retrieval_error(e, index_path)
+
+async def query_retrieval_stream_async(
+    user_query: str,
+    engine: RetrievalEngine,
+    executor=None,
+    query_embedding=None,
+    retrieval=None,
+):
+    """
+    Async streaming counterpart of `query_retrieval_async`.
+
+    Args:
+        user_query (str): The user's query.
+        engine (RetrievalEngine): The resident retrieval engine.
+        executor (concurrent.futures.Executor): Executor used when batching is disabled.
+        query_embedding (np.ndarray): The (1, dimension) query embedding, if already computed.
+        retrieval (awaitable): A pending `engine.retrieve_async` call started by the caller.
+
+    Yields:
+        str: Successive pieces of the response.
+
+    Raises:
+        Exception: If an error occurs during any step of the process.
+    """
+    try:
+        prepared = await prepare_async(user_query, engine, executor, query_embedding, retrieval)
+        if prepared.answer is not None:
+            yield prepared.answer
+            return
+
+        parts = []
+        with span("generate"):
+            async for delta in call_llm_stream_async(prepared.prompt, **GENERATION_PARAMS):
+                parts.append(delta)
+                yield delta
+        finish(prepared, "".join(parts))
 
-    except faiss.IOReaderError:
-        # Handle errors related to loading the FAISS index
-        raise Exception(f"Error: Could not read FAISS index from path {index_path}. Please ensure the index exists.")
-    except FileNotFoundError as e:
-        # Handle file not found errors for metadata or index files
-        raise Exception(f"Error: {e}")
-    except ValueError as e:
-        # Handle validation errors for the metadata file
-        raise Exception(f"Error: {e}")
     except Exception as e:
-        # Handle any other unexpected errors
-        raise Exception(f"An unexpected error occurred during query retrieval: {e}")
+        raise map_retrieval_error(e, engine.index_path)
@@ -0,0 +1,404 @@
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+#from src.query_filters import _normalize_value, parse_query_filters  # Uncomment this if using relative imports
+from query_filters import _normalize_value, parse_query_filters  # Value normalization and gender, age and drug constraints
+
+# Dimensions of the cube, in the column order of its cell coordinates
+CUBE_DIMENSIONS = ["drug_name", "gender", "age", "condition"]
+
+# Conditions that do not narrow a question: the whole dataset is about depression
+GENERIC_CONDITIONS = {"depression"}
+
+# Words asking for a ranking, mapped to the order of the answer
+ORDER_WORDS = [
+    ("count", r"most (?:popular|reviewed|common(?:ly)? (?:used|prescribed|taken)|common|used|prescribed|taken)|popular"),
+    ("lowest", r"worst|lowest(?:[- ]rated)?|least (?:effective|helpful)|poorest"),
+    ("rating", r"best|better|top(?:[- ]rated)?|highest(?:[- ]rated)?|most (?:effective|helpful)|greatest|rank(?:ed|ing)?"),
+]
+
+# Words naming drugs as the subject of a ranking
+SUBJECT = r"(?:drugs?|medications?|medicines?|meds|antidepressants?|pills?|ssris?|snris?)"
+
+# A ranking question ranks the drugs themselves: "best antidepressant", "top 5 medications for
+# anxiety", "Which drug works best for ...?". The ranking word must qualify the drug, so that
+# "the best time to take my medication" or "the best way to taper off antidepressants" is not one
+ORDER_PATTERNS = [
+    (order, re.compile(
+        rf"\b(?:{words})\s+(?:[\w'-]+\s+){{0,2}}?{SUBJECT}\b"
+        rf"|\b(?:which|what)\s+(?:[\w'-]+\s+){{0,2}}?{SUBJECT}\b.*\b(?:{words})\b"
+    ))
+    for order, words in ORDER_WORDS
+]
+
+# Ranking words alone, for questions naming the drugs to compare ("Is Zoloft or Prozac better?")
+COMPARISON_PATTERNS = [(order, re.compile(rf"\b(?:{words})\b")) for order, words in ORDER_WORDS]
+
+# Ranking questions the ratings cannot answer
+EXCLUDED_PATTERN = re.compile(r"\b(?:side[- ]effects?|interactions?|dos(?:e|es|age)|withdrawal|symptoms?|weight|sleep|price|cost|cheap\w*)\b")
+
+def _duration_months(value: str) -> float:
+    """
+    Return a sort key for a time-on-drug bucket, e.g. "1 to 6 months" -> 1.0, "2 to 5 years" -> 24.0.
+    """
+    if value.startswith("less than"):
+        return 0.0
+    match = re.search(r"(\d+)\s*(?:to\b[^\d]*\d+\s*)?(month|year)", value)
+    if match is None:
+        return float("inf")
+    return float(match[1]) * (12.0 if match[2] == "year" else 1.0)
+
+class RatingCube:
+    """
+    Precomputed rating aggregates over `drug_name × gender × age × condition`.
+
+    The cube is sparse: one cell per combination present in the data, with its coordinates
+    (one integer code per dimension), its review count, the number and sum of its ratings
+    and its time-on-drug histogram. Ranking the drugs of any slice takes a mask over the
+    cells and a few `np.bincount` calls, independent of the number of reviews.
+
+    The cube provides the `values` and `drug_pattern` of a `FilterIndex`, so
+    `parse_query_filters` extracts the constraints of a query from it directly.
+    """
+
+    def __init__(self, values: dict, labels: dict, codes: np.ndarray, count: np.ndarray,
+                 rated: np.ndarray, rating_sum: np.ndarray, time_labels: list, time_counts: np.ndarray):
+        """
+        Args:
+            values (dict): Maps each dimension to its normalized values; a value's position is its code.
+            labels (dict): Maps each dimension to the display labels of its values.
+            codes (np.ndarray): (n_cells, len(CUBE_DIMENSIONS)) coordinates of the cells.
+            count (np.ndarray): Number of reviews per cell.
+            rated (np.ndarray): Number of reviews with a numeric rating per cell.
+            rating_sum (np.ndarray): Sum of the `rating_overall` values per cell.
+            time_labels (list): The time-on-drug buckets, shortest first.
+            time_counts (np.ndarray): (n_cells, len(time_labels)) reviews per cell and bucket.
+        """
+        self._values = values
+        self.labels = labels
+        self.codes = codes
+        self.count = count
+        self.rated = rated
+        self.rating_sum = rating_sum
+        self.time_labels = time_labels
+        self.time_counts = time_counts
+        self._positions = {column: {value: i for i, value in enumerate(values[column])} for column in CUBE_DIMENSIONS}
+
+        self.drug_pattern = self._pattern(self._values["drug_name"])
+        # Specific conditions only, e.g. "anxiety" or "bipolar depression"
+        self.condition_pattern = self._pattern([value for value in self._values["condition"] if value not in GENERIC_CONDITIONS])
+
+    @staticmethod
+    def _pattern(values: list):
+        """
+        Return a regex matching any of the values as whole words, longest first.
+        """
+        values = sorted((value for value in values if value), key=len, reverse=True)
+        if not values:
+            return None
+        return re.compile(r"(?<!\w)(" + "|".join(re.escape(value) for value in values) + r")(?!\w)")
+
+    def values(self, column: str) -> list:
+        """
+        Return the normalized values of a dimension.
+        """
+        return [value for value in self._values.get(column, []) if value]
+
+    @property
+    def total_reviews(self) -> int:
+        """
+        The number of reviews aggregated in the cube.
+        """
+        return int(self.count.sum())
+
+    def _mask(self, filters: dict) -> np.ndarray:
+        """
+        Return the boolean mask of the cells matching every constraint.
+        """
+        mask = np.ones(len(self.count), dtype=bool)
+        for column, accepted in filters.items():
+            positions = self._positions[column]
+            # Lookup table over the codes of the dimension: one gather instead of a set test
+            wanted = np.zeros(len(positions), dtype=bool)
+            wanted[[positions[value] for value in accepted if value in positions]] = True
+            mask &= wanted[self.codes[:, CUBE_DIMENSIONS.index(column)]]
+        return mask
+
+    def rank(self, filters: dict, by: str = "drug_name", order: str = "rating", top: int = 5, min_reviews: int = 5) -> dict:
+        """
+        Rank the values of one dimension (the drugs by default) within a slice of the cube.
+
+        When no review matches every constraint, the age and then the gender constraint are
+        dropped, as in the filtered search. Ratings are ranked by their mean shrunk toward the
+        mean of the slice, with a weight of `min_reviews` reviews, so that a drug with two
+        perfect ratings does not outrank one with hundreds of good ones. Values with fewer
+        than `min_reviews` reviews are only ranked when no value has enough.
+
+        Args:
+            filters (dict): Maps dimensions to accepted normalized values, as returned by
+                `parse_query_filters`.
+            by (str): The dimension to rank.
+            order (str): "rating" (highest first), "lowest" (lowest first) or "count" (most reviewed first).
+            top (int): Maximum number of values returned.
+            min_reviews (int): Reviews a value needs to be ranked.
+
+        Returns:
+            dict: {"filters": the constraints applied, "order": order, "reviews": reviews in the
+            slice, "mean_rating": mean rating of the slice, "rows": [...]}, where each row is
+            {"value", "reviews", "mean_rating", "score", "time_on_drug": {bucket: share}}.
+        """
+        mask = self._mask(filters)
+        for column in ("age", "gender"):
+            if mask.any():
+                break
+            if column in filters:
+                filters = {name: accepted for name, accepted in filters.items() if name != column}
+                mask = self._mask(filters)
+
+        result = {"filters": filters, "order": order, "reviews": int(self.count[mask].sum()), "mean_rating": None, "rows": []}
+        if not mask.any():
+            return result
+
+        # Aggregate the matching cells per value of the ranked dimension
+        groups = self.codes[mask, CUBE_DIMENSIONS.index(by)]
+        size = len(self._values[by])
+        count = np.bincount(groups, weights=self.count[mask], minlength=size)
+        rated = np.bincount(groups, weights=self.rated[mask], minlength=size)
+        rating_sum = np.bincount(groups, weights=self.rating_sum[mask], minlength=size)
+        cell_times = self.time_counts[mask]
+        time_counts = np.zeros((size, len(self.time_labels)))
+        for j in range(len(self.time_labels)):
+            time_counts[:, j] = np.bincount(groups, weights=cell_times[:, j], minlength=size)
+
+        prior = rating_sum.sum() / rated.sum() if rated.sum() else 0.0
+        result["mean_rating"] = float(prior) if rated.sum() else None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(rated > 0, rating_sum / rated, np.nan)
+        score = (rating_sum + min_reviews * prior) / (rated + min_reviews) if min_reviews > 0 else mean
+
+        candidates = np.flatnonzero((count >= max(1, min_reviews)) & (rated > 0 if order != "count" else True))
+        if len(candidates) == 0:
+            candidates = np.flatnonzero((count > 0) & (rated > 0 if order != "count" else True))
+        if order == "count":
+            keys = -count[candidates]
+        elif order == "lowest":
+            keys = score[candidates]
+        else:
+            keys = -score[candidates]
+        ranked = candidates[np.argsort(keys, kind="stable")][:top]
+
+        for i in ranked:
+            total = time_counts[i].sum()
+            result["rows"].append({
+                "value": self.labels[by][i],
+                "reviews": int(count[i]),
+                "mean_rating": None if np.isnan(mean[i]) else round(float(mean[i]), 2),
+                "score": None if np.isnan(score[i]) else round(float(score[i]), 2),
+                "time_on_drug": {
+                    label: round(float(n / total), 2) for label, n in zip(self.time_labels, time_counts[i]) if n
+                } if total else {},
+            })
+        return result
+
+    def save(self, path: str) -> None:
+        """
+        Write the cube to a NumPy `.npz` file, replacing the previous one atomically.
+        """
+        arrays = {}
+        for column in CUBE_DIMENSIONS:
+            arrays[f"values_{column}"] = np.array(self._values[column], dtype=str)
+            arrays[f"labels_{column}"] = np.array(self.labels[column], dtype=str)
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            codes=self.codes,
+            count=self.count,
+            rated=self.rated,
+            rating_sum=self.rating_sum,
+            time_labels=np.array(self.time_labels, dtype=str),
+            time_counts=self.time_counts,
+            **arrays,
+        )
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "RatingCube":
+        """
+        Read a cube written by `save`.
+        """
+        with np.load(path) as data:
+            values = {column: [str(value) for value in data[f"values_{column}"]] for column in CUBE_DIMENSIONS}
+            labels = {column: [str(label) for label in data[f"labels_{column}"]] for column in CUBE_DIMENSIONS}
+            return cls(
+                values, labels, data["codes"], data["count"], data["rated"], data["rating_sum"],
+                [str(label) for label in data["time_labels"]], data["time_counts"],
+            )
+
+def rating_cube_path(metadata_path: str) -> str:
+    """
+    Return the path of the rating cube written next to a metadata CSV file.
+    """
+    return os.path.splitext(metadata_path)[0] + ".cube.npz"
+
+def build_rating_cube(df: pd.DataFrame) -> RatingCube:
+    """
+    Aggregate the reviews into a rating cube.
+
+    Values are matched case-insensitively; each value is displayed with its most frequent
+    spelling. Missing values form their own "" value, which no query constraint matches.
+
+    Args:
+        df (pd.DataFrame): The reviews, with the `CUBE_DIMENSIONS`, `rating_overall` and
+            `time_on_drug` columns (missing columns count as missing values).
+
+    Returns:
+        RatingCube: The cube.
+    """
+    values, labels, columns = {}, {}, []
+    for column in CUBE_DIMENSIONS:
+        raw = df[column].astype("string").str.strip() if column in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+        normalized = raw.map(_normalize_value, na_action="ignore").fillna("")
+        codes, uniques = pd.factorize(normalized, sort=True)
+        values[column] = [str(value) for value in uniques]
+        # The most frequent original spelling of each value
+        spellings = raw.fillna("").groupby(codes).agg(lambda s: s.value_counts().index[0])
+        labels[column] = [str(spellings.get(i, "")) or "Unknown" for i in range(len(uniques))]
+        columns.append(codes)
+
+    time = df["time_on_drug"].astype("string").str.strip().fillna("") if "time_on_drug" in df.columns else pd.Series("", index=df.index)
+    time_labels = sorted((str(value) for value in time.unique() if value), key=lambda value: (_duration_months(value.lower()), value))
+    time_codes = time.map({label: i for i, label in enumerate(time_labels)}).fillna(-1).to_numpy(dtype="int64")
+
+    rating = pd.to_numeric(df["rating_overall"], errors="coerce").to_numpy(dtype="float64") if "rating_overall" in df.columns else np.full(len(df), np.nan)
+    has_rating = ~np.isnan(rating)
+
+    # One cell per distinct combination of the dimensions
+    coordinates = np.stack(columns, axis=1) if len(df) else np.empty((0, len(CUBE_DIMENSIONS)), dtype="int64")
+    codes, cells = np.unique(coordinates, axis=0, return_inverse=True)
+    cells = cells.reshape(-1)
+    n_cells = len(codes)
+    count = np.bincount(cells, minlength=n_cells).astype("int32")
+    rated = np.bincount(cells, weights=has_rating, minlength=n_cells).astype("int32")
+    rating_sum = np.bincount(cells, weights=np.where(has_rating, rating, 0.0), minlength=n_cells)
+    time_counts = np.zeros((n_cells, len(time_labels)), dtype="int32")
+    known = time_codes >= 0
+    np.add.at(time_counts, (cells[known], time_codes[known]), 1)
+
+    return RatingCube(values, labels, codes.astype("int32"), count, rated, rating_sum, time_labels, time_counts)
+
+def parse_ranking_query(query: str, cube: RatingCube):
+    """
+    Detect a question asking to rank drugs, e.g. "Which drug works best for women over 50?".
+
+    A ranking question asks for the best, worst or most popular drugs, with the ranking
+    word applying to drugs ("best antidepressant", "which medication works best"), or names
+    two drugs or more and asks which is better. Questions about a single drug, about the
+    best way or time to take one, or about what the ratings do not measure (side effects,
+    dosage, ...) are left to retrieval.
+
+    Args:
+        query (str): The user's query.
+        cube (RatingCube): The cube providing the known values.
+
+    Returns:
+        dict or None: {"filters": constraints for `RatingCube.rank`, "order": ranking order},
+        or None if the query is not a ranking question.
+    """
+    text = query.lower()
+    if EXCLUDED_PATTERN.search(text):
+        return None
+
+    filters = parse_query_filters(query, cube)
+    drugs = filters.get("drug_name", [])
+    if len(drugs) == 1:
+        return None
+    patterns = COMPARISON_PATTERNS if drugs else ORDER_PATTERNS
+    order = next((order for order, pattern in patterns if pattern.search(text)), None)
+    if order is None:
+        return None
+
+    if cube.condition_pattern is not None:
+        conditions = sorted(set(cube.condition_pattern.findall(text)))
+        if conditions:
+            filters["condition"] = conditions
+    return {"filters": filters, "order": order}
+
+def _describe_slice(ranking: dict) -> str:
+    """
+    Describe the constraints of a ranking in words, e.g. "female reviewers aged 35-44 with anxiety".
+    """
+    filters = ranking["filters"]
+    parts = []
+    if "gender" in filters:
+        parts.append(" or ".join(filters["gender"]) + " reviewers")
+    else:
+        parts.append("reviewers")
+    if "age" in filters:
+        parts.append("aged " + " or ".join(filters["age"]))
+    if "condition" in filters:
+        parts.append("with " + " or ".join(filters["condition"]))
+    return " ".join(parts)
+
+def format_ranking(ranking: dict) -> str:
+    """
+    Format a ranking as the answer to the user's question.
+
+    Rankings by rating show the adjusted rating they are ordered by next to the raw
+    average, so that the list reads in order.
+
+    Args:
+        ranking (dict): A result of `RatingCube.rank` with at least one row.
+
+    Returns:
+        str: The answer, one line per drug.
+    """
+    heading = {
+        "rating": "Highest-rated drugs",
+        "lowest": "Lowest-rated drugs",
+        "count": "Most reviewed drugs",
+    }[ranking["order"]]
+    lines = [f"{heading} among {_describe_slice(ranking)} ({ranking['reviews']:,} reviews):"]
+    for position, row in enumerate(ranking["rows"], start=1):
+        reviews = f"{row['reviews']:,} review{'s' if row['reviews'] != 1 else ''}"
+        average = f"average rating {row['mean_rating']:.1f}" if row["mean_rating"] is not None else "no rating"
+        if ranking["order"] == "count":
+            line = f"{position}. {row['value']}: {reviews}, {average}"
+        elif row["score"] is not None:
+            line = f"{position}. {row['value']}: adjusted rating {row['score']:.1f} ({average} from {reviews})"
+        else:
+            line = f"{position}. {row['value']}: {average} from {reviews}"
+        if row["time_on_drug"]:
+            line += f" (mostly taken {max(row['time_on_drug'], key=row['time_on_drug'].get)})"
+        lines.append(line)
+    if ranking["order"] != "count":
+        lines.append("Adjusted ratings pull the average of drugs with few reviews toward the average of all matching reviews.")
+    lines.append("These figures summarize patient reviews and are not medical advice; please consult a healthcare provider.")
+    return "\n".join(lines)
+
+def format_ranking_context(ranking: dict) -> str:
+    """
+    Format a ranking as compact statistics for the LLM prompt.
+
+    Args:
+        ranking (dict): A result of `RatingCube.rank`.
+
+    Returns:
+        str: A header line and one "drug | reviews | mean rating | adjusted rating | most common
+        time on drug" row per drug, in ranking order.
+    """
+    lines = [
+        f"Ratings by {_describe_slice(ranking)} ({ranking['reviews']} reviews)",
+        "drug | reviews | mean rating | adjusted rating | most common time on drug",
+    ]
+    for row in ranking["rows"]:
+        mean = f"{row['mean_rating']:.2f}" if row["mean_rating"] is not None else "-"
+        score = f"{row['score']:.2f}" if row["score"] is not None else "-"
+        duration = max(row["time_on_drug"], key=row["time_on_drug"].get) if row["time_on_drug"] else "-"
+        lines.append(f"{row['value']} | {row['reviews']} | {mean} | {score} | {duration}")
+    return "\n".join(lines)
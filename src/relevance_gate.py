@@ -0,0 +1,267 @@
+import threading
+
+import numpy as np
+
+#from src.llm_handler import call_llm, call_llm_async  # Uncomment this if using relative imports
+#from src.config import RELEVANCE_ACCEPT_THRESHOLD, RELEVANCE_REJECT_THRESHOLD, RELEVANCE_CORPUS_SAMPLE  # Uncomment this if using relative imports
+from llm_handler import call_llm, call_llm_async  # Centralized LLM interaction utility
+from config import RELEVANCE_ACCEPT_THRESHOLD, RELEVANCE_REJECT_THRESHOLD, RELEVANCE_CORPUS_SAMPLE  # Gate settings
+
+# Clarification returned for queries rejected by the relevance gate
+NOT_RELATED_RESPONSE = "Your query does not seem related to depression drug recommendations. Please rephrase."
+
+# Labelled examples of queries related to depression drug recommendations
+RELATED_EXAMPLES = [
+    "Which drug works best for depression in women aged 30 to 40?",
+    "Is Prozac effective for treating anxiety along with depression?",
+    "What are the best-rated drugs for men suffering from depression?",
+    "Which antidepressant has the fewest side effects?",
+    "How well does Lexapro work for major depressive disorder?",
+    "What do patients say about Wellbutrin for bipolar depression?",
+    "Best medication for depression for people over 65",
+    "Does Zoloft help with depression and anxiety?",
+    "Which SSRI do reviewers rate highest after six months?",
+    "Top rated depression medication for teenagers",
+]
+
+# Labelled examples of queries that are not related to depression drug recommendations
+UNRELATED_EXAMPLES = [
+    "What is the weather like in Paris today?",
+    "How do I reset my router password?",
+    "Recommend a good pizza place near me",
+    "Who won the football match last night?",
+    "Write a poem about the ocean",
+    "What is the capital of Australia?",
+    "How do I bake sourdough bread?",
+    "Explain how a car engine works",
+    "What is the best laptop for programming?",
+    "Translate hello into Spanish",
+]
+
+def build_relevance_prompt(query: str) -> str:
+    """
+    Build the prompt asking the LLM whether a query is related to depression drug recommendations.
+
+    Args:
+        query (str): The user's query to analyze.
+
+    Returns:
+        str: The prompt.
+    """
+    return (
+        f"You are an assistant that determines whether a query is related to depression drug recommendations. "
+        f"Only respond with 'Yes' or 'No'. Here are examples of related queries:\n"
+        f"- 'Which drug works best for depression in women aged 30 to 40?'\n"
+        f"- 'Is Prozac effective for treating anxiety along with depression?'\n"
+        f"- 'What are the best-rated drugs for men suffering from depression?'\n\n"
+        f"Now analyze the following query:\n"
+        f"'{query}'\n"
+        f"Is this query related to depression drug recommendations? Respond with 'Yes' or 'No' only."
+    )
+
+def analyze_query_with_llm(query: str) -> bool:
+    """
+    Analyze the user's query using GPT-3.5-turbo to check its relevance to depression drug recommendations.
+
+    Args:
+        query (str): The user's query to analyze.
+
+    Returns:
+        bool: True if the query is related to depression drug recommendations, False otherwise.
+    """
+    # Call the LLM with the constructed prompt
+    response = call_llm(build_relevance_prompt(query), max_tokens=10, temperature=0.2)
+    # Return True if the response is "Yes", otherwise False
+    return response.lower() == "yes"
+
+async def analyze_query_with_llm_async(query: str) -> bool:
+    """
+    Async counterpart of `analyze_query_with_llm`.
+
+    Args:
+        query (str): The user's query to analyze.
+
+    Returns:
+        bool: True if the query is related to depression drug recommendations, False otherwise.
+    """
+    response = await call_llm_async(build_relevance_prompt(query), max_tokens=10, temperature=0.2)
+    return response.lower() == "yes"
+
+async def is_query_related_async(query: str, gate, query_embedding) -> bool:
+    """
+    Check the query's relevance with the local gate, falling back to the async LLM gate.
+
+    Args:
+        query (str): The user's query to analyze.
+        gate (RelevanceGate): The local gate, or None to always ask the LLM.
+        query_embedding (np.ndarray): The (1, dimension) query embedding.
+
+    Returns:
+        bool: True if the query is related to depression drug recommendations, False otherwise.
+    """
+    if gate is None:
+        return await analyze_query_with_llm_async(query)
+    return await gate.is_related_async(query, query_embedding[0])
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale each row to unit length so that dot products are cosine similarities.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class RelevanceGate:
+    """
+    Local relevance classifier built on the MiniLM embeddings of the retrieval engine.
+
+    The gate keeps two unit-length centroids: one for related queries (the labelled
+    related examples plus a sample of indexed reviews) and one for unrelated queries.
+    A query is scored by the margin between its cosine similarity to both centroids:
+
+    - score >= accept_threshold: accepted locally;
+    - score <= reject_threshold: rejected locally;
+    - anything in between: sent to the LLM gate.
+
+    Scoring an already-encoded query is a pair of dot products, well under a millisecond.
+    """
+
+    def __init__(
+        self,
+        engine,
+        accept_threshold: float = RELEVANCE_ACCEPT_THRESHOLD,
+        reject_threshold: float = RELEVANCE_REJECT_THRESHOLD,
+        corpus_sample: int = RELEVANCE_CORPUS_SAMPLE,
+        llm_fallback=analyze_query_with_llm,
+        async_llm_fallback=analyze_query_with_llm_async,
+    ):
+        """
+        Build the centroids from the labelled examples and the indexed corpus.
+
+        Args:
+            engine (RetrievalEngine): The engine whose encoder and index are used.
+            accept_threshold (float): Scores at or above this value are accepted without the LLM.
+            reject_threshold (float): Scores at or below this value are rejected without the LLM.
+            corpus_sample (int): Maximum number of indexed reviews added to the related centroid.
+            llm_fallback (callable): Function deciding ambiguous queries (default: the LLM gate).
+            async_llm_fallback (callable): Coroutine function used by `is_related_async`.
+        """
+        if reject_threshold > accept_threshold:
+            raise ValueError("reject_threshold must not be greater than accept_threshold.")
+
+        self.engine = engine
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.llm_fallback = llm_fallback
+        self.async_llm_fallback = async_llm_fallback
+
+        related = _normalize(engine.encode(RELATED_EXAMPLES))
+        corpus = self._sample_corpus(corpus_sample)
+        if len(corpus):
+            # Weight the labelled examples and the corpus sample equally
+            related_centroid = related.mean(axis=0) + _normalize(corpus).mean(axis=0)
+        else:
+            related_centroid = related.mean(axis=0)
+        unrelated_centroid = _normalize(engine.encode(UNRELATED_EXAMPLES)).mean(axis=0)
+
+        self.centroids = _normalize(np.vstack([related_centroid, unrelated_centroid])).astype("float32")
+
+        # Decision counters, useful to measure how often the LLM is still needed
+        self._stats_lock = threading.Lock()
+        self.stats = {"accepted": 0, "rejected": 0, "fallback": 0}
+
+    def _sample_corpus(self, sample_size: int) -> np.ndarray:
+        """
+        Return up to `sample_size` stored vectors spread evenly over the index.
+        """
+        snapshot = self.engine.snapshot
+        index = snapshot.index
+        if sample_size <= 0 or index.ntotal == 0:
+            return np.empty((0, index.d), dtype="float32")
+        positions = np.linspace(0, index.ntotal - 1, num=min(sample_size, index.ntotal)).astype("int64")
+        # Indexes written by vector_store.py reconstruct vectors by review ID
+        keys = snapshot.metadata.keys(positions)
+        try:
+            return np.vstack([index.reconstruct(int(key)) for key in keys])
+        except RuntimeError:
+            # Some index types cannot reconstruct vectors; fall back to the labelled examples only
+            return np.empty((0, index.d), dtype="float32")
+
+    def score(self, query_embedding: np.ndarray) -> float:
+        """
+        Score an encoded query: positive values lean related, negative values unrelated.
+
+        Args:
+            query_embedding (np.ndarray): The (dimension,) or (1, dimension) query embedding.
+
+        Returns:
+            float: Cosine similarity to the related centroid minus similarity to the unrelated one.
+        """
+        query = _normalize(np.asarray(query_embedding, dtype="float32").reshape(1, -1))[0]
+        related, unrelated = self.centroids @ query
+        return float(related - unrelated)
+
+    def classify(self, query: str, query_embedding: np.ndarray = None):
+        """
+        Decide locally whether the query is related, without calling the LLM.
+
+        Args:
+            query (str): The user's query.
+            query_embedding (np.ndarray): The query embedding, if already computed.
+
+        Returns:
+            bool or None: True (related), False (unrelated) or None when the score is ambiguous.
+        """
+        if not query.strip():
+            return False
+        if query_embedding is None:
+            query_embedding = self.engine.encode([query])[0]
+        score = self.score(query_embedding)
+        if score >= self.accept_threshold:
+            return True
+        if score <= self.reject_threshold:
+            return False
+        return None
+
+    def is_related(self, query: str, query_embedding: np.ndarray = None) -> bool:
+        """
+        Decide whether the query is related, calling the LLM only for ambiguous scores.
+
+        Args:
+            query (str): The user's query.
+            query_embedding (np.ndarray): The query embedding, if already computed.
+
+        Returns:
+            bool: True if the query is related to depression drug recommendations, False otherwise.
+        """
+        decision = self.classify(query, query_embedding)
+        if decision is None:
+            self._count("fallback")
+            return self.llm_fallback(query)
+        self._count("accepted" if decision else "rejected")
+        return decision
+
+    async def is_related_async(self, query: str, query_embedding: np.ndarray = None) -> bool:
+        """
+        Async counterpart of `is_related`: ambiguous queries await the async LLM gate.
+
+        Args:
+            query (str): The user's query.
+            query_embedding (np.ndarray): The query embedding, if already computed.
+
+        Returns:
+            bool: True if the query is related to depression drug recommendations, False otherwise.
+        """
+        decision = self.classify(query, query_embedding)
+        if decision is None:
+            self._count("fallback")
+            return await self.async_llm_fallback(query)
+        self._count("accepted" if decision else "rejected")
+        return decision
+
+    def _count(self, outcome: str) -> None:
+        """
+        Increment one of the decision counters.
+        """
+        with self._stats_lock:
+            self.stats[outcome] += 1
@@ -0,0 +1,245 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+def backoff_delay(attempt: int, base: float, max_delay: float, retry_after: float = None) -> float:
+    """
+    Return the wait before retry number `attempt + 1` ("full jitter" exponential backoff).
+
+    The delay is drawn uniformly between 0 and `base * 2**attempt`, capped at `max_delay`,
+    so that clients throttled together do not retry together. A `Retry-After` value sent
+    by the server takes precedence (still capped at `max_delay`).
+
+    Args:
+        attempt (int): Number of failed attempts so far, minus one (0 for the first retry).
+        base (float): Maximum delay of the first retry, in seconds.
+        max_delay (float): Upper bound of any delay, in seconds.
+        retry_after (float): Delay requested by the server, if any.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if retry_after is not None and retry_after >= 0:
+        return min(retry_after, max_delay)
+    return random.uniform(0.0, min(max_delay, base * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Thread-safe token-bucket rate limiter.
+
+    Tokens accumulate at `rate` per second up to `capacity`. Each call takes a token
+    immediately, possibly running into debt, and returns how long the caller must wait
+    before using it; later callers therefore queue behind earlier ones instead of all
+    waking up at once. A `rate` of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate (float): Tokens added per second (0: unlimited).
+            capacity (float): Maximum burst size (default: one second worth of tokens, at least 1).
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """
+        Take `amount` tokens.
+
+        Returns:
+            float: Seconds to wait before proceeding (0.0 when tokens were available).
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+def _grant(future: asyncio.Future) -> None:
+    """
+    Hand a slot to a waiting coroutine, unless it was cancelled meanwhile (it then passes the slot on).
+    """
+    if not future.done():
+        future.set_result(None)
+
+class ConcurrencyLimiter:
+    """
+    Thread-safe limit on the number of operations in flight, shared by threads and event loops.
+
+    Threads wait in `acquire`; coroutines wait in `acquire_async` without blocking their
+    event loop. A released slot is handed to the longest-waiting caller, whichever kind it
+    is, so that at most `limit` operations run at once across every thread and event loop
+    of the process.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit (int): Maximum number of operations in flight.
+        """
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters = deque()  # threading.Event of a thread, or (loop, future) of a coroutine
+        self._lock = threading.Lock()
+
+    def _take(self, waiter) -> bool:
+        """
+        Take a free slot, or queue `waiter` for the next released one.
+
+        Returns:
+            bool: True if a slot was taken, False if the caller must wait.
+        """
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def acquire(self) -> None:
+        """
+        Take a slot, blocking the calling thread until one is free.
+        """
+        event = threading.Event()
+        if not self._take(event):
+            event.wait()
+
+    async def acquire_async(self) -> None:
+        """
+        Take a slot, waiting without blocking the event loop until one is free.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        if self._take(waiter):
+            return
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                handed_over = waiter not in self._waiters
+                if not handed_over:
+                    self._waiters.remove(waiter)
+            # The slot was handed over just as the wait was cancelled: pass it on
+            if handed_over:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """
+        Give a slot back, handing it directly to the longest-waiting caller.
+        """
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(_grant, future)
+                    return
+                except RuntimeError:
+                    # The waiter's event loop is closed
+                    continue
+            self.active -= 1
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    - closed: calls pass; `failure_threshold` consecutive failures open the circuit.
+    - open: calls are refused for `reset_timeout` seconds.
+    - half-open: one trial call is let through; its success closes the circuit and its
+      failure opens it again. A trial without an outcome after `reset_timeout` (e.g. a
+      cancelled call) is replaced by a new one.
+
+    A `failure_threshold` of 0 disables the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit (0: never).
+            reset_timeout (float): Seconds the circuit stays open before a trial call.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        The current state ("closed", "open" or "half_open").
+        """
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Return whether a call may proceed now.
+        """
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_started = None
+            # Half-open: a single trial call at a time
+            now = time.monotonic()
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def retry_after(self) -> float:
+        """
+        Return the seconds left before the open circuit lets a trial call through.
+        """
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self) -> None:
+        """
+        Record a call that reached a healthy upstream; closes the circuit.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_started = None
+
+    def record_failure(self) -> None:
+        """
+        Record a call that failed because the upstream is unhealthy.
+        """
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            self._trial_started = None
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
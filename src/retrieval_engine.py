@@ -0,0 +1,648 @@
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import threading
+import weakref
+
+import faiss
+import numpy as np
+import pandas as pd
+
+#from src.config import INDEX_PATH, METADATA_PATH, EMBEDDING_MODEL, TOP_K, RELOAD_CHECK_INTERVAL  # Uncomment this if using relative imports
+#from src.config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES  # Uncomment this if using relative imports
+#from src.config import DYNAMIC_BATCHING, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS  # Uncomment this if using relative imports
+#from src.config import INDEX_NPROBE, INDEX_EF_SEARCH, INDEX_MMAP  # Uncomment this if using relative imports
+#from src.config import QUERY_ENCODER, ONNX_MODEL_DIR  # Uncomment this if using relative imports
+#from src.config import FILTERED_SEARCH, FILTER_EXACT_MAX  # Uncomment this if using relative imports
+#from src.config import RATING_CUBE_MODE, RATING_CUBE_TOP, RATING_CUBE_MIN_REVIEWS  # Uncomment this if using relative imports
+#from src.index_factory import read_index, read_index_params, apply_search_params, search_parameters  # Uncomment this if using relative imports
+#from src.query_filters import FilterIndex, filter_index_path, parse_query_filters  # Uncomment this if using relative imports
+#from src.rating_cube import RatingCube, rating_cube_path, parse_ranking_query  # Uncomment this if using relative imports
+#from src.metadata_store import MetadataStore, metadata_store_path  # Uncomment this if using relative imports
+#from src.query_encoder import load_query_encoder, check_encoder_parity  # Uncomment this if using relative imports
+#from src.semantic_cache import SemanticCache  # Uncomment this if using relative imports
+#from src.batcher import MicroBatcher  # Uncomment this if using relative imports
+#from src.metrics import span  # Uncomment this if using relative imports
+from config import INDEX_PATH, METADATA_PATH, EMBEDDING_MODEL, TOP_K, RELOAD_CHECK_INTERVAL  # Shared settings
+from config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES  # Semantic cache settings
+from config import DYNAMIC_BATCHING, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS  # Micro-batching settings
+from config import INDEX_NPROBE, INDEX_EF_SEARCH, INDEX_MMAP  # Query-time knob overrides and index memory-mapping
+from config import QUERY_ENCODER, ONNX_MODEL_DIR  # Query encoder backend
+from config import FILTERED_SEARCH, FILTER_EXACT_MAX  # Structured pre-filtering settings
+from config import RATING_CUBE_MODE, RATING_CUBE_TOP, RATING_CUBE_MIN_REVIEWS  # Ranking fast path settings
+from index_factory import read_index, read_index_params, apply_search_params, search_parameters  # Index type and query-time knobs
+from query_filters import FilterIndex, filter_index_path, parse_query_filters  # Gender, age and drug constraints
+from rating_cube import RatingCube, rating_cube_path, parse_ranking_query  # Precomputed rating aggregates
+from metadata_store import MetadataStore, metadata_store_path  # Memory-mapped columnar metadata
+from query_encoder import load_query_encoder, check_encoder_parity  # fp32 and int8 query encoders (imported lazily)
+from semantic_cache import SemanticCache  # Answer cache keyed on query embeddings
+from batcher import MicroBatcher  # Dynamic micro-batching of concurrent queries
+from metrics import span  # Stage timings
+
+class IndexLoadError(Exception):
+    """
+    Raised when the FAISS index file cannot be read.
+    """
+
+class IndexSnapshot:
+    """
+    An immutable view of one generation of the vector store.
+
+    Attributes:
+        index (faiss.Index): The loaded FAISS index.
+        metadata (MetadataStore): Metadata rows aligned with the index, addressed by review ID
+            when the store has a `review_id` column and by position otherwise.
+        signature (tuple): Modification time of the index file, used to detect a rebuilt store.
+        params (dict): Index type and query-time knobs applied to the index.
+        filters (FilterIndex): Inverted indexes of the structured columns, or None.
+        cube (RatingCube): Rating aggregates answering ranking questions, or None.
+    """
+
+    def __init__(self, index, metadata: MetadataStore, signature: tuple, params: dict = None,
+                 filters: FilterIndex = None, cube: RatingCube = None):
+        self.index = index
+        self.metadata = metadata
+        self.signature = signature
+        self.params = params or {"index_type": "flat"}
+        self.filters = filters
+        self.cube = cube
+
+def _watch_store(ref, stop: threading.Event, interval: float) -> None:
+    """
+    Reload an engine's store whenever its files change, until the engine is gone or `stop` is set.
+    """
+    while not stop.wait(interval):
+        engine = ref()
+        if engine is None:
+            return
+        engine.reload_if_changed()
+        del engine
+
+def _restart_watcher_in_child(ref) -> None:
+    """
+    Restart the reload watcher of an engine inherited by a forked process, if it still exists.
+    """
+    engine = ref()
+    if engine is not None:
+        engine._start_watcher()
+
+class RetrievalEngine:
+    """
+    Long-lived retrieval engine that keeps the FAISS index, the metadata and the
+    query encoder resident in memory.
+
+    The engine is safe to share between threads: searches run against an immutable
+    snapshot of the store, and a reload swaps in a new snapshot atomically. When
+    `auto_reload` is enabled, a background thread checks the index file every
+    `reload_interval` seconds and picks up a store rebuilt by `vector_store.py`
+    without a process restart; requests never read the store files themselves.
+    """
+
+    def __init__(
+        self,
+        index_path: str = INDEX_PATH,
+        metadata_path: str = METADATA_PATH,
+        model_name: str = EMBEDDING_MODEL,
+        auto_reload: bool = True,
+        reload_interval: float = RELOAD_CHECK_INTERVAL,
+        encoder_backend: str = QUERY_ENCODER,
+        onnx_dir: str = ONNX_MODEL_DIR,
+        check_parity: bool = True,
+    ):
+        """
+        Load the encoder, the FAISS index and the metadata.
+
+        Args:
+            index_path (str): Path to the FAISS index file.
+            metadata_path (str): Path to the metadata CSV file.
+            model_name (str): Name of the SentenceTransformer model used for queries.
+            auto_reload (bool): Whether to reload the store when its files change on disk.
+            reload_interval (float): Seconds between two checks of the store files.
+            encoder_backend (str): Query encoder backend (see `query_encoder.ENCODER_BACKENDS`).
+            onnx_dir (str): Directory of the ONNX export, for the "onnx_int8" backend.
+            check_parity (bool): Whether to check a non-reference encoder against the indexed embeddings.
+
+        Raises:
+            IndexLoadError: If the FAISS index cannot be read.
+            FileNotFoundError: If the metadata file does not exist.
+            ValueError: If the metadata is invalid or does not match the index, or if the
+            query encoder disagrees with the indexed embeddings.
+        """
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.model_name = model_name
+        self.encoder_backend = encoder_backend
+        self.auto_reload = auto_reload
+        self.reload_interval = reload_interval
+
+        # Serializes reloads so that only one thread reads the files at a time
+        self._reload_lock = threading.Lock()
+        # Serializes calls into the encoder
+        self._encode_lock = threading.Lock()
+
+        # Incremented every time a new snapshot is swapped in
+        self.version = 0
+        # Set once the missing stored embeddings of retrieved reviews have been reported
+        self._reconstruct_warned = False
+
+        self.model = load_query_encoder(model_name, encoder_backend, onnx_dir)
+        self._snapshot = self._load()
+
+        # Quantized or re-implemented encoders must agree with the model that built the index
+        self.encoder_parity = None
+        if check_parity and encoder_backend != "sentence_transformers":
+            self.encoder_parity = check_encoder_parity(self.model, self._snapshot.index, self._snapshot.metadata)
+
+        # Answers of recent queries, invalidated whenever the store is reloaded
+        self.semantic_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(
+                self._snapshot.index.d,
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+            )
+
+        # Batch concurrent async queries into one encoder pass and one FAISS search
+        self.encode_batcher = None
+        self.search_batcher = None
+        if DYNAMIC_BATCHING:
+            self.encode_batcher = MicroBatcher(self._encode_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name="encode-batcher")
+            self.search_batcher = MicroBatcher(self._search_batch, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, name="search-batcher")
+
+        # Check the store files in the background, so that a rebuilt store never stalls a request
+        self._watcher_stop = None
+        if auto_reload:
+            self._start_watcher()
+            # A forked worker process (see serve.py) inherits the engine but not its thread
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(after_in_child=functools.partial(_restart_watcher_in_child, weakref.ref(self)))
+
+    def _start_watcher(self) -> None:
+        """
+        Start the thread reloading the store when its files change (with fresh locks, after a fork).
+        """
+        self._reload_lock = threading.Lock()
+        self._watcher_stop = threading.Event()
+        threading.Thread(
+            target=_watch_store,
+            args=(weakref.ref(self), self._watcher_stop, self.reload_interval),
+            name="store-watcher",
+            daemon=True,
+        ).start()
+
+    def close(self) -> None:
+        """
+        Stop the reload watcher; the engine keeps serving its current snapshot.
+        """
+        if self._watcher_stop is not None:
+            self._watcher_stop.set()
+
+    def _metadata_file(self) -> str:
+        """
+        Return the metadata file to load: the columnar store written by `vector_store.py`
+        when it exists, the CSV file otherwise.
+        """
+        store_path = metadata_store_path(self.metadata_path)
+        return store_path if os.path.exists(store_path) else self.metadata_path
+
+    def _file_signature(self) -> tuple:
+        """
+        Return the modification time of the index file.
+
+        `vector_store.py` replaces the index after every other file of the store, so a
+        new index marks a complete store; the metadata alone changing means a rebuild
+        is still in progress.
+        """
+        return (os.path.getmtime(self.index_path),)
+
+    def _load(self) -> IndexSnapshot:
+        """
+        Read the FAISS index and metadata from disk and validate them.
+
+        Returns:
+            IndexSnapshot: The freshly loaded store.
+        """
+        try:
+            index_mtime = os.path.getmtime(self.index_path)
+            # Memory-mapped: pages are read on first access and shared with the other workers
+            index = read_index(self.index_path, mmap=INDEX_MMAP)
+        except (OSError, RuntimeError) as e:
+            raise IndexLoadError(str(e))
+        metadata_file = self._metadata_file()
+        if metadata_file != self.metadata_path:
+            # Memory-mapped: only the header is read now, rows are paged in when fetched
+            metadata = MetadataStore.open(metadata_file)
+        else:
+            metadata = MetadataStore.from_frame(pd.read_csv(self.metadata_path))
+
+        # Validate that the metadata contains the 'combined_text' column
+        if "combined_text" not in metadata.columns:
+            raise ValueError("The metadata file does not contain the 'combined_text' column.")
+        # Validate that the metadata is aligned with the index
+        if index.ntotal != len(metadata):
+            raise ValueError(
+                f"The FAISS index holds {index.ntotal} vectors but the metadata has {len(metadata)} rows."
+            )
+
+        # Apply the query-time knobs stored by vector_store.py (nprobe, efSearch), unless overridden
+        params = read_index_params(self.index_path)
+        if INDEX_NPROBE:
+            params["nprobe"] = INDEX_NPROBE
+        if INDEX_EF_SEARCH:
+            params["efSearch"] = INDEX_EF_SEARCH
+        apply_search_params(index, params)
+
+        # Inverted indexes written by vector_store.py; older stores are searched unfiltered
+        filters = None
+        filters_path = filter_index_path(self.metadata_path)
+        if FILTERED_SEARCH and metadata.ids is not None and os.path.exists(filters_path):
+            filters = FilterIndex.load(filters_path)
+
+        # Rating aggregates written by vector_store.py; without them ranking questions go through retrieval
+        cube = None
+        cube_path = rating_cube_path(self.metadata_path)
+        if RATING_CUBE_MODE != "off" and os.path.exists(cube_path):
+            cube = RatingCube.load(cube_path)
+
+        return IndexSnapshot(index, metadata, (index_mtime,), params, filters, cube)
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """
+        The current store. Reading it never touches the disk: reloads happen in the background.
+        """
+        return self._snapshot
+
+    def reload(self) -> None:
+        """
+        Reload the index and metadata from disk and swap them in atomically.
+
+        Searches already running keep using the previous snapshot. Cached answers
+        were generated from the previous store, so the semantic cache is cleared.
+        """
+        with self._reload_lock:
+            snapshot = self._load()
+            self._snapshot = snapshot
+            self.version += 1
+            if self.semantic_cache is not None:
+                self.semantic_cache.clear()
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the store if the index file changed since it was loaded.
+
+        Called by the watcher thread every `reload_interval` seconds when `auto_reload`
+        is enabled. The index is the last file of a rebuild, so a store being rebuilt is
+        left alone until it is complete; a store that still fails validation (index and
+        metadata out of sync) is ignored until the next check. Either way the engine keeps
+        serving the previous snapshot.
+
+        Returns:
+            bool: True if a new snapshot was loaded, False otherwise.
+        """
+        try:
+            if self._file_signature() == self._snapshot.signature:
+                return False
+            self.reload()
+        except (OSError, IndexLoadError, ValueError):
+            return False
+        return True
+
+    def encode(self, texts: list) -> np.ndarray:
+        """
+        Encode a list of texts into float32 embeddings.
+
+        Args:
+            texts (list): The texts to encode.
+
+        Returns:
+            np.ndarray: A (len(texts), dimension) float32 array.
+        """
+        with self._encode_lock:
+            embeddings = self.model.encode(texts)
+        return np.asarray(embeddings, dtype="float32")
+
+    def search(self, query_embeddings: np.ndarray, k: int = TOP_K, snapshot: IndexSnapshot = None):
+        """
+        Search the FAISS index for the nearest neighbours of the given embeddings.
+
+        Args:
+            query_embeddings (np.ndarray): A (n, dimension) float32 array.
+            k (int): Number of neighbours to return per query.
+            snapshot (IndexSnapshot): The store to search (default: the current one).
+
+        Returns:
+            tuple: (distances, indices) arrays of shape (n, k).
+        """
+        snapshot = snapshot or self.snapshot
+        return snapshot.index.search(query_embeddings, k)
+
+    def query_filters(self, user_query: str, snapshot: IndexSnapshot = None) -> dict:
+        """
+        Extract the gender, age and drug constraints of a query.
+
+        Args:
+            user_query (str): The user's query.
+            snapshot (IndexSnapshot): The store whose values are matched (default: the current one).
+
+        Returns:
+            dict: Maps each constrained column to its accepted values; empty without filter index.
+        """
+        snapshot = snapshot or self.snapshot
+        if snapshot.filters is None or not user_query:
+            return {}
+        return parse_query_filters(user_query, snapshot.filters)
+
+    def rank_query(self, user_query: str, snapshot: IndexSnapshot = None):
+        """
+        Answer a ranking question ("best drug for women over 50") from the rating cube.
+
+        Args:
+            user_query (str): The user's query.
+            snapshot (IndexSnapshot): The store to use (default: the current one).
+
+        Returns:
+            dict or None: The `RatingCube.rank` result, or None if the query is not a ranking
+            question, no review matches it, or the store has no rating cube.
+        """
+        snapshot = snapshot or self.snapshot
+        if snapshot.cube is None or not user_query:
+            return None
+        with span("cube"):
+            request = parse_ranking_query(user_query, snapshot.cube)
+            if request is None:
+                return None
+            ranking = snapshot.cube.rank(
+                request["filters"], order=request["order"], top=RATING_CUBE_TOP, min_reviews=RATING_CUBE_MIN_REVIEWS
+            )
+        return ranking if ranking["rows"] else None
+
+    def search_filtered(self, query_embeddings: np.ndarray, k: int, filters: dict, snapshot: IndexSnapshot = None):
+        """
+        Search only the reviews matching the given constraints.
+
+        When no review matches them all, the age and then the gender constraint are
+        dropped, so a query keeps its most specific constraint (the drug) if possible.
+
+        Small subsets are scanned directly: their vectors are reconstructed by review ID
+        and compared to the query, so the cost depends on the subset size only. Larger
+        subsets, and indexes that cannot reconstruct vectors, are searched through the
+        index with an ID selector.
+
+        Args:
+            query_embeddings (np.ndarray): A (n, dimension) float32 array.
+            k (int): Number of neighbours to return per query.
+            filters (dict): Constraints returned by `query_filters`.
+            snapshot (IndexSnapshot): The store to search (default: the current one).
+
+        Returns:
+            tuple or None: (distances, review IDs) arrays, or None if no review matches even
+            the relaxed constraints.
+        """
+        snapshot = snapshot or self.snapshot
+        ids = snapshot.filters.ids(filters)
+        # Relax the broadest constraints first when no review matches them all
+        for column in ("age", "gender"):
+            if len(ids) or len(filters) == 1:
+                break
+            if column in filters:
+                filters = {name: values for name, values in filters.items() if name != column}
+                ids = snapshot.filters.ids(filters)
+        if len(ids) == 0:
+            return None
+
+        if len(ids) <= FILTER_EXACT_MAX:
+            try:
+                vectors = snapshot.index.reconstruct_batch(ids)
+            except RuntimeError:
+                # e.g. an index built outside vector_store.py, with no map from ID to vector
+                vectors = None
+            if vectors is not None:
+                distances, positions = faiss.knn(query_embeddings, vectors, min(k, len(ids)), metric=snapshot.index.metric_type)
+                return distances, np.where(positions >= 0, ids[positions], -1)
+
+        params = search_parameters(snapshot.params, faiss.IDSelectorBatch(ids))
+        return snapshot.index.search(query_embeddings, k, params=params)
+
+    def review_vectors(self, rows: pd.DataFrame, snapshot: IndexSnapshot = None) -> np.ndarray:
+        """
+        Return the stored embeddings of retrieved reviews.
+
+        The vectors are read back from the index by review ID. Indexes that cannot
+        reconstruct vectors (e.g. one built outside `vector_store.py`), and rows unknown
+        to the current index (a store reloaded since the search), give None: the reviews
+        are then selected without near-duplicate removal and MMR rather than embedded
+        again on every request. The first such request prints a warning.
+
+        Args:
+            rows (pd.DataFrame): Metadata rows returned by `retrieve`, indexed by review ID.
+            snapshot (IndexSnapshot): The store to read from (default: the current one).
+
+        Returns:
+            np.ndarray: A (len(rows), dimension) float32 array, or None if the index
+            cannot reconstruct the vectors.
+        """
+        snapshot = snapshot or self.snapshot
+        if len(rows) == 0:
+            return np.empty((0, snapshot.index.d), dtype="float32")
+        try:
+            return snapshot.index.reconstruct_batch(rows.index.to_numpy(dtype="int64"))
+        except RuntimeError:
+            if not self._reconstruct_warned:
+                self._reconstruct_warned = True
+                print(
+                    "Warning: the index cannot reconstruct the vectors of retrieved reviews; "
+                    "contexts are built without near-duplicate removal and MMR. "
+                    "Rebuild the store with vector_store.py to enable them.",
+                    file=sys.stderr,
+                )
+            return None
+
+    def _rows(self, snapshot: IndexSnapshot, indices) -> pd.DataFrame:
+        """
+        Return the metadata rows for one row of FAISS search results.
+        """
+        # FAISS pads missing neighbours with -1 when the index holds fewer than k vectors
+        ids = [i for i in indices if i >= 0]
+        # Stores written by vector_store.py address vectors by review ID rather than by position
+        with span("metadata"):
+            return snapshot.metadata.rows(ids)
+
+    def _retrieve_filtered(self, user_query: str, k: int, query_embedding: np.ndarray, snapshot: IndexSnapshot):
+        """
+        Search only the reviews matching the gender, age and drug named in the query.
+
+        Returns:
+            pd.DataFrame or None: The retrieved metadata rows, or None if the query has no
+            constraint, or no review matches them (the query is then searched unfiltered).
+        """
+        with span("faiss_search"):
+            filters = self.query_filters(user_query, snapshot)
+            result = self.search_filtered(query_embedding, k, filters, snapshot) if filters else None
+        if result is None:
+            return None
+        return self._rows(snapshot, result[1][0])
+
+    def retrieve(self, user_query: str, k: int = TOP_K, query_embedding: np.ndarray = None,
+                 snapshot: IndexSnapshot = None) -> pd.DataFrame:
+        """
+        Return the metadata rows of the `k` reviews most similar to the query.
+
+        Args:
+            user_query (str): The user's query.
+            k (int): Number of reviews to retrieve.
+            query_embedding (np.ndarray): The (1, dimension) query embedding, if already computed.
+            snapshot (IndexSnapshot): The store to search (default: the current one).
+
+        Returns:
+            pd.DataFrame: The retrieved metadata rows, most similar first. The frame's
+            index holds the review IDs.
+        """
+        snapshot = snapshot or self.snapshot
+        if query_embedding is None:
+            query_embedding = self.encode([user_query])
+
+        # Restrict the search to the gender, age and drug named in the query, when any match
+        rows = self._retrieve_filtered(user_query, k, query_embedding, snapshot)
+        if rows is not None:
+            return rows
+        with span("faiss_search"):
+            distances, indices = self.search(query_embedding, k, snapshot)
+        return self._rows(snapshot, indices[0])
+
+    def retrieve_batch(self, user_queries: list, k: int = TOP_K, query_embeddings: np.ndarray = None) -> list:
+        """
+        Retrieve the `k` most similar reviews for many queries with one encoder pass and one FAISS search.
+
+        Queries with structured constraints are searched one at a time over their subset;
+        only the others are part of the batched search.
+
+        Args:
+            user_queries (list): The user queries.
+            k (int): Number of reviews to retrieve per query.
+            query_embeddings (np.ndarray): The (n, dimension) query embeddings, if already computed.
+
+        Returns:
+            list: One metadata DataFrame per query, most similar first.
+        """
+        snapshot = self.snapshot
+        if query_embeddings is None:
+            query_embeddings = self.encode(user_queries)
+
+        # Constrained queries first, so that the batched search only covers the remaining ones
+        frames = [self._retrieve_filtered(user_queries[i], k, query_embeddings[i:i + 1], snapshot) for i in range(len(user_queries))]
+        unfiltered = [i for i, frame in enumerate(frames) if frame is None]
+        if unfiltered:
+            with span("faiss_search"):
+                distances, indices = self.search(query_embeddings[unfiltered], k, snapshot)
+            for row, i in enumerate(unfiltered):
+                frames[i] = self._rows(snapshot, indices[row])
+        return frames
+
+    def _encode_batch(self, texts: list) -> list:
+        """
+        Encode a micro-batch of queries in one forward pass.
+
+        Returns:
+            list: One (1, dimension) embedding per text.
+        """
+        embeddings = self.encode(texts)
+        return [embeddings[i:i + 1] for i in range(len(texts))]
+
+    def _search_batch(self, items: list) -> list:
+        """
+        Run one FAISS search for a micro-batch of (query_embedding, k) items.
+
+        Returns:
+            list: One (snapshot, indices) pair per item, trimmed to the item's own k.
+        """
+        snapshot = self.snapshot
+        query_embeddings = np.vstack([embedding for embedding, _ in items])
+        max_k = max(k for _, k in items)
+        # Not timed here: see `retrieve_async`
+        distances, indices = snapshot.index.search(query_embeddings, max_k)
+        return [(snapshot, indices[i, :k]) for i, (_, k) in enumerate(items)]
+
+    async def encode_async(self, user_query: str, executor=None) -> np.ndarray:
+        """
+        Encode one query without blocking the event loop.
+
+        Concurrent calls are micro-batched when dynamic batching is enabled; otherwise
+        the query is encoded alone in `executor`.
+
+        Args:
+            user_query (str): The user's query.
+            executor (concurrent.futures.Executor): Executor used without batching (default: the loop's).
+
+        Returns:
+            np.ndarray: The (1, dimension) query embedding.
+        """
+        if self.encode_batcher is not None:
+            return await asyncio.wrap_future(self.encode_batcher.submit(user_query))
+        return await asyncio.get_running_loop().run_in_executor(executor, self.encode, [user_query])
+
+    async def retrieve_async(self, user_query: str, k: int, query_embedding: np.ndarray, executor=None) -> pd.DataFrame:
+        """
+        Async counterpart of `retrieve`; concurrent unfiltered searches are micro-batched when enabled.
+
+        Args:
+            user_query (str): The user's query.
+            k (int): Number of reviews to retrieve.
+            query_embedding (np.ndarray): The (1, dimension) query embedding.
+            executor (concurrent.futures.Executor): Executor used without batching (default: the loop's).
+
+        Returns:
+            pd.DataFrame: The retrieved metadata rows, most similar first.
+        """
+        # The filter decision and a filtered search use the same generation of the store
+        snapshot = self.snapshot
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so that the stage timings reach its request
+        context = contextvars.copy_context()
+        if self.search_batcher is None:
+            return await loop.run_in_executor(executor, context.run, self.retrieve, user_query, k, query_embedding, snapshot)
+
+        # Queries with constraints are searched alone over their subset; the others join a micro-batch
+        rows = await loop.run_in_executor(executor, context.run, self._retrieve_filtered, user_query, k, query_embedding, snapshot)
+        if rows is not None:
+            return rows
+        # Timed here rather than in the batcher thread, which does not run in the request's context
+        with span("faiss_search"):
+            snapshot, indices = await asyncio.wrap_future(self.search_batcher.submit((query_embedding, k)))
+        return self._rows(snapshot, indices)
+
+    def batching_stats(self) -> dict:
+        """
+        Return the queue-depth and batch-size metrics of the encode and search batchers.
+
+        Returns:
+            dict: {"encode": ..., "search": ...}, or None values when batching is disabled.
+        """
+        return {
+            "encode": self.encode_batcher.stats() if self.encode_batcher is not None else None,
+            "search": self.search_batcher.stats() if self.search_batcher is not None else None,
+        }
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(index_path: str = INDEX_PATH, metadata_path: str = METADATA_PATH) -> RetrievalEngine:
+    """
+    Return the shared engine for the given store, creating it on first use.
+
+    Args:
+        index_path (str): Path to the FAISS index file.
+        metadata_path (str): Path to the metadata CSV file.
+
+    Returns:
+        RetrievalEngine: The process-wide engine for these paths.
+    """
+    key = (index_path, metadata_path)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = RetrievalEngine(index_path, metadata_path)
+            _engines[key] = engine
+        return engine
@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings.
+
+    The embeddings of recently answered queries are kept in a small inner-product FAISS
+    index over unit vectors, so a lookup returns the most similar cached query by cosine
+    similarity. A cached answer is reused when:
+
+    - the cosine similarity reaches `threshold`;
+    - the vector store generation (`version`) has not changed;
+    - when `retrieved_ids` are given, the new query retrieved the same top-k reviews.
+
+    Memory is bounded by `max_entries`; the least recently used entry is evicted first.
+    """
+
+    def __init__(self, dimension: int, threshold: float = 0.95, max_entries: int = 1000):
+        """
+        Initialize an empty cache.
+
+        Args:
+            dimension (int): Dimension of the query embeddings.
+            threshold (float): Minimum cosine similarity for a cache hit.
+            max_entries (int): Maximum number of cached answers.
+        """
+        self.dimension = dimension
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self._entries = OrderedDict()  # entry id -> (response, retrieved_ids, version)
+        self._next_id = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _prepare(query_embedding: np.ndarray) -> np.ndarray:
+        """
+        Return the embedding as a unit-length (1, dimension) float32 array.
+        """
+        vector = np.array(query_embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup(self, query_embedding: np.ndarray, retrieved_ids=None, version: int = 0):
+        """
+        Return the cached answer of the most similar query, if it qualifies.
+
+        Args:
+            query_embedding (np.ndarray): The embedding of the new query.
+            retrieved_ids (list): The top-k review IDs retrieved for the new query; when
+                given, they must match the IDs stored with the cached answer.
+            version (int): The current vector store generation.
+
+        Returns:
+            str or None: The cached response, or None on a miss.
+        """
+        vector = self._prepare(query_embedding)
+        with self._lock:
+            if self._index.ntotal:
+                similarities, ids = self._index.search(vector, 1)
+                entry_id = int(ids[0][0])
+                entry = self._entries.get(entry_id)
+                if (
+                    entry is not None
+                    and similarities[0][0] >= self.threshold
+                    and entry[2] == version
+                    and (retrieved_ids is None or entry[1] == tuple(retrieved_ids))
+                ):
+                    self._entries.move_to_end(entry_id)
+                    self._counters["hits"] += 1
+                    return entry[0]
+            self._counters["misses"] += 1
+            return None
+
+    def add(self, query_embedding: np.ndarray, response: str, retrieved_ids, version: int = 0) -> None:
+        """
+        Cache the answer of a query.
+
+        Args:
+            query_embedding (np.ndarray): The embedding of the answered query.
+            response (str): The generated answer.
+            retrieved_ids (list): The top-k review IDs the answer was generated from.
+            version (int): The vector store generation the answer was generated from.
+        """
+        vector = self._prepare(query_embedding)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (response, tuple(retrieved_ids), version)
+
+            # Evict the least recently used answers beyond the size cap
+            while len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([evicted_id], dtype="int64"))
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached answer, e.g. after the vector store was rebuilt.
+        """
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: hits, misses, evictions, invalidations, hit_rate and the number of entries.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,140 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+#from src.api import app, warm_up  # Uncomment this if using relative imports
+#from src.config import API_HOST, API_PORT, API_WORKERS  # Uncomment this if using relative imports
+from api import app, warm_up  # The FastAPI application and its warm-up
+from config import API_HOST, API_PORT, API_WORKERS  # Default address and number of worker processes
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """
+    Create the listening socket shared by every worker.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(sock: socket.socket, log_level: str) -> None:
+    """
+    Serve the API on the shared socket in the current (forked) process.
+    """
+    # Let uvicorn install its own handlers for a graceful shutdown
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, timeout_graceful_shutdown=10)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def spawn_worker(sock: socket.socket, log_level: str) -> int:
+    """
+    Fork one worker process.
+
+    Returns:
+        int: The worker's process ID.
+    """
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(sock, log_level)
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+def serve(host: str = API_HOST, port: int = API_PORT, workers: int = API_WORKERS, preload: bool = True, log_level: str = "info") -> None:
+    """
+    Serve the API with several worker processes sharing one copy of the read-only data.
+
+    Workflow:
+    1. Load the FAISS index (memory-mapped), the metadata (memory-mapped), the embedding
+       model and the relevance gate once, in this process, and warm them up.
+    2. Freeze the loaded objects out of the garbage collector, so that collections in the
+       workers do not write to their pages.
+    3. Fork `workers` processes that accept connections on one shared socket. Pages
+       inherited from this process stay shared (copy-on-write) until a worker modifies
+       them; the memory-mapped files are shared through the page cache.
+    4. Restart workers that exit unexpectedly; stop all of them on SIGTERM or SIGINT.
+
+    With a single worker, the API is served in this process without forking.
+
+    Args:
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        workers (int): Number of worker processes.
+        preload (bool): Whether to load the resources before forking (otherwise each worker loads its own).
+        log_level (str): Uvicorn log level.
+    """
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+    if not hasattr(os, "fork"):
+        raise Exception("Error: Multi-worker serving requires os.fork (Linux or macOS).")
+
+    sock = bind_socket(host, port)
+
+    # Steps 1-2: load and warm up once, before forking
+    if preload:
+        start = time.perf_counter()
+        warm_up()
+        gc.collect()
+        gc.freeze()
+        print(f"Resources loaded in {time.perf_counter() - start:.2f}s; starting {workers} workers on {host}:{port}")
+
+    # Step 3: fork the workers
+    children = {spawn_worker(sock, log_level) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Step 4: supervise
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting it", file=sys.stderr)
+            children.add(spawn_worker(sock, log_level))
+    sock.close()
+
+if __name__ == "__main__":
+    """
+    Main execution block:
+    - Serves the API with `--workers` processes forked after loading the shared resources.
+
+    Example:
+        python src/serve.py --workers 4 --port 8000
+    """
+    parser = argparse.ArgumentParser(description="Serve the API with several worker processes sharing the index, metadata and model.")
+    parser.add_argument("--host", default=API_HOST, help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=API_PORT, help="Port to listen on.")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Number of worker processes.")
+    parser.add_argument("--no-preload", action="store_true", help="Let each worker load its own resources instead of sharing them.")
+    parser.add_argument("--log-level", default="info", help="Uvicorn log level.")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, preload=not args.no_preload, log_level=args.log_level)
@@ -1,70 +1,331 @@
+import argparse
+import hashlib
+import os
 import pandas as pd
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 
-def create_vector_store(file_path: str, output_index: str, output_metadata: str):
+#from src.index_factory import INDEX_TYPES, DEFAULT_SEARCH_PARAMS, build_index, select_training_sample, supports_removal, read_index_params, write_index_params, read_index  # Uncomment this if using relative imports
+#from src.metadata_store import write_metadata_store, metadata_store_path  # Uncomment this if using relative imports
+#from src.query_filters import build_filter_index, filter_index_path  # Uncomment this if using relative imports
+#from src.rating_cube import build_rating_cube, rating_cube_path  # Uncomment this if using relative imports
+#from src.embedding_shards import embed_sharded  # Uncomment this if using relative imports
+#from src.config import EMBEDDING_MODEL  # Uncomment this if using relative imports
+from index_factory import INDEX_TYPES, DEFAULT_SEARCH_PARAMS, build_index, select_training_sample, supports_removal, read_index_params, write_index_params, read_index  # ANN index types and their query-time knobs
+from metadata_store import write_metadata_store, metadata_store_path  # Memory-mapped columnar metadata
+from query_filters import build_filter_index, filter_index_path  # Inverted indexes for structured pre-filtering
+from rating_cube import build_rating_cube, rating_cube_path  # Precomputed rating aggregates for ranking questions
+from embedding_shards import embed_sharded  # Parallel, resumable embedding generation
+from config import EMBEDDING_MODEL  # Embedding model shared with the query encoder
+
+# Fields identifying a review; a review keeps its ID when other fields (e.g. its rating) change
+REVIEW_ID_FIELDS = ["drug_name", "condition", "gender", "age", "time_on_drug", "date", "text"]
+
+def build_combined_text(df: pd.DataFrame) -> pd.Series:
+    """
+    Combine the relevant fields (drug name, condition, demographics, etc.) into a single text for embedding.
+
+    Args:
+        df (pd.DataFrame): The cleaned reviews.
+
+    Returns:
+        pd.Series: The combined text of each review.
+    """
+    return (
+        "Drug Name: " + df["drug_name"].astype(str) + " | "
+        "Condition: " + df["condition"].astype(str) + " | "
+        "Gender: " + df["gender"].astype(str) + " | "
+        "Age Group: " + df["age"].astype(str) + " | "
+        "Time on Drug: " + df["time_on_drug"].astype(str) + " | "
+        "Rating Overall: " + df["rating_overall"].astype(str) + " | "
+        "Review: " + df["text"]
+    )
+
+def _hash64(value: str) -> int:
+    """
+    Return a stable non-negative 63-bit integer hash of a string.
+    """
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
+
+def assign_review_ids(df: pd.DataFrame) -> pd.Series:
+    """
+    Compute a stable ID for every review.
+
+    An existing `review_id` column is used as is. Otherwise the ID is a hash of the
+    identifying fields plus the occurrence number of identical reviews, so it stays
+    the same across refreshes of the dataset regardless of row order.
+
+    Args:
+        df (pd.DataFrame): The cleaned reviews.
+
+    Returns:
+        pd.Series: The int64 review IDs.
+    """
+    if "review_id" in df.columns:
+        return df["review_id"].astype("int64")
+
+    fields = [field for field in REVIEW_ID_FIELDS if field in df.columns]
+    identity = df[fields].astype(str).agg("\x1f".join, axis=1)
+    occurrence = identity.groupby(identity).cumcount().astype(str)
+    return (identity + "\x1e" + occurrence).map(_hash64).astype("int64")
+
+def content_hashes(combined_text: pd.Series) -> pd.Series:
+    """
+    Hash the text embedded for each review, so unchanged reviews can be detected.
+
+    Args:
+        combined_text (pd.Series): The combined text of each review.
+
+    Returns:
+        pd.Series: Hex digests of the combined texts.
+    """
+    return combined_text.map(lambda text: hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest())
+
+def _write_store(index, df: pd.DataFrame, output_index: str, output_metadata: str, index_params: dict) -> None:
+    """
+    Write the metadata, its derived files, the index parameters and the index, replacing the previous files atomically.
+
+    The index is replaced last: running engines reload when it changes, so they never
+    combine a new index with the metadata of the previous store (or the reverse).
+    """
+    # The files derived from the metadata go first; running engines ignore them until the index changes
+    filters_path = filter_index_path(output_metadata)
+    build_filter_index(df).save(filters_path)
+    print(f"Filter index saved to {filters_path}")
+    cube_path = rating_cube_path(output_metadata)
+    build_rating_cube(df).save(cube_path)
+    print(f"Rating cube saved to {cube_path}")
+
+    # The columnar store is what the retrieval engine memory-maps; the CSV is kept for inspection and incremental updates
+    store_path = metadata_store_path(output_metadata)
+    write_metadata_store(df, store_path)
+    print(f"Columnar metadata saved to {store_path}")
+
+    df.to_csv(output_metadata + ".tmp", index=False)
+    os.replace(output_metadata + ".tmp", output_metadata)
+    print(f"Metadata saved to {output_metadata}")
+
+    # The parameters are written before the index so that an engine reloading the new index applies its knobs
+    write_index_params(output_index, index_params)
+
+    # Write to a temporary file and rename it so that running engines never read a half-written index;
+    # its new modification time makes them reload all the files written above
+    faiss.write_index(index, output_index + ".tmp")
+    os.replace(output_index + ".tmp", output_index)
+    print(f"FAISS index saved to {output_index}")
+
+def _load_previous_store(output_index: str, output_metadata: str, index_type: str):
+    """
+    Load the store written by a previous run, if it supports incremental updates.
+
+    Returns:
+        tuple or None: (index, metadata) or None if there is no usable previous store.
+    """
+    if not (os.path.exists(output_index) and os.path.exists(output_metadata)):
+        return None
+    # Switching to another index type requires a rebuild
+    if read_index_params(output_index).get("index_type") != index_type:
+        return None
+    previous = pd.read_csv(output_metadata)
+    if not {"review_id", "content_hash"}.issubset(previous.columns):
+        return None
+    index = read_index(output_index)
+    # Only indexes addressed by review ID can have individual vectors removed. IVF indexes keep
+    # the IDs themselves; one wrapped in an ID map (as written by earlier versions) is rebuilt
+    if isinstance(index, faiss.IndexIVF):
+        by_review_id = True
+    else:
+        by_review_id = isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)) and faiss.try_extract_index_ivf(index) is None
+    if not by_review_id or index.ntotal != len(previous):
+        return None
+    return index, previous
+
+def create_vector_store(
+    file_path: str,
+    output_index: str,
+    output_metadata: str,
+    incremental: bool = False,
+    index_type: str = "flat",
+    nlist: int = None,
+    pq_m: int = 16,
+    hnsw_m: int = 32,
+    nprobe: int = DEFAULT_SEARCH_PARAMS["nprobe"],
+    ef_search: int = DEFAULT_SEARCH_PARAMS["efSearch"],
+    workers: int = 1,
+    batch_size: int = 64,
+    shard_size: int = 20000,
+    shard_dir: str = None,
+):
     """
     Create a FAISS vector store for efficient retrieval and save metadata.
 
     Workflow:
     1. Load the preprocessed dataset.
     2. Combine relevant fields (drug name, condition, demographics, etc.) into a single text for embedding.
-    3. Generate embeddings using a pre-trained SentenceTransformer model.
-    4. Store embeddings in a FAISS index for fast similarity search.
-    5. Save the metadata (original dataset with combined text) to a CSV file.
+    3. Assign stable review IDs and hash each combined text.
+    4. Generate embeddings using a pre-trained SentenceTransformer model, shard by shard across
+       `workers` processes. Each shard is checkpointed to a float16 `.npy` file, so an
+       interrupted run resumes with the missing shards only.
+    5. Store embeddings in a FAISS index of the chosen type, keyed by review ID, training it first
+       on a sample of the embeddings for IVF and PQ indexes, and adding the shards one at a time.
+    6. Save the metadata (original dataset with combined text, review ID and content hash) to a CSV file
+       and to a memory-mappable columnar store, the inverted indexes of the gender, age and drug
+       columns, and the index type and query-time knobs to `<output_index>.json`.
+
+    In incremental mode, the previous store is updated instead of rebuilt: vectors of
+    removed or changed reviews are removed from the index, only new or changed reviews
+    are embedded, and unchanged reviews keep their stored vectors. A previous store
+    without review IDs, built with another index type, or built as an HNSW index (which
+    cannot remove vectors) while reviews were removed or changed is rebuilt in full.
+
+    Both files are replaced atomically, so a running `RetrievalEngine` hot-reloads
+    the new store on its next check.
 
     Args:
-        file_path (str): Path to the cleaned dataset (CSV format).
+        file_path (str): Path to the cleaned dataset (CSV or Parquet format).
         output_index (str): Path to save the FAISS index.
         output_metadata (str): Path to save the metadata CSV file.
+        incremental (bool): Update the existing store instead of rebuilding it.
+        index_type (str): One of "flat", "ivf_flat", "ivf_pq", "hnsw" or "sq8".
+        nlist (int): Number of IVF lists (default: about 4 * sqrt(number of reviews)).
+        pq_m (int): Number of PQ sub-quantizers for "ivf_pq".
+        hnsw_m (int): Number of graph neighbours per node for "hnsw".
+        nprobe (int): Number of IVF lists scanned per query.
+        ef_search (int): Size of the HNSW candidate list per query.
+        workers (int): Number of encoder processes.
+        batch_size (int): Encoder batch size.
+        shard_size (int): Number of reviews per embedding shard.
+        shard_dir (str): Directory of the embedding shards (default: `<output_index>.shards`).
 
     Returns:
         None
+
+    Raises:
+        ValueError: If the index type is unknown or the dataset has no reviews.
     """
-    # Step 1: Load the cleaned data
-    df = pd.read_csv(file_path)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}'. Choose one of: {', '.join(INDEX_TYPES)}.")
+
+    # Step 1: Load the cleaned data (CSV, or Parquet written by `preprocess.py --stream --format parquet`)
+    df = pd.read_parquet(file_path) if file_path.endswith(".parquet") else pd.read_csv(file_path)
+    # An index takes its dimension and training sample from the embeddings, and an empty
+    # dataset would also empty a previous store
+    if df.empty:
+        raise ValueError(f"Error: no reviews to index in '{file_path}'.")
 
     # Step 2: Combine relevant fields into a single text column for embedding
-    df["combined_text"] = (
-        "Drug Name: " + df["drug_name"].astype(str) + " | "
-        "Condition: " + df["condition"].astype(str) + " | "
-        "Gender: " + df["gender"].astype(str) + " | "
-        "Age Group: " + df["age"].astype(str) + " | "
-        "Time on Drug: " + df["time_on_drug"].astype(str) + " | "
-        "Rating Overall: " + df["rating_overall"].astype(str) + " | "
-        "Review: " + df["text"]
-    )
+    df["combined_text"] = build_combined_text(df)
 
-    # Step 3: Initialize the SentenceTransformer model
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    # Step 3: Stable IDs keep the metadata aligned with the index across updates
+    df["review_id"] = assign_review_ids(df)
+    df["content_hash"] = content_hashes(df["combined_text"])
 
-    # Step 4: Generate embeddings using the combined text
-    print("Generating embeddings...")
-    embeddings = model.encode(df["combined_text"].tolist(), show_progress_bar=True)
+    previous = _load_previous_store(output_index, output_metadata, index_type) if incremental else None
+    if incremental and previous is None:
+        print("No incremental-ready store found; rebuilding the full index.")
 
-    # Step 5: Save embeddings in a FAISS index
-    dimension = embeddings.shape[1]  # Determine the dimensionality of the embeddings
-    index = faiss.IndexFlatL2(dimension)  # Create a FAISS index for L2 (Euclidean) distance
-    index.add(np.array(embeddings))  # Add embeddings to the index
-    faiss.write_index(index, output_index)  # Save the index to a file
-    print(f"FAISS index saved to {output_index}")
+    if previous is not None:
+        index, previous_metadata = previous
+        previous_hashes = pd.Series(previous_metadata["content_hash"].values, index=previous_metadata["review_id"].values)
+        current_hashes = pd.Series(df["content_hash"].values, index=df["review_id"].values)
 
-    # Step 6: Save metadata (original dataset + combined_text column)
-    df.to_csv(output_metadata, index=False)
-    print(f"Metadata saved to {output_metadata}")
+        # Reviews that disappeared or whose content changed lose their stored vector
+        stale_ids = previous_hashes.index.difference(current_hashes.index)
+        common = previous_hashes.index.intersection(current_hashes.index)
+        changed_ids = common[previous_hashes[common].values != current_hashes[common].values]
+        if len(stale_ids) + len(changed_ids) and not supports_removal(index_type):
+            print(f"A '{index_type}' index cannot remove vectors; rebuilding the full index.")
+            previous = None
+
+    if previous is None:
+        to_embed = df
+        index = None
+    else:
+        removed_ids = np.asarray(stale_ids.append(changed_ids), dtype="int64")
+        # An ID array selector, the only kind the direct map of IVF indexes accepts
+        index.remove_ids(faiss.IDSelectorArray(removed_ids))
+
+        # Only new or changed reviews are embedded
+        unchanged = df["review_id"].isin(common.difference(changed_ids))
+        to_embed = df[~unchanged]
+        print(
+            f"Incremental update: {len(stale_ids)} removed, {len(changed_ids)} changed, "
+            f"{len(to_embed) - len(changed_ids)} added, {int(unchanged.sum())} unchanged."
+        )
+
+    # Step 4: Generate embeddings for the reviews that need them, in resumable float16 shards
+    if len(to_embed):
+        print("Generating embeddings...")
+        embeddings = embed_sharded(
+            to_embed["combined_text"].tolist(),
+            (to_embed["review_id"].astype(str) + ":" + to_embed["content_hash"]).tolist(),
+            shard_dir or output_index + ".shards",
+            EMBEDDING_MODEL,
+            shard_size=shard_size,
+            workers=workers,
+            batch_size=batch_size,
+        )
+    else:
+        embeddings = None
+
+    # Step 5: Add the embeddings to a FAISS index keyed by review ID, streaming them shard by shard
+    if index is None:
+        dimension = embeddings.dimension  # Determine the dimensionality of the embeddings
+        index = build_index(index_type, dimension, len(embeddings), nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m)  # L2 (Euclidean) distance
+        if not index.is_trained:
+            print(f"Training the '{index_type}' index...")
+            index.train(select_training_sample(embeddings, index))
+    if embeddings is not None:
+        review_ids = to_embed["review_id"].to_numpy(dtype="int64")
+        for start, block in embeddings.iter_blocks():
+            index.add_with_ids(block, review_ids[start:start + len(block)])
+
+    # Step 6: Save the index, its query-time knobs and the metadata (original dataset + combined_text, review_id and content_hash columns)
+    index_params = {"index_type": index_type, "nprobe": nprobe, "efSearch": ef_search}
+    _write_store(index, df, output_index, output_metadata, index_params)
 
 if __name__ == "__main__":
     """
     Main execution block:
     - Calls `create_vector_store` to generate the FAISS index and save metadata.
     """
+    parser = argparse.ArgumentParser(description="Create or update the FAISS vector store.")
+    parser.add_argument("--input", default="data/cleaned_reviews.csv", help="Cleaned dataset (CSV or Parquet).")
+    parser.add_argument("--incremental", action="store_true", help="Embed only new or changed reviews and update the existing index.")
+    parser.add_argument("--index-type", choices=list(INDEX_TYPES), default="flat", help="FAISS index type (default: flat, exact search).")
+    parser.add_argument("--nlist", type=int, default=None, help="Number of IVF lists (default: about 4 * sqrt(number of reviews)).")
+    parser.add_argument("--pq-m", type=int, default=16, help="Number of PQ sub-quantizers for ivf_pq.")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="Number of graph neighbours per node for hnsw.")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_SEARCH_PARAMS["nprobe"], help="IVF lists scanned per query.")
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_SEARCH_PARAMS["efSearch"], help="HNSW candidate list size per query.")
+    parser.add_argument("--workers", type=int, default=1, help="Encoder processes (each uses its share of the CPU cores).")
+    parser.add_argument("--batch-size", type=int, default=64, help="Encoder batch size.")
+    parser.add_argument("--shard-size", type=int, default=20000, help="Reviews per checkpointed embedding shard.")
+    parser.add_argument("--shard-dir", default=None, help="Directory of the embedding shards (default: <index>.shards).")
+    args = parser.parse_args()
+
     # Input: Preprocessed dataset
-    input_file = "data/cleaned_reviews.csv"
-    
+    input_file = args.input
+
     # Output: Paths for FAISS index and metadata file
     index_output = "models/faiss_index"
     metadata_output = "models/reviews_with_metadata.csv"
 
     # Create the FAISS vector store and save metadata
-    create_vector_store(input_file, index_output, metadata_output)
+    create_vector_store(
+        input_file,
+        index_output,
+        metadata_output,
+        incremental=args.incremental,
+        index_type=args.index_type,
+        nlist=args.nlist,
+        pq_m=args.pq_m,
+        hnsw_m=args.hnsw_m,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        shard_size=args.shard_size,
+        shard_dir=args.shard_dir,
+    )
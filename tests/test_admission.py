@@ -0,0 +1,172 @@
+import asyncio
+import unittest
+from src.admission import StageLimiter, SingleFlight, Overloaded, normalize_query
+
+class TestStageLimiter(unittest.TestCase):
+    """
+    Unit tests for the per-stage concurrency limit and its bounded wait queue.
+    """
+
+    def test_sheds_when_the_queue_is_full(self):
+        """
+        Test that requests beyond the limit and the queue are refused at once.
+
+        Verifies:
+        - `limit` requests run, `max_queue` wait, and the next one raises `Overloaded`.
+        - Waiting requests are admitted in order as slots are released.
+        """
+        async def run():
+            limiter = StageLimiter("test", limit=2, max_queue=1, queue_timeout=5.0)
+            release = asyncio.Event()
+            order = []
+
+            async def request(name):
+                async with limiter.slot():
+                    order.append(name)
+                    await release.wait()
+
+            tasks = [asyncio.ensure_future(request(i)) for i in range(3)]
+            await asyncio.sleep(0)
+            self.assertEqual((limiter.active, limiter.waiting), (2, 1))
+            with self.assertRaises(Overloaded) as raised:
+                await limiter.acquire()
+            self.assertEqual(raised.exception.reason, "queue_full")
+            self.assertGreater(raised.exception.retry_after, 0.0)
+
+            release.set()
+            await asyncio.gather(*tasks)
+            self.assertEqual(order, [0, 1, 2])
+            self.assertEqual((limiter.active, limiter.waiting), (0, 0))
+            self.assertEqual(limiter.stats, {"admitted": 3, "queue_full": 1, "queue_timeout": 0})
+
+        asyncio.run(run())
+
+    def test_sheds_after_the_queue_timeout(self):
+        """
+        Test that a request waiting longer than `queue_timeout` is refused.
+
+        Verifies:
+        - The request raises `Overloaded` with the "queue_timeout" reason.
+        - It leaves the queue, and the slot count is unchanged.
+        """
+        async def run():
+            limiter = StageLimiter("test", limit=1, max_queue=4, queue_timeout=0.01)
+            await limiter.acquire()
+            with self.assertRaises(Overloaded) as raised:
+                await limiter.acquire()
+            self.assertEqual(raised.exception.reason, "queue_timeout")
+            self.assertEqual((limiter.active, limiter.waiting), (1, 0))
+            limiter.release()
+            self.assertEqual(limiter.active, 0)
+
+        asyncio.run(run())
+
+    def test_cancelled_waiter_does_not_leak_a_slot(self):
+        """
+        Test that a waiter cancelled just after being handed a slot does not lose it.
+
+        Verifies:
+        - The waiter either keeps the slot (and releases it later) or passes it on.
+        - The next waiter is admitted either way.
+        """
+        async def run():
+            limiter = StageLimiter("test", limit=1, max_queue=4, queue_timeout=5.0)
+            await limiter.acquire()
+            first = asyncio.ensure_future(limiter.acquire())
+            second = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            limiter.release()  # Hands the slot to `first`...
+            first.cancel()     # ...which is cancelled before it runs
+            await asyncio.gather(first, return_exceptions=True)
+            if not first.cancelled():
+                limiter.release()
+            await asyncio.wait_for(second, 1.0)
+            self.assertEqual((limiter.active, limiter.waiting), (1, 0))
+
+        asyncio.run(run())
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    Unit tests for the coalescing of concurrent identical requests.
+    """
+
+    def test_concurrent_calls_share_one_execution(self):
+        """
+        Test that concurrent calls with the same key run the work once.
+
+        Verifies:
+        - Every caller gets the result of the single execution.
+        - A call after completion runs the work again.
+        - Queries differing only in case and spacing get the same key.
+        """
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        async def run():
+            flight = SingleFlight()
+            key = normalize_query("Zoloft  for ANXIETY ")
+            results = await asyncio.gather(*(flight.run(key, work) for _ in range(5)))
+            self.assertEqual(results, [1] * 5)
+            self.assertEqual(flight.stats, {"leaders": 1, "followers": 4})
+            self.assertEqual(flight.in_flight, 0)
+            self.assertEqual(await flight.run(key, work), 2)
+
+        self.assertEqual(normalize_query("Zoloft  for ANXIETY "), normalize_query("zoloft for anxiety"))
+        asyncio.run(run())
+
+    def test_errors_are_shared(self):
+        """
+        Test that every caller of a failing execution receives its exception.
+        """
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def run():
+            flight = SingleFlight()
+            results = await asyncio.gather(*(flight.run("q", work) for _ in range(3)), return_exceptions=True)
+            self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+        asyncio.run(run())
+
+    def test_cancelled_only_when_every_caller_leaves(self):
+        """
+        Test that one caller going away does not cancel the work of the others.
+
+        Verifies:
+        - The remaining caller still gets the result.
+        - The work is cancelled once its last caller is cancelled.
+        """
+        async def run():
+            flight = SingleFlight()
+            started = []
+
+            async def work():
+                started.append(asyncio.current_task())
+                await asyncio.sleep(0.05)
+                return "done"
+
+            first = asyncio.ensure_future(flight.run("q", work))
+            second = asyncio.ensure_future(flight.run("q", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            self.assertEqual(await second, "done")
+
+            lone = asyncio.ensure_future(flight.run("r", work))
+            await asyncio.sleep(0.01)
+            lone.cancel()
+            await asyncio.gather(lone, return_exceptions=True)
+            await asyncio.sleep(0)
+            self.assertTrue(started[-1].cancelled())
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
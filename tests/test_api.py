@@ -1,5 +1,8 @@
 import unittest
+from unittest import mock
+import numpy as np
 from fastapi.testclient import TestClient
+from src import api
 from src.api import app
 
 class TestAPI(unittest.TestCase):
@@ -63,6 +66,23 @@ class TestAPI(unittest.TestCase):
         response = self.client.post("/recommend", json={})
         self.assertEqual(response.status_code, 422)  # Ensure proper error handling for invalid input
 
+    def test_api_recommend_gate_failure(self):
+        """
+        Test the /recommend endpoint when the relevance gate fails with an unexpected error.
+
+        Verifies:
+        - The endpoint returns a status code of 500 with an error detail, not a bare traceback.
+        """
+        engine = mock.Mock()
+        engine.encode_async = mock.AsyncMock(return_value=np.zeros((1, 4), dtype="float32"))
+        engine.retrieve_async = mock.AsyncMock(return_value=None)
+        gate_error = ValueError("the gate is broken")
+        with mock.patch.object(api, "get_resources", return_value=(engine, None)), \
+                mock.patch.object(api, "is_query_related_async", side_effect=gate_error):
+            response = self.client.post("/recommend", json={"query": "Does Zoloft help with anxiety?"})
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("the gate is broken", response.json()["detail"])
+
 if __name__ == "__main__":
     """
     Main entry point for running the tests.
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+import unittest
+from src.batcher import MicroBatcher
+
+class TestMicroBatcher(unittest.TestCase):
+    """
+    Unit tests for the dynamic micro-batcher used by the retrieval engine.
+    """
+
+    def test_concurrent_items_are_batched(self):
+        """
+        Test that items submitted together are processed in few batches.
+
+        Verifies:
+        - Each caller receives its own result.
+        - At least one batch holds more than one item.
+        - The batch size never exceeds `max_batch_size`.
+        """
+        def slow_double(items):
+            time.sleep(0.01)
+            return [2 * item for item in items]
+
+        batcher = MicroBatcher(slow_double, max_batch_size=8, max_wait_ms=20)
+        futures = [batcher.submit(i) for i in range(20)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [2 * i for i in range(20)])
+
+        stats = batcher.stats()
+        self.assertEqual(stats["items"], 20)
+        self.assertGreater(stats["max_batch_size"], 1)
+        self.assertLessEqual(stats["max_batch_size"], 8)
+        batcher.close()
+
+    def test_errors_reach_every_caller(self):
+        """
+        Test that an exception raised by the batch function is set on every future of the batch.
+        """
+        def failing(items):
+            raise ValueError("encoder failure")
+
+        batcher = MicroBatcher(failing, max_batch_size=4, max_wait_ms=20)
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        batcher.close()
+
+    def test_cancelled_items_are_skipped(self):
+        """
+        Test that an item cancelled before its batch starts is not processed.
+        """
+        release = threading.Event()
+        seen = []
+
+        def blocking(items):
+            release.wait(timeout=5)
+            seen.extend(items)
+            return items
+
+        batcher = MicroBatcher(blocking, max_batch_size=1, max_wait_ms=0)
+        first = batcher.submit("first")  # Occupies the worker
+        time.sleep(0.05)
+        second = batcher.submit("second")
+        self.assertTrue(second.cancel())
+        release.set()
+        self.assertEqual(first.result(timeout=5), "first")
+        batcher.close()
+        self.assertEqual(seen, ["first"])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+    def test_batcher_works_after_fork(self):
+        """
+        Test that a batcher created before a fork still answers in the child process.
+        """
+        batcher = MicroBatcher(lambda items: [2 * item for item in items], max_batch_size=4, max_wait_ms=1)
+        self.assertEqual(batcher.submit(1).result(timeout=5), 2)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os._exit(0 if batcher.submit(21).result(timeout=5) == 42 else 1)
+            except BaseException:
+                os._exit(1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        batcher.close()
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
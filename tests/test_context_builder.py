@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.context_builder import count_tokens, truncate_tokens, select_reviews, format_context, build_context
+
+class TestContextBuilder(unittest.TestCase):
+    """
+    Unit tests for the token-budgeted, deduplicated prompt context.
+    """
+
+    def setUp(self):
+        """
+        Create five retrieved reviews and their embeddings.
+
+        Reviews 0 and 1 are near-duplicates, review 2 repeats the text of review 0, and
+        reviews 3 and 4 point in other directions.
+        """
+        self.rows = pd.DataFrame({
+            "drug_name": ["Zoloft", "Zoloft", "Prozac", "Lexapro", "Wellbutrin"],
+            "condition": ["Anxiety"] * 5,
+            "gender": ["Female", "Female", "Male", "Female", None],
+            "age": ["25-34", "25-34", "35-44", "45-54", "25-34"],
+            "time_on_drug": ["1 to 6 months"] * 5,
+            "rating_overall": [5.0, 4.0, 3.0, 4.0, 2.0],
+            "text": ["Helped with my panic attacks.", "Helped with panic attacks!", "helped with my panic attacks. ",
+                     "Calmer after two weeks.", "Made me | jittery\nat first."],
+            "combined_text": ["Drug Name: Zoloft | Review: Helped with my panic attacks."] * 5,
+        }, index=[10, 11, 12, 13, 14])
+        self.vectors = np.array([[1.0, 0.0, 0.0], [0.99, -0.1, 0.0], [1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [0.5, 0.0, 0.86]], dtype="float32")
+        self.query = np.array([[1.0, 0.2, 0.2]], dtype="float32")
+
+    def test_token_counting_and_truncation(self):
+        """
+        Test that truncation respects the token limit and leaves short texts untouched.
+        """
+        text = "Zoloft helped me a lot with anxiety, but the first two weeks were hard."
+        self.assertGreater(count_tokens(text), 10)
+        self.assertEqual(truncate_tokens(text, 1000), text)
+        shortened = truncate_tokens(text, 5)
+        self.assertTrue(shortened.endswith("..."))
+        self.assertLessEqual(count_tokens(shortened), 5)
+        self.assertEqual(truncate_tokens(text, 0), "")
+
+    def test_select_drops_duplicates_and_diversifies(self):
+        """
+        Test the selection of the context reviews.
+
+        Verifies:
+        - Exact repeats (case and whitespace aside) and near-duplicates are dropped.
+        - Maximal marginal relevance picks the remaining reviews in relevance/diversity order.
+        - Without embeddings, the first distinct reviews are kept.
+        """
+        selected = select_reviews(self.rows, self.query, self.vectors, max_reviews=5, dedup_threshold=0.95, mmr_lambda=0.7)
+        self.assertEqual(selected.index.tolist(), [10, 13, 14])
+        self.assertEqual(select_reviews(self.rows, max_reviews=3).index.tolist(), [10, 11, 13])
+        relevance_only = select_reviews(self.rows, self.query, self.vectors, max_reviews=2, dedup_threshold=1.1, mmr_lambda=1.0)
+        self.assertEqual(relevance_only.index.tolist(), [10, 11])
+
+    def test_compact_table_within_budget(self):
+        """
+        Test that the context is a compact table cut to the token budget.
+
+        Verifies:
+        - One heading line and one single-line row per review, without repeated field labels.
+        - The context never exceeds the budget, and an unlimited budget keeps every review.
+        """
+        full = format_context(self.rows, budget=0).splitlines()
+        self.assertEqual(full[0], "drug | condition | gender | age | time on drug | rating | review")
+        self.assertEqual(full[1], "Zoloft | Anxiety | Female | 25-34 | 1 to 6 months | 5 | Helped with my panic attacks.")
+        self.assertEqual(full[5], "Wellbutrin | Anxiety | - | 25-34 | 1 to 6 months | 2 | Made me / jittery at first.")
+        self.assertNotIn("Drug Name:", "\n".join(full))
+        for budget in (30, 60, 90):
+            context = format_context(self.rows, budget=budget)
+            self.assertLessEqual(sum(count_tokens(line) + 1 for line in context.splitlines()), budget)
+        self.assertEqual(format_context(self.rows, budget=5), "")
+        legacy = format_context(self.rows[["combined_text"]], budget=0)
+        self.assertEqual(legacy.splitlines()[0], "Drug Name: Zoloft | Review: Helped with my panic attacks.")
+
+    def test_build_context(self):
+        """
+        Test that the context of over-fetched reviews holds the selected reviews only.
+        """
+        context = build_context(self.rows, self.query, self.vectors, max_reviews=2, budget=0)
+        self.assertEqual([line.split(" | ")[0] for line in context.splitlines()[1:]], ["Zoloft", "Lexapro"])
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import src.embedding_shards as embedding_shards
+from src.embedding_shards import embed_sharded, ShardedEmbeddings
+
+class CountingEncoder:
+    """
+    Deterministic stand-in for the SentenceTransformer model that counts encoded texts.
+    """
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False):
+        self.encoded += len(texts)
+        return np.array([[len(text), i % 7, 1.5] for i, text in enumerate(texts)], dtype="float32")
+
+class TestEmbeddingShards(unittest.TestCase):
+    """
+    Unit tests for the sharded, resumable embedding pipeline.
+    """
+
+    def setUp(self):
+        """
+        Install the counting encoder in place of the model loaded by the workers.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.encoder = CountingEncoder()
+        self.loads = 0
+
+        def init_worker(model_name, threads):
+            self.loads += 1
+            embedding_shards._worker_model = self.encoder
+
+        patcher = mock.patch.object(embedding_shards, "_init_worker", init_worker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.texts = [f"review {'x' * i}" for i in range(25)]
+        self.keys = [f"{i}:hash{i}" for i in range(25)]
+
+    def tearDown(self):
+        """
+        Remove the shard directory.
+        """
+        self.tmp.cleanup()
+
+    def test_shards_cover_the_corpus_in_order(self):
+        """
+        Test that the shards hold every embedding, in input order, as float16 on disk.
+
+        Verifies:
+        - Gathering positions across shard boundaries returns float32 rows.
+        - Iterating the blocks covers the corpus once.
+        """
+        embeddings = embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(len(embeddings), 25)
+        self.assertEqual(embeddings.dimension, 3)
+        rows = embeddings[np.array([0, 9, 10, 24])]
+        self.assertEqual(rows.dtype, np.float32)
+        self.assertEqual(rows[:, 0].tolist(), [len(self.texts[i]) for i in (0, 9, 10, 24)])
+        self.assertEqual(sum(len(block) for _, block in embeddings.iter_blocks()), 25)
+        self.assertEqual(np.load(os.path.join(self.tmp.name, "shard_00000.npy")).dtype, np.float16)
+
+    def test_resume_encodes_only_missing_or_changed_shards(self):
+        """
+        Test that a second run reuses complete shards with unchanged content.
+        """
+        embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(self.encoder.encoded, 25)
+
+        # Simulate an interrupted run: the last shard was never written
+        os.remove(os.path.join(self.tmp.name, "shard_00002.npy"))
+        embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(self.encoder.encoded, 30)
+
+        # A changed review invalidates its shard only
+        keys = list(self.keys)
+        keys[12] = "12:changed"
+        embed_sharded(self.texts, keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(self.encoder.encoded, 40)
+
+    def test_rerun_without_changes_does_not_load_the_model(self):
+        """
+        Test that a run reusing every shard does not load the encoder.
+        """
+        embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(self.loads, 1)
+        embeddings = embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(len(embeddings), 25)
+
+    def test_shards_of_a_larger_corpus_are_deleted(self):
+        """
+        Test that shards left by a previous run over a larger corpus are deleted.
+        """
+        embed_sharded(self.texts, self.keys, self.tmp.name, "model", shard_size=10)
+        embeddings = embed_sharded(self.texts[:12], self.keys[:12], self.tmp.name, "model", shard_size=10)
+        files = sorted(name for name in os.listdir(self.tmp.name) if name.endswith(".npy"))
+        self.assertEqual(files, ["shard_00000.npy", "shard_00001.npy"])
+        self.assertEqual(len(embeddings), 12)
+
+    def test_incomplete_shards_are_rejected(self):
+        """
+        Test that opening a directory without a complete manifest fails.
+        """
+        with self.assertRaises(ValueError):
+            ShardedEmbeddings(self.tmp.name)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from src import evaluate_gate
+from src.relevance_gate import RELATED_EXAMPLES
+
+class TestEvaluateGate(unittest.TestCase):
+    """
+    Unit tests for the relevance gate evaluation.
+    """
+
+    def test_default_queries_are_held_out(self):
+        """
+        Test that the default evaluation set is labelled and disjoint from the gate's examples.
+        """
+        queries = evaluate_gate.load_queries()
+        self.assertTrue(queries)
+        self.assertEqual({label for _, label in queries}, {True, False})
+
+    def test_examples_are_rejected(self):
+        """
+        Test that a query file containing one of the gate's examples is refused.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "queries.jsonl")
+            with open(path, "w") as f:
+                f.write(json.dumps({"query": RELATED_EXAMPLES[0], "label": True}) + "\n")
+            with self.assertRaises(ValueError):
+                evaluate_gate.load_queries(path)
+
+    def test_accuracy_against_labels(self):
+        """
+        Test that the local, LLM and combined decisions are scored against the labels.
+
+        Verifies:
+        - The local accuracy counts the queries decided locally only.
+        - The combined decision uses the LLM for the queries the local gate leaves undecided.
+        - Unlabelled queries are left out of the accuracies.
+        """
+        local = {"a": True, "b": False, "c": None, "d": None, "e": True}
+        llm = {"a": True, "b": True, "c": True, "d": True, "e": False}
+        gate = mock.Mock(accept_threshold=0.1, reject_threshold=-0.1)
+        gate.engine.encode.return_value = np.zeros((1, 2), dtype="float32")
+        gate.classify.side_effect = lambda query, embedding: local[query]
+        gate.score.return_value = 0.0
+        queries = [("a", True), ("b", True), ("c", True), ("d", False), ("e", None)]
+
+        with mock.patch.object(evaluate_gate, "analyze_query_with_llm", side_effect=llm.get):
+            report = evaluate_gate.evaluate_gate(gate, queries)
+        self.assertEqual(report["labelled"], 4)
+        self.assertEqual(report["local_accuracy"], 0.5)
+        self.assertEqual(report["llm_accuracy"], 0.75)
+        self.assertEqual(report["gate_accuracy"], 0.5)
+        self.assertAlmostEqual(report["agreement_with_llm"], 1 / 3)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+import faiss
+import numpy as np
+from src.index_factory import build_index, select_training_sample, apply_search_params, write_index_params, read_index_params, read_index
+
+class TestIndexFactory(unittest.TestCase):
+    """
+    Unit tests for the selectable FAISS index types and their query-time knobs.
+    """
+
+    def setUp(self):
+        """
+        Create a small random corpus with review-like IDs.
+        """
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((2000, 16)).astype("float32")
+        self.ids = np.arange(2000, dtype="int64") * 1000 + 7
+
+    def test_every_index_type_finds_an_exact_match(self):
+        """
+        Test that each index type returns a stored vector's own review ID.
+
+        Verifies:
+        - IVF and PQ indexes are trained before vectors are added.
+        - Searches return review IDs rather than positions.
+        """
+        for index_type in ["flat", "ivf_flat", "ivf_pq", "hnsw", "sq8"]:
+            with self.subTest(index_type=index_type):
+                index = build_index(index_type, 16, len(self.vectors), nlist=8, pq_m=4)
+                if not index.is_trained:
+                    index.train(select_training_sample(self.vectors, index))
+                index.add_with_ids(self.vectors, self.ids)
+                apply_search_params(index, {"index_type": index_type, "nprobe": 8, "efSearch": 64})
+                _, found = index.search(self.vectors[:5], 1)
+                self.assertEqual(found[:, 0].tolist(), self.ids[:5].tolist())
+
+    def test_every_index_type_reconstructs_by_review_id(self):
+        """
+        Test that each index type returns the stored vectors of given review IDs.
+
+        Verifies:
+        - `reconstruct_batch` works on a built index, and on the index read back, memory-mapped or not.
+        - After removing reviews (as incremental updates do), the other reviews are still
+          found and reconstructed by their own ID.
+        - An IVF index written inside an ID map without a direct map (earlier stores) can
+          reconstruct vectors once loaded.
+        """
+        for index_type in ["flat", "ivf_flat", "ivf_pq", "hnsw", "sq8"]:
+            with self.subTest(index_type=index_type), tempfile.TemporaryDirectory() as tmp:
+                index = build_index(index_type, 16, len(self.vectors), nlist=8, pq_m=4)
+                if not index.is_trained:
+                    index.train(select_training_sample(self.vectors, index))
+                index.add_with_ids(self.vectors, self.ids)
+                # PQ and SQ8 codes give back approximations of the stored vectors
+                tolerance = 2.0 if index_type == "ivf_pq" else 0.1
+                np.testing.assert_allclose(index.reconstruct_batch(self.ids[:5]), self.vectors[:5], atol=tolerance)
+
+                index_path = os.path.join(tmp, "faiss_index")
+                faiss.write_index(index, index_path)
+                for mmap in (False, True):
+                    loaded = read_index(index_path, mmap=mmap)
+                    np.testing.assert_allclose(loaded.reconstruct_batch(self.ids[:5]), index.reconstruct_batch(self.ids[:5]))
+
+                if index_type != "hnsw":
+                    removed = self.ids[:10]
+                    self.assertEqual(index.remove_ids(faiss.IDSelectorArray(removed)), 10)
+                    np.testing.assert_allclose(index.reconstruct_batch(self.ids[10:15]), loaded.reconstruct_batch(self.ids[10:15]))
+                    apply_search_params(index, {"index_type": index_type, "nprobe": 8})
+                    _, found = index.search(self.vectors[10:15], 1)
+                    self.assertEqual(found[:, 0].tolist(), self.ids[10:15].tolist())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = faiss.IndexIDMap2(faiss.index_factory(16, "IVF8,Flat"))
+            legacy.train(self.vectors)
+            legacy.add_with_ids(self.vectors, self.ids)
+            index_path = os.path.join(tmp, "faiss_index")
+            faiss.write_index(legacy, index_path)
+            np.testing.assert_allclose(read_index(index_path).reconstruct_batch(self.ids[:5]), self.vectors[:5])
+
+    def test_invalid_index_type(self):
+        """
+        Test that unknown index types and invalid PQ settings are rejected.
+        """
+        with self.assertRaises(ValueError):
+            build_index("lsh", 16, 100)
+        with self.assertRaises(ValueError):
+            build_index("ivf_pq", 16, 100, pq_m=5)
+
+    def test_search_params_round_trip(self):
+        """
+        Test that the knobs stored next to an index are applied when it is loaded.
+
+        Verifies:
+        - A store without a parameters file is treated as a flat index.
+        - `nprobe` is set on an IVF index wrapped in an ID map.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = os.path.join(tmp, "faiss_index")
+            self.assertEqual(read_index_params(index_path), {"index_type": "flat"})
+
+            write_index_params(index_path, {"index_type": "ivf_flat", "nprobe": 3})
+            index = build_index("ivf_flat", 16, len(self.vectors), nlist=8)
+            apply_search_params(index, read_index_params(index_path))
+            self.assertEqual(faiss.extract_index_ivf(index).nprobe, 3)
+
+    def test_memory_mapped_index_matches(self):
+        """
+        Test that a memory-mapped index returns the same neighbours as one read into memory.
+        """
+        for index_type in ("flat", "ivf_flat", "hnsw"):
+            with self.subTest(index_type=index_type), tempfile.TemporaryDirectory() as tmp:
+                index = build_index(index_type, 16, len(self.vectors), nlist=8)
+                if not index.is_trained:
+                    index.train(select_training_sample(self.vectors, index))
+                index.add_with_ids(self.vectors, self.ids)
+                index_path = os.path.join(tmp, "faiss_index")
+                faiss.write_index(index, index_path)
+
+                mapped = read_index(index_path, mmap=True)
+                self.assertEqual(mapped.ntotal, len(self.vectors))
+                expected = read_index(index_path).search(self.vectors[:5], 3)[1]
+                np.testing.assert_array_equal(mapped.search(self.vectors[:5], 3)[1], expected)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
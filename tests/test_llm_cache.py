@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+import unittest
+from src.llm_cache import LLMCache, make_cache_key
+
+class TestLLMCache(unittest.TestCase):
+    """
+    Unit tests for the two-tier LLM response cache.
+    """
+
+    def test_key_normalizes_prompt(self):
+        """
+        Test that prompts differing only in whitespace share a key.
+
+        Verifies:
+        - Whitespace differences do not change the key.
+        - A different temperature produces a different key.
+        """
+        key = make_cache_key("gpt-3.5-turbo", "Best drug  for\nwomen?", 300, 0.5)
+        self.assertEqual(key, make_cache_key("gpt-3.5-turbo", " Best drug for women? ", 300, 0.5))
+        self.assertNotEqual(key, make_cache_key("gpt-3.5-turbo", "Best drug for women?", 300, 0.2))
+
+    def test_memory_lru_eviction(self):
+        """
+        Test that the memory tier evicts the least recently used entry.
+
+        Verifies:
+        - A recently read entry survives eviction.
+        - The least recently used entry is evicted and counted as a miss.
+        """
+        cache = LLMCache(max_entries=2, ttl=0)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        self.assertEqual(cache.get("a"), "1")  # "b" is now the least recently used
+        cache.set("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_ttl_expiry(self):
+        """
+        Test that entries past their TTL are treated as misses.
+        """
+        cache = LLMCache(max_entries=10, ttl=0.05)
+        cache.set("a", "1")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_shared_between_instances(self):
+        """
+        Test that the SQLite tier is shared between cache instances (e.g. worker processes).
+
+        Verifies:
+        - A second instance reads an entry written by the first one.
+        - The disk size cap is enforced.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite")
+            writer = LLMCache(max_entries=10, ttl=0, disk_path=path, disk_max_entries=2)
+            writer.set("a", "1")
+            writer.set("b", "2")
+            writer.set("c", "3")
+
+            reader = LLMCache(max_entries=10, ttl=0, disk_path=path, disk_max_entries=2)
+            self.assertEqual(reader.get("c"), "3")
+            self.assertIsNone(reader.get("a"))
+            self.assertEqual(reader.stats()["disk_hits"], 1)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+import openai
+from src import llm_handler
+from src.llm_handler import LLMClient, LLMRateLimitError, LLMUnavailableError
+
+# A minimal chat completion response
+RESPONSE = {"choices": [{"message": {"content": "Zoloft"}}], "usage": {"prompt_tokens": 3, "completion_tokens": 1}}
+
+def rate_limited():
+    return openai.error.RateLimitError("Rate limit reached", http_status=429, headers={"retry-after": "0"})
+
+def quota_exhausted():
+    return openai.error.RateLimitError(
+        "You exceeded your current quota", http_status=429,
+        json_body={"error": {"message": "You exceeded your current quota", "type": "insufficient_quota", "code": "insufficient_quota"}},
+    )
+
+def unavailable():
+    return openai.error.ServiceUnavailableError("The server is overloaded", http_status=503)
+
+class TestLLMClient(unittest.TestCase):
+    """
+    Unit tests for the retrying, rate-limited, circuit-breaking LLM client.
+
+    `openai.ChatCompletion.create` is mocked; no request leaves the process.
+    """
+
+    def setUp(self):
+        """
+        Create a client with short delays and a known API key.
+        """
+        self.client = LLMClient(max_retries=2, backoff_base=0.001, backoff_max=0.01, breaker_failures=3, breaker_reset=60.0)
+        self.client._api_key = "sk-test"
+
+    def test_retries_upstream_errors_then_succeeds(self):
+        """
+        Test that 503 errors are retried and the eventual response is returned.
+
+        Verifies:
+        - The call succeeds after two failed attempts.
+        - The API key and the per-attempt timeouts are passed on every attempt.
+        """
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=[unavailable(), unavailable(), RESPONSE]) as create:
+            self.assertEqual(self.client.create(model="gpt-3.5-turbo", messages=[]), RESPONSE)
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(create.call_args.kwargs["api_key"], "sk-test")
+        self.assertEqual(create.call_args.kwargs["request_timeout"], (self.client.connect_timeout, self.client.timeout))
+
+    def test_rate_limit_after_last_retry(self):
+        """
+        Test that a call still rate-limited after every retry raises LLMRateLimitError.
+
+        Verifies:
+        - The request is attempted 1 + max_retries times.
+        - The error carries the server's Retry-After value.
+        - Rate limiting does not open the circuit.
+        """
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=[rate_limited() for _ in range(3)]) as create:
+            with self.assertRaises(LLMRateLimitError) as raised:
+                self.client.create(model="gpt-3.5-turbo", messages=[])
+        self.assertEqual(create.call_count, 3)
+        self.assertEqual(raised.exception.retry_after, 0.0)
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_circuit_opens_and_fails_fast(self):
+        """
+        Test that repeated upstream failures open the circuit.
+
+        Verifies:
+        - The call fails with LLMUnavailableError once the failure threshold is reached.
+        - Further calls fail immediately, without reaching the API, with a Retry-After hint.
+        """
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=[unavailable() for _ in range(3)]) as create:
+            with self.assertRaises(LLMUnavailableError):
+                self.client.create(model="gpt-3.5-turbo", messages=[])
+            self.assertEqual(create.call_count, 3)
+            with self.assertRaises(LLMUnavailableError) as raised:
+                self.client.create(model="gpt-3.5-turbo", messages=[])
+            self.assertEqual(create.call_count, 3)
+        self.assertGreater(raised.exception.retry_after, 0.0)
+
+    def test_non_retryable_errors_are_raised_unchanged(self):
+        """
+        Test that errors retrying cannot fix are raised at once, unchanged.
+        """
+        error = openai.error.InvalidRequestError("Bad request", param=None, http_status=400)
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=error) as create:
+            with self.assertRaises(openai.error.InvalidRequestError):
+                self.client.create(model="gpt-3.5-turbo", messages=[])
+        self.assertEqual(create.call_count, 1)
+
+    def test_exhausted_quota_is_not_retried(self):
+        """
+        Test that a 429 sent because the quota is exhausted is raised at once.
+
+        Verifies:
+        - The request is attempted once, and the original error is raised.
+        - The circuit stays closed.
+        """
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=[quota_exhausted(), RESPONSE]) as create:
+            with self.assertRaises(openai.error.RateLimitError):
+                self.client.create(model="gpt-3.5-turbo", messages=[])
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(self.client.breaker.state, "closed")
+
+    def test_concurrency_limit_is_shared_by_threads_and_event_loops(self):
+        """
+        Test that `max_concurrency` bounds the requests in flight across threads and event loops.
+
+        Two threads make sync calls and two others run an event loop each making async
+        calls; at most `max_concurrency` of the requests run at once.
+        """
+        client = LLMClient(max_concurrency=2)
+        client._api_key = "sk-test"
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, maximum
+
+        def enter():
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+
+        def leave():
+            with lock:
+                in_flight[0] -= 1
+
+        def create(**kwargs):
+            enter()
+            time.sleep(0.02)
+            leave()
+            return RESPONSE
+
+        async def acreate(**kwargs):
+            enter()
+            await asyncio.sleep(0.02)
+            leave()
+            return RESPONSE
+
+        async def async_calls():
+            await asyncio.gather(*(client.acreate(model="gpt-3.5-turbo", messages=[]) for _ in range(3)))
+            await client.aclose()
+
+        def sync_calls():
+            for _ in range(3):
+                client.create(model="gpt-3.5-turbo", messages=[])
+
+        with mock.patch.object(openai.ChatCompletion, "create", side_effect=create), \
+                mock.patch.object(openai.ChatCompletion, "acreate", side_effect=acreate):
+            threads = [threading.Thread(target=sync_calls) for _ in range(2)]
+            threads += [threading.Thread(target=asyncio.run, args=(async_calls(),)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(in_flight, [0, 2])
+        self.assertEqual(client._limiter.active, 0)
+
+    def test_async_calls_share_one_pooled_session(self):
+        """
+        Test that async calls run through one aiohttp session per event loop.
+
+        Verifies:
+        - Every attempt sees the client's session as `openai.aiosession`.
+        - The session is closed by `aclose`.
+        """
+        sessions = []
+
+        async def acreate(**kwargs):
+            sessions.append(openai.aiosession.get())
+            return RESPONSE
+
+        async def run():
+            with mock.patch.object(openai.ChatCompletion, "acreate", side_effect=acreate):
+                await asyncio.gather(*(self.client.acreate(model="gpt-3.5-turbo", messages=[]) for _ in range(4)))
+            await self.client.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(len(set(map(id, sessions))), 1)
+        self.assertTrue(sessions[0].closed)
+
+    def test_api_key_is_read_once(self):
+        """
+        Test that the API key is loaded on first use only.
+        """
+        client = LLMClient()
+        with mock.patch.object(llm_handler, "load_api_key", return_value="sk-once") as load:
+            with mock.patch.object(openai.ChatCompletion, "create", return_value=RESPONSE):
+                for _ in range(3):
+                    client.create(model="gpt-3.5-turbo", messages=[])
+        self.assertEqual(load.call_count, 1)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
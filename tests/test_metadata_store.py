@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.metadata_store import MetadataStore, write_metadata_store
+
+class TestMetadataStore(unittest.TestCase):
+    """
+    Unit tests for the memory-mapped columnar metadata store.
+    """
+
+    def setUp(self):
+        """
+        Create metadata rows with numeric, text and missing values, and write them to a store.
+        """
+        self.df = pd.DataFrame({
+            "drug_name": ["Prozac", "Lexapro", "Zoloft"],
+            "rating_overall": [5.0, 3.0, 4.0],
+            "text": ["works well", None, "héllo, wörld"],
+            "combined_text": ["Drug Name: Prozac", "Drug Name: Lexapro", "Drug Name: Zoloft"],
+            "review_id": [900, 12, 345],
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "reviews.store")
+        write_metadata_store(self.df, self.path)
+
+    def tearDown(self):
+        """
+        Remove the temporary store.
+        """
+        self.tmp.cleanup()
+
+    def test_rows_by_id(self):
+        """
+        Test that rows are fetched by review ID in the requested order.
+
+        Verifies:
+        - Unknown IDs (and FAISS's -1 padding) are skipped.
+        - Text, missing and numeric values round-trip.
+        - The frame is indexed by review ID.
+        """
+        store = MetadataStore.open(self.path)
+        rows = store.rows([345, -1, 900, 7])
+        self.assertEqual(rows.index.tolist(), [345, 900])
+        self.assertEqual(rows["drug_name"].tolist(), ["Zoloft", "Prozac"])
+        self.assertEqual(rows["text"].tolist(), ["héllo, wörld", "works well"])
+        self.assertEqual(rows["rating_overall"].tolist(), [4.0, 5.0])
+        self.assertTrue(pd.isna(store.rows([12])["text"].iloc[0]))
+        self.assertEqual(list(rows.columns), list(self.df.columns))
+
+    def test_matches_frame_backed_store(self):
+        """
+        Test that the memory-mapped store and a DataFrame-backed store return the same rows.
+        """
+        mapped = MetadataStore.open(self.path).rows([12, 345])
+        in_memory = MetadataStore.from_frame(self.df).rows([12, 345])
+        pd.testing.assert_frame_equal(mapped, in_memory)
+
+    def test_store_without_ids_uses_positions(self):
+        """
+        Test that a store without a review_id column is addressed by row position.
+        """
+        write_metadata_store(self.df.drop(columns=["review_id"]), self.path)
+        store = MetadataStore.open(self.path)
+        self.assertIsNone(store.ids)
+        self.assertEqual(store.rows([2, -1, 0])["drug_name"].tolist(), ["Zoloft", "Prozac"])
+        self.assertEqual(store.keys(np.array([1])).tolist(), [1])
+
+    def test_duplicate_ids_are_rejected(self):
+        """
+        Test that duplicate review IDs cannot be written.
+        """
+        with self.assertRaises(ValueError):
+            write_metadata_store(self.df.assign(review_id=[1, 2, 1]), self.path)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
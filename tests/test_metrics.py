@@ -0,0 +1,84 @@
+import unittest
+from unittest import mock
+from src import metrics
+from src.metrics import Counter, Histogram, MetricsRegistry, span, start_request_timings, stop_request_timings, format_timings
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit tests for the stage spans and the Prometheus exposition.
+    """
+
+    def test_histogram_buckets_are_cumulative(self):
+        """
+        Test that a histogram renders cumulative buckets, a sum and a count per label set.
+
+        Verifies:
+        - Each observation is counted in every bucket at or above its value.
+        - The +Inf bucket and the count equal the number of observations.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "encode")
+        registry = MetricsRegistry()
+        registry.register(histogram)
+        text = registry.render()
+
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{stage="encode",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{stage="encode",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{stage="encode",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{stage="encode"} 5.55', text)
+        self.assertIn('latency_seconds_count{stage="encode"} 3', text)
+
+    def test_counter_escapes_label_values(self):
+        """
+        Test that counters sum increments and escape quotes in label values.
+        """
+        counter = Counter("errors_total", "Errors.", ("error",))
+        counter.inc('bad "value"')
+        counter.inc('bad "value"', amount=2)
+        self.assertEqual(counter.samples(), ['errors_total{error="bad \\"value\\""} 3'])
+
+    def test_span_records_duration_errors_and_request_timings(self):
+        """
+        Test that a span feeds the stage histogram, the error counter and the request timings.
+
+        Verifies:
+        - The duration is added to the current request's timings.
+        - An exception is counted for the stage and re-raised unchanged.
+        - Spans outside a request only update the histogram.
+        """
+        before = metrics.stage_seconds.count("test-stage")
+        timings, token = start_request_timings()
+        try:
+            with span("test-stage"):
+                pass
+            with self.assertRaises(KeyError):
+                with span("test-stage"):
+                    raise KeyError("missing")
+        finally:
+            stop_request_timings(token)
+        with span("test-stage"):
+            pass
+
+        self.assertEqual(list(timings), ["test-stage"])
+        self.assertEqual(metrics.stage_seconds.count("test-stage"), before + 3)
+        self.assertEqual(metrics.stage_errors.value("test-stage", "KeyError"), 1)
+        self.assertRegex(format_timings(timings), r"^test-stage;dur=\d+\.\d\d$")
+
+    def test_disabled_metrics_record_nothing(self):
+        """
+        Test that spans and counters are no-ops when metrics are disabled.
+        """
+        with mock.patch.object(metrics, "METRICS_ENABLED", False):
+            with span("disabled-stage"):
+                pass
+            metrics.record_cache("disabled-cache", True)
+        self.assertEqual(metrics.stage_seconds.count("disabled-stage"), 0)
+        self.assertEqual(metrics.cache_requests.value("disabled-cache", "hit"), 0)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
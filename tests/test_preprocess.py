@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.preprocess import preprocess_data, preprocess_streaming, verify_streaming
+
+class TestStreamingPreprocess(unittest.TestCase):
+    """
+    Unit tests for the chunked, parallel preprocessing path.
+    """
+
+    def setUp(self):
+        """
+        Write a raw dataset whose chunks would be parsed with different dtypes on their own.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw_path = os.path.join(self.tmp.name, "raw.csv")
+        rows = 200
+        df = pd.DataFrame({
+            "drug_name": ["Prozac", "Zoloft"] * (rows // 2),
+            "condition": ["Depression", "Pain", "Major Depressive Disorder", "Anxiety"] * (rows // 4),
+            "rating_overall": np.arange(rows) % 5 + 1,
+            # Integers everywhere except one missing value in the last chunk
+            "rating_effectiveness": [str(i % 5 + 1) for i in range(rows - 1)] + [""],
+            "text": [f'Helped me, "a lot" ({i})!\nSecond line' for i in range(rows)],
+        })
+        df.loc[10, "text"] = np.nan
+        df.to_csv(self.raw_path, index=False)
+
+    def tearDown(self):
+        """
+        Remove the temporary files.
+        """
+        self.tmp.cleanup()
+
+    def test_streaming_output_is_byte_identical(self):
+        """
+        Test that the chunked output matches the in-memory output byte for byte.
+
+        Verifies:
+        - Chunks are written in input order with a single header.
+        - Column dtypes are consistent across chunks.
+        """
+        self.assertTrue(verify_streaming(self.raw_path, chunk_size=30, workers=2))
+
+    def test_streaming_summary(self):
+        """
+        Test that the summary counts the rows read and kept.
+        """
+        output_path = os.path.join(self.tmp.name, "cleaned.csv")
+        summary = preprocess_streaming(self.raw_path, output_path, chunk_size=30, workers=2, report_every=0)
+        self.assertEqual(summary["rows_read"], 200)
+        self.assertEqual(summary["rows_written"], len(preprocess_data(self.raw_path)))
+        self.assertEqual(summary["chunks"], 7)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
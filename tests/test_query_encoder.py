@@ -0,0 +1,104 @@
+import hashlib
+import unittest
+import faiss
+import numpy as np
+import pandas as pd
+from src.metadata_store import MetadataStore
+from src.query_encoder import TransformerQueryEncoder, load_query_encoder, encoder_parity, check_encoder_parity
+
+class WordTokenizer:
+    """
+    Tokenizer stand-in: one token per word, padded to the longest text of the batch.
+    """
+
+    def __call__(self, texts, padding=True, truncation=True, max_length=256, return_tensors="np"):
+        lengths = [min(len(text.split()), max_length) for text in texts]
+        width = max(lengths)
+        mask = np.array([[1] * length + [0] * (width - length) for length in lengths], dtype="int64")
+        return {"input_ids": mask.copy(), "attention_mask": mask}
+
+class PositionEncoder(TransformerQueryEncoder):
+    """
+    Encoder whose token embeddings are [1, position]; padding tokens get huge values.
+    """
+
+    def _forward(self, inputs):
+        mask = inputs["attention_mask"]
+        positions = np.broadcast_to(np.arange(mask.shape[1], dtype="float32"), mask.shape)
+        tokens = np.stack([np.ones_like(positions), positions], axis=-1)
+        return np.where(mask[..., None] == 1, tokens, 1e6)
+
+class HashEncoder:
+    """
+    Deterministic encoder mapping each word to a hashed dimension, with optional noise.
+    """
+
+    def __init__(self, noise: float = 0.0):
+        self.noise = noise
+
+    def encode(self, texts):
+        embeddings = np.zeros((len(texts), 32), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 32] += 1.0
+        rng = np.random.default_rng(0)
+        return embeddings + self.noise * rng.standard_normal(embeddings.shape).astype("float32")
+
+class TestQueryEncoder(unittest.TestCase):
+    """
+    Unit tests for the query encoder backends and their parity check.
+    """
+
+    def test_mean_pooling_ignores_padding(self):
+        """
+        Test that embeddings are the normalized mean of the unpadded token embeddings.
+
+        Verifies:
+        - Padding tokens do not contribute, so a text encodes the same alone and in a batch.
+        - A single string gives a 1-D embedding, as with SentenceTransformer.
+        """
+        encoder = PositionEncoder(WordTokenizer())
+        embeddings = encoder.encode(["one two three", "one"])
+        expected = np.array([1.0, 1.0]) / np.sqrt(2.0)  # Mean of [1, 0], [1, 1], [1, 2]
+        np.testing.assert_allclose(embeddings[0], expected, rtol=1e-6)
+        np.testing.assert_allclose(embeddings[1], [1.0, 0.0], rtol=1e-6)
+        np.testing.assert_allclose(encoder.encode("one two three"), embeddings[0], rtol=1e-6)
+        self.assertEqual(encoder.get_sentence_embedding_dimension(), 2)
+
+    def test_parity_with_the_index(self):
+        """
+        Test the parity report against the embeddings stored in an ID-mapped index.
+
+        Verifies:
+        - The encoder that built the index agrees perfectly.
+        - A noisy encoder is rejected by `check_encoder_parity`.
+        """
+        texts = [f"Drug Name: drug{i % 7} | Review: review number {i} felt side{i % 5}" for i in range(40)]
+        df = pd.DataFrame({"combined_text": texts, "review_id": np.arange(40, dtype="int64") * 11 + 3})
+        metadata = MetadataStore.from_frame(df)
+        index = faiss.IndexIDMap2(faiss.IndexFlatL2(32))
+        index.add_with_ids(HashEncoder().encode(texts), df["review_id"].to_numpy())
+
+        report = encoder_parity(HashEncoder(), index, metadata, sample_size=20, k=3)
+        self.assertEqual(report["reviews"], 20)
+        self.assertAlmostEqual(report["cosine_mean"], 1.0, places=5)
+        self.assertEqual(report["neighbour_overlap"], 1.0)
+
+        noisy = HashEncoder(noise=1.0)
+        self.assertLess(encoder_parity(noisy, index, metadata, sample_size=20)["cosine_mean"], 0.9)
+        with self.assertRaises(ValueError):
+            check_encoder_parity(noisy, index, metadata, sample_size=20, min_cosine=0.98)
+        self.assertIsNone(check_encoder_parity(noisy, index, metadata, sample_size=0))
+
+    def test_unknown_backend(self):
+        """
+        Test that an unknown backend is rejected before any library is loaded.
+        """
+        with self.assertRaises(ValueError):
+            load_query_encoder("all-MiniLM-L6-v2", "tensorrt")
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
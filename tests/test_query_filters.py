@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.query_filters import build_filter_index, parse_query_filters, parse_age_bucket, FilterIndex
+
+class TestQueryFilters(unittest.TestCase):
+    """
+    Unit tests for the structured query parser and the inverted indexes.
+    """
+
+    def setUp(self):
+        """
+        Build a filter index over a few reviews with WebMD-style values.
+        """
+        self.df = pd.DataFrame({
+            "drug_name": ["Prozac", "Wellbutrin XL", "Wellbutrin", "Prozac", "Zoloft"],
+            "gender": ["Female", "Male", "Female", "Male", "Female"],
+            "age": ["25-34", "35-44", "45-54", "35-44", "75 or over"],
+            "review_id": [50, 40, 30, 20, 10],
+        })
+        self.index = build_filter_index(self.df)
+
+    def test_parse_demographics_and_drug(self):
+        """
+        Test that gender, age range and drug constraints are extracted.
+
+        Verifies:
+        - An age range is mapped to every overlapping bucket.
+        - Drug names are matched case-insensitively, longest name first.
+        """
+        filters = parse_query_filters("Is Prozac good for women aged 30 to 40?", self.index)
+        self.assertEqual(filters, {"gender": ["female"], "age": ["25-34", "35-44"], "drug_name": ["prozac"]})
+        self.assertEqual(parse_query_filters("wellbutrin xl side effects", self.index), {"drug_name": ["wellbutrin xl"]})
+        self.assertEqual(parse_query_filters("best drug for people over 70", self.index), {"age": ["75 or over"]})
+
+    def test_unconstrained_queries(self):
+        """
+        Test that queries without constraints, or naming both genders, are not filtered.
+        """
+        self.assertEqual(parse_query_filters("What helps with depression?", self.index), {})
+        self.assertEqual(parse_query_filters("Does it work for men and women?", self.index), {})
+        self.assertEqual(parse_query_filters("Is Lexapro safe?", self.index), {})
+
+    def test_ids_combine_constraints(self):
+        """
+        Test that values of one column are OR-ed and columns AND-ed.
+        """
+        self.assertEqual(self.index.ids({"gender": ["female"]}).tolist(), [10, 30, 50])
+        self.assertEqual(self.index.ids({"age": ["35-44", "45-54"], "gender": ["male"]}).tolist(), [20, 40])
+        self.assertEqual(len(self.index.ids({"drug_name": ["zoloft"], "gender": ["male"]})), 0)
+
+    def test_save_and_load(self):
+        """
+        Test that a saved index is loaded with the same lists.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "filters.npz")
+            self.index.save(path)
+            loaded = FilterIndex.load(path)
+        self.assertEqual(sorted(loaded.lists), sorted(self.index.lists))
+        self.assertEqual(loaded.ids({"drug_name": ["prozac"]}).tolist(), [20, 50])
+
+    def test_parse_age_bucket(self):
+        """
+        Test the parsing of the dataset's age buckets.
+        """
+        self.assertEqual(parse_age_bucket("19-24"), (19, 24))
+        self.assertEqual(parse_age_bucket("75 or over"), (75, 200))
+        self.assertIsNone(parse_age_bucket("unknown"))
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -1,5 +1,12 @@
+import asyncio
+import threading
 import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src import query_retrieval as pipeline
 from src.query_retrieval import query_retrieval
+from src.semantic_cache import SemanticCache
 import os
 
 class TestQueryRetrieval(unittest.TestCase):
@@ -45,6 +52,112 @@ class TestQueryRetrieval(unittest.TestCase):
             "Response does not contain expected drug names."
         )
 
+class StubEngine:
+    """
+    Retrieval engine stand-in: constant embeddings, two fixed reviews and a semantic cache.
+    """
+
+    index_path = "models/faiss_index"
+    version = 0
+
+    def __init__(self):
+        self.semantic_cache = SemanticCache(dimension=4, threshold=0.99, max_entries=8)
+        self.searches = 0
+
+    def rank_query(self, user_query):
+        return None
+
+    def encode(self, texts):
+        return np.ones((len(texts), 4), dtype="float32")
+
+    def retrieve(self, user_query, k=5, query_embedding=None):
+        self.searches += 1
+        return pd.DataFrame({"combined_text": ["Drug Name: Zoloft", "Drug Name: Prozac"]}, index=[3, 5])
+
+    async def encode_async(self, user_query, executor=None):
+        return self.encode([user_query])
+
+    async def retrieve_async(self, user_query, k, query_embedding, executor=None):
+        return self.retrieve(user_query, k, query_embedding)
+
+class TestPipelineStreaming(unittest.TestCase):
+    """
+    Unit tests for the streaming pipelines, with the LLM and the prompt builder mocked.
+    """
+
+    def setUp(self):
+        """
+        Mock the prompt builder and the streamed LLM call; record the cache size seen at each chunk.
+        """
+        self.engine = StubEngine()
+        self.seen = []
+
+        def stream(prompt, **kwargs):
+            for delta in ["Zoloft", " helps", " most."]:
+                self.seen.append(len(self.engine.semantic_cache))
+                yield delta
+
+        async def stream_async(prompt, **kwargs):
+            for delta in stream(prompt, **kwargs):
+                yield delta
+
+        patchers = [
+            mock.patch.object(pipeline, "assemble_prompt", return_value="prompt"),
+            mock.patch.object(pipeline, "call_llm_stream", side_effect=stream),
+            mock.patch.object(pipeline, "call_llm_stream_async", side_effect=stream_async),
+            mock.patch.object(pipeline, "SEMANTIC_CACHE_VERIFY_IDS", True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stream_order_and_cache_write(self):
+        """
+        Test that chunks are yielded in order and the answer is cached once the stream ends.
+
+        Verifies:
+        - The deltas arrive in the order generated by the LLM.
+        - The semantic cache is still empty while the stream runs, and holds the full answer after.
+        - The next identical query is answered from the cache in one piece.
+        """
+        deltas = list(pipeline.query_retrieval_stream("best drug?", None, None, engine=self.engine))
+        self.assertEqual(deltas, ["Zoloft", " helps", " most."])
+        self.assertEqual(self.seen, [0, 0, 0])
+        self.assertEqual(len(self.engine.semantic_cache), 1)
+
+        deltas = list(pipeline.query_retrieval_stream("best drug?", None, None, engine=self.engine))
+        self.assertEqual(deltas, ["Zoloft helps most."])
+        self.assertEqual(len(self.seen), 3)
+
+    def test_async_stream_matches(self):
+        """
+        Test that the async stream yields the same pieces and caches the answer after the last one.
+
+        Verifies:
+        - The prompt is assembled in the executor, not on the event loop thread.
+        - The deltas and the cache write match the sync stream.
+        """
+        threads = []
+        pipeline.assemble_prompt.side_effect = lambda *args: threads.append(threading.current_thread()) or "prompt"
+
+        async def collect():
+            return [delta async for delta in pipeline.query_retrieval_stream_async("best drug?", self.engine)]
+
+        self.assertEqual(asyncio.run(collect()), ["Zoloft", " helps", " most."])
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(self.seen, [0, 0, 0])
+        self.assertEqual(len(self.engine.semantic_cache), 1)
+
+    def test_interrupted_stream_is_not_cached(self):
+        """
+        Test that a stream closed before its end leaves no partial answer in the cache.
+        """
+        deltas = pipeline.query_retrieval_stream("best drug?", None, None, engine=self.engine)
+        self.assertEqual(next(deltas), "Zoloft")
+        deltas.close()
+        self.assertEqual(len(self.engine.semantic_cache), 0)
+
 if __name__ == "__main__":
     """
     Main entry point for running the tests.
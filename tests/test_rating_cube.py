@@ -0,0 +1,138 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.rating_cube import RatingCube, build_rating_cube, parse_ranking_query, format_ranking, format_ranking_context
+
+class TestRatingCube(unittest.TestCase):
+    """
+    Unit tests for the precomputed rating aggregates and the ranking query parser.
+    """
+
+    def setUp(self):
+        """
+        Build a cube over a few reviews with WebMD-style values.
+        """
+        self.df = pd.DataFrame({
+            "drug_name": ["Prozac", "Prozac", "Prozac", "Zoloft", "Zoloft", "Lexapro", "zoloft", "Prozac"],
+            "gender": ["Female", "Female", "Male", "Female", "Female", "Female", "Male", None],
+            "age": ["25-34", "35-44", "25-34", "25-34", "35-44", "25-34", "45-54", "25-34"],
+            "condition": ["Depression", "Anxiety", "Depression", "Depression", "Depression", "Anxiety", "Anxiety", "Depression"],
+            "time_on_drug": ["1 to 6 months", "1 to 6 months", "less than 1 month", "2 to 5 years",
+                             "2 to 5 years", "less than 1 month", "1 to 6 months", "1 to 6 months"],
+            "rating_overall": [4, 5, 2, 3, 3, 5, 1, 4],
+        })
+        self.cube = build_rating_cube(self.df)
+
+    def test_rank_matches_pandas(self):
+        """
+        Test that ranking a slice gives the same counts and means as a pandas group-by.
+
+        Verifies:
+        - Values are matched case-insensitively and displayed with their most frequent spelling.
+        - Rows are ordered by rating and carry their time-on-drug distribution.
+        """
+        ranking = self.cube.rank({"gender": ["female"]}, min_reviews=0)
+        female = self.df[self.df["gender"] == "Female"].groupby("drug_name")["rating_overall"].agg(["count", "mean"])
+        self.assertEqual(ranking["reviews"], 5)
+        self.assertEqual([row["value"] for row in ranking["rows"]], ["Lexapro", "Prozac", "Zoloft"])
+        for row in ranking["rows"]:
+            self.assertEqual(row["reviews"], female.loc[row["value"], "count"])
+            self.assertAlmostEqual(row["mean_rating"], female.loc[row["value"], "mean"])
+        self.assertEqual(ranking["rows"][2]["time_on_drug"], {"2 to 5 years": 1.0})
+        self.assertEqual(self.cube.time_labels, ["less than 1 month", "1 to 6 months", "2 to 5 years"])
+
+    def test_rank_smoothing_order_and_relaxation(self):
+        """
+        Test the ranking rules.
+
+        Verifies:
+        - Values with fewer than `min_reviews` reviews are left out while others have enough.
+        - "lowest" and "count" orders.
+        - An unmatched age constraint is dropped, as in the filtered search.
+        """
+        self.assertEqual([row["value"] for row in self.cube.rank({}, min_reviews=3)["rows"]], ["Prozac", "Zoloft"])
+        self.assertEqual(self.cube.rank({}, order="lowest", min_reviews=0)["rows"][0]["value"], "Zoloft")
+        self.assertEqual(self.cube.rank({}, order="count", min_reviews=0)["rows"][0]["value"], "Prozac")
+        relaxed = self.cube.rank({"gender": ["male"], "age": ["65-74"]}, min_reviews=0)
+        self.assertEqual(relaxed["filters"], {"gender": ["male"]})
+        self.assertEqual(relaxed["reviews"], 2)
+
+    def test_parse_ranking_query(self):
+        """
+        Test which questions are answered from the cube.
+
+        Verifies:
+        - Demographics and specific conditions become constraints; "depression" does not.
+        - Two named drugs are ranked against each other; a single named drug is left to retrieval.
+        - Questions the ratings cannot answer, or not about drugs, are not ranking questions.
+        """
+        self.assertEqual(
+            parse_ranking_query("Which drug works best for depression in women aged 30 to 40?", self.cube),
+            {"filters": {"gender": ["female"], "age": ["25-34", "35-44"]}, "order": "rating"},
+        )
+        self.assertEqual(
+            parse_ranking_query("Is Zoloft or Prozac better for anxiety?", self.cube),
+            {"filters": {"drug_name": ["prozac", "zoloft"], "condition": ["anxiety"]}, "order": "rating"},
+        )
+        self.assertEqual(parse_ranking_query("most popular antidepressants", self.cube)["order"], "count")
+        self.assertIsNone(parse_ranking_query("Is Zoloft the best drug?", self.cube))
+        self.assertIsNone(parse_ranking_query("Which drug has the worst side effects?", self.cube))
+        self.assertIsNone(parse_ranking_query("What is the best way to sleep?", self.cube))
+        self.assertEqual(parse_ranking_query("top 3 antidepressants for anxiety", self.cube)["filters"], {"condition": ["anxiety"]})
+
+    def test_non_ranking_questions(self):
+        """
+        Test that questions using ranking words about something other than the drugs are left to retrieval.
+        """
+        for query in [
+            "What is the best time of day to take my medication?",
+            "best way to taper off antidepressants",
+            "Is it better to take my pills in the morning?",
+            "Which is the best approach to stop my medication safely?",
+            "Which drug should I take?",
+        ]:
+            with self.subTest(query=query):
+                self.assertIsNone(parse_ranking_query(query, self.cube))
+
+    def test_save_load_and_format(self):
+        """
+        Test that a saved cube ranks like the original and that both formats list every drug.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reviews.cube.npz")
+            self.cube.save(path)
+            loaded = RatingCube.load(path)
+        ranking = loaded.rank({"condition": ["depression"]}, min_reviews=0)
+        self.assertEqual(ranking, self.cube.rank({"condition": ["depression"]}, min_reviews=0))
+        answer = format_ranking(ranking)
+        self.assertTrue(answer.startswith("Highest-rated drugs among reviewers with depression (5 reviews):"))
+        self.assertIn("1. Prozac: adjusted rating 3.3 (average rating 3.3 from 3 reviews) (mostly taken 1 to 6 months)", answer)
+        context = format_ranking_context(ranking).splitlines()
+        self.assertEqual(context[1:], [
+            "drug | reviews | mean rating | adjusted rating | most common time on drug",
+            "Prozac | 3 | 3.33 | 3.33 | 1 to 6 months",
+            "Zoloft | 2 | 3.00 | 3.00 | 2 to 5 years",
+        ])
+
+    def test_format_shows_the_ordering_score(self):
+        """
+        Test that a ranking ordered by the shrunk score displays that score.
+
+        Verifies:
+        - The adjusted ratings of the listed drugs are in decreasing order, even where the raw averages are not.
+        - A ranking by review count lists the counts first.
+        """
+        ranking = self.cube.rank({}, min_reviews=3)
+        scores = [row["score"] for row in ranking["rows"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        lines = format_ranking(ranking).splitlines()
+        for row, line in zip(ranking["rows"], lines[1:]):
+            self.assertIn(f"adjusted rating {row['score']:.1f}", line)
+        self.assertIn("1. Prozac: 4 reviews, average rating 3.8", format_ranking(self.cube.rank({}, order="count", min_reviews=0)))
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from unittest import mock
+import numpy as np
+from src.relevance_gate import RelevanceGate, RELATED_EXAMPLES, UNRELATED_EXAMPLES
+
+# Embeddings of the test queries: along the related axis, the unrelated axis, or halfway
+QUERY_VECTORS = {
+    "Which antidepressant helps with sleep?": [1.0, 0.0],
+    "Best hiking trails in Oregon": [0.0, 1.0],
+    "Is it normal to feel tired?": [1.0, 1.0],
+}
+
+class StubEngine:
+    """
+    Engine whose encoder puts related examples on one axis and unrelated examples on the other.
+    """
+
+    def __init__(self):
+        self.encoded = []
+        index = mock.Mock(ntotal=0, d=2)
+        self.snapshot = mock.Mock(index=index)
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        vectors = []
+        for text in texts:
+            if text in RELATED_EXAMPLES:
+                vectors.append([1.0, 0.0])
+            elif text in UNRELATED_EXAMPLES:
+                vectors.append([0.0, 1.0])
+            else:
+                vectors.append(QUERY_VECTORS[text])
+        return np.array(vectors, dtype="float32")
+
+class TestRelevanceGate(unittest.TestCase):
+    """
+    Unit tests for the decision bands of the local relevance gate.
+    """
+
+    def setUp(self):
+        """
+        Build a gate over the stub engine, with an LLM fallback that always answers "related".
+        """
+        self.engine = StubEngine()
+        self.fallback = mock.Mock(return_value=True)
+        self.async_fallback = mock.AsyncMock(return_value=True)
+        self.gate = RelevanceGate(
+            self.engine,
+            accept_threshold=0.2,
+            reject_threshold=-0.2,
+            corpus_sample=0,
+            llm_fallback=self.fallback,
+            async_llm_fallback=self.async_fallback,
+        )
+
+    def test_decision_bands(self):
+        """
+        Test that scores above, below and between the thresholds are accepted, rejected and sent to the LLM.
+
+        Verifies:
+        - A query close to the related examples is accepted without the LLM.
+        - A query close to the unrelated examples is rejected without the LLM.
+        - An ambiguous query is decided by the LLM fallback.
+        - Each outcome is counted.
+        """
+        self.assertTrue(self.gate.is_related("Which antidepressant helps with sleep?"))
+        self.assertFalse(self.gate.is_related("Best hiking trails in Oregon"))
+        self.fallback.assert_not_called()
+
+        self.assertIsNone(self.gate.classify("Is it normal to feel tired?"))
+        self.assertTrue(self.gate.is_related("Is it normal to feel tired?"))
+        self.fallback.assert_called_once_with("Is it normal to feel tired?")
+        self.assertEqual(self.gate.stats, {"accepted": 1, "rejected": 1, "fallback": 1})
+
+    def test_async_fallback(self):
+        """
+        Test that the async gate awaits the async LLM fallback for ambiguous queries only.
+        """
+        async def run():
+            related = await self.gate.is_related_async("Which antidepressant helps with sleep?")
+            ambiguous = await self.gate.is_related_async("Is it normal to feel tired?")
+            return related, ambiguous
+
+        self.assertEqual(asyncio.run(run()), (True, True))
+        self.async_fallback.assert_awaited_once_with("Is it normal to feel tired?")
+        self.fallback.assert_not_called()
+
+    def test_empty_query_is_rejected(self):
+        """
+        Test that an empty or blank query is rejected without encoding it or calling the LLM.
+        """
+        encoded = len(self.engine.encoded)
+        self.assertFalse(self.gate.is_related(""))
+        self.assertFalse(self.gate.is_related("   "))
+        self.assertEqual(len(self.engine.encoded), encoded)
+        self.fallback.assert_not_called()
+        self.assertEqual(self.gate.stats["rejected"], 2)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
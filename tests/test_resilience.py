@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+import unittest
+from src.resilience import TokenBucket, CircuitBreaker, ConcurrencyLimiter, backoff_delay
+
+class TestResilience(unittest.TestCase):
+    """
+    Unit tests for the backoff, rate limiting and circuit breaking helpers of the LLM client.
+    """
+
+    def test_backoff_is_jittered_and_capped(self):
+        """
+        Test that backoff delays stay within the exponential bound and honour Retry-After.
+
+        Verifies:
+        - Delays lie between 0 and base * 2**attempt, capped at max_delay.
+        - A Retry-After value replaces the random delay, still capped at max_delay.
+        """
+        for attempt in range(6):
+            delay = backoff_delay(attempt, base=0.5, max_delay=4.0)
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(4.0, 0.5 * 2 ** attempt))
+        self.assertEqual(backoff_delay(0, 0.5, 4.0, retry_after=2.0), 2.0)
+        self.assertEqual(backoff_delay(0, 0.5, 4.0, retry_after=60.0), 4.0)
+
+    def test_token_bucket_spaces_out_requests(self):
+        """
+        Test that the bucket allows a burst, then makes callers wait in turn.
+
+        Verifies:
+        - The first `capacity` reservations need no wait.
+        - Each further reservation waits one more token interval than the previous one.
+        - A rate of 0 never waits.
+        """
+        bucket = TokenBucket(rate=10.0, capacity=2)
+        self.assertEqual([bucket.reserve() for _ in range(2)], [0.0, 0.0])
+        waits = [bucket.reserve() for _ in range(3)]
+        for wait, expected in zip(waits, (0.1, 0.2, 0.3)):
+            self.assertAlmostEqual(wait, expected, delta=0.02)
+        unlimited = TokenBucket(rate=0.0)
+        self.assertEqual(sum(unlimited.reserve() for _ in range(100)), 0.0)
+
+    def test_circuit_breaker_opens_and_recovers(self):
+        """
+        Test the closed -> open -> half-open -> closed cycle.
+
+        Verifies:
+        - The circuit opens after `failure_threshold` consecutive failures and refuses calls.
+        - After `reset_timeout`, a single trial call is allowed.
+        - A failed trial re-opens the circuit; a successful one closes it.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertGreater(breaker.retry_after(), 0.0)
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_concurrency_limiter_hands_slots_over_in_order(self):
+        """
+        Test that released slots go to the longest-waiting caller, thread or coroutine.
+
+        Verifies:
+        - A coroutine queued before a thread gets the first released slot.
+        - A coroutine cancelled while waiting leaves the queue without taking a slot.
+        - The slot count is back to 0 once everything is released.
+        """
+        limiter = ConcurrencyLimiter(1)
+        order = []
+
+        def thread_call():
+            limiter.acquire()
+            order.append("thread")
+            limiter.release()
+
+        async def run():
+            limiter.acquire()
+            first = asyncio.ensure_future(limiter.acquire_async())
+            cancelled = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+            thread = threading.Thread(target=thread_call)
+            thread.start()
+            while len(limiter._waiters) < 3:
+                await asyncio.sleep(0.001)
+
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            limiter.release()
+            await first
+            order.append("coroutine")
+            limiter.release()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+        asyncio.run(run())
+        self.assertEqual(order, ["coroutine", "thread"])
+        self.assertEqual(limiter.active, 0)
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
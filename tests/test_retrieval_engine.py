@@ -0,0 +1,231 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import faiss
+import numpy as np
+import pandas as pd
+from src import retrieval_engine
+from src.vector_store import _write_store
+
+DIMENSION = 4
+
+class StubEncoder:
+    """
+    Query encoder returning a constant embedding, so that no model is loaded.
+    """
+
+    def encode(self, texts):
+        return np.ones((len(texts), DIMENSION), dtype="float32")
+
+def write_store(index_path: str, metadata_path: str, num_rows: int, drug_names: tuple = ("Prozac", "Zoloft"),
+                vector_value: float = None) -> None:
+    """
+    Write a flat store of `num_rows` reviews with the same writer as `vector_store.py`.
+
+    The reviews cycle through `drug_names`; their vectors are random, or all equal to `vector_value`.
+    """
+    df = pd.DataFrame({
+        "review_id": np.arange(1, num_rows + 1, dtype="int64"),
+        "drug_name": [drug_names[i % len(drug_names)] for i in range(num_rows)],
+        "condition": ["Depression"] * num_rows,
+        "gender": ["Female"] * num_rows,
+        "age": ["35-44"] * num_rows,
+        "time_on_drug": ["1 to 6 months"] * num_rows,
+        "rating_overall": [4] * num_rows,
+        "combined_text": [f"review {i}" for i in range(num_rows)],
+    })
+    if vector_value is None:
+        vectors = np.random.rand(num_rows, DIMENSION).astype("float32")
+    else:
+        vectors = np.full((num_rows, DIMENSION), vector_value, dtype="float32")
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(DIMENSION))
+    index.add_with_ids(vectors, df["review_id"].to_numpy())
+    _write_store(index, df, index_path, metadata_path, {"index_type": "flat"})
+
+class TestRetrievalEngine(unittest.TestCase):
+    """
+    Unit tests for the resident retrieval engine over a small store.
+    """
+
+    def setUp(self):
+        """
+        Write a store of 3 reviews in a temporary directory and stub out the query encoder.
+        """
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp.name, "faiss_index")
+        self.metadata_path = os.path.join(self.tmp.name, "reviews.csv")
+        write_store(self.index_path, self.metadata_path, 3)
+        patcher = mock.patch.object(retrieval_engine, "load_query_encoder", return_value=StubEncoder())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def engine(self, **kwargs) -> retrieval_engine.RetrievalEngine:
+        engine = retrieval_engine.RetrievalEngine(self.index_path, self.metadata_path, check_parity=False, **kwargs)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_snapshot_does_not_read_the_store(self):
+        """
+        Test that requests keep the loaded snapshot until a reload swaps in the new one.
+
+        Verifies:
+        - Reading `snapshot` after a rebuild returns the previous store.
+        - `reload_if_changed` loads the rebuilt store once, then reports no change.
+        """
+        engine = self.engine(auto_reload=False)
+        before = engine.snapshot
+        write_store(self.index_path, self.metadata_path, 5)
+        self.assertIs(engine.snapshot, before)
+
+        self.assertTrue(engine.reload_if_changed())
+        self.assertEqual(engine.snapshot.index.ntotal, 5)
+        self.assertEqual(engine.version, 1)
+        self.assertFalse(engine.reload_if_changed())
+
+    def test_reload_during_a_rebuild_keeps_the_previous_store(self):
+        """
+        Test that a reload check in the middle of a rebuild never mixes two generations of the store.
+
+        The rebuild keeps the number of reviews, so that only the contents tell the generations
+        apart: the new store has Lexapro reviews only, and vectors filled with 5.
+
+        Verifies:
+        - After each file of the rebuild is replaced, the index, metadata, filter index and
+          rating cube of the snapshot all come from the same generation.
+        - The rebuilt store is loaded once its last file is replaced.
+        """
+        engine = self.engine(auto_reload=False)
+        replace = os.replace
+        generations = []
+
+        def replace_then_check(source, destination):
+            replace(source, destination)
+            engine.reload_if_changed()
+            snapshot = engine.snapshot
+            generations.append((
+                bool(snapshot.index.reconstruct(1)[0] == 5.0),
+                snapshot.metadata.rows([1])["drug_name"].iloc[0] == "Lexapro",
+                len(snapshot.filters.ids({"drug_name": ["lexapro"]})) > 0,
+                "Lexapro" in list(snapshot.cube.labels["drug_name"]),
+            ))
+
+        with mock.patch.object(os, "replace", side_effect=replace_then_check):
+            write_store(self.index_path, self.metadata_path, 3, drug_names=("Lexapro",), vector_value=5.0)
+        self.assertTrue(all(len(set(checked)) == 1 for checked in generations), generations)
+        self.assertEqual(generations[-1], (True, True, True, True))
+
+    def test_watcher_picks_up_a_rebuilt_store(self):
+        """
+        Test that the background watcher reloads a rebuilt store, and stops when the engine is closed.
+        """
+        engine = self.engine(reload_interval=0.02)
+        write_store(self.index_path, self.metadata_path, 5)
+        deadline = time.monotonic() + 5.0
+        while engine.version == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(engine.snapshot.index.ntotal, 5)
+
+        engine.close()
+        time.sleep(0.05)
+        write_store(self.index_path, self.metadata_path, 7)
+        time.sleep(0.1)
+        self.assertEqual(engine.snapshot.index.ntotal, 5)
+
+    def test_async_search_parses_filters_off_the_loop(self):
+        """
+        Test that the async search decides between a filtered and a batched search in the executor.
+
+        Verifies:
+        - A query naming a drug is searched over the reviews of that drug only.
+        - A query without constraints goes through the search batcher.
+        - The constraints are never parsed on the event loop thread.
+        """
+        engine = self.engine(auto_reload=False)
+        threads = []
+        parse = retrieval_engine.parse_query_filters
+
+        def recording_parse(*args):
+            threads.append(threading.current_thread())
+            return parse(*args)
+
+        async def run():
+            embedding = engine.encode(["query"])
+            filtered = await engine.retrieve_async("Zoloft side effects", 3, embedding)
+            unfiltered = await engine.retrieve_async("side effects", 3, embedding)
+            return filtered, unfiltered
+
+        with mock.patch.object(retrieval_engine, "parse_query_filters", side_effect=recording_parse):
+            filtered, unfiltered = asyncio.run(run())
+        self.assertEqual(list(filtered["drug_name"]), ["Zoloft"])
+        self.assertEqual(len(unfiltered), 3)
+        self.assertEqual(engine.batching_stats()["search"]["items"], 1)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_batched_search_is_timed_in_the_request(self):
+        """
+        Test that the search of a micro-batched query is timed by the request, not the batcher thread.
+        """
+        engine = self.engine(auto_reload=False)
+        spans = []
+        real_span = retrieval_engine.span
+
+        def recording_span(stage):
+            spans.append((stage, threading.current_thread().name))
+            return real_span(stage)
+
+        with mock.patch.object(retrieval_engine, "span", side_effect=recording_span):
+            asyncio.run(engine.retrieve_async("side effects", 3, engine.encode(["query"])))
+        self.assertIn(("faiss_search", threading.current_thread().name), spans)
+        self.assertNotIn("search-batcher", [name for _, name in spans])
+
+    def test_batch_searches_only_unconstrained_queries(self):
+        """
+        Test that queries with constraints are left out of the batched search.
+
+        Verifies:
+        - The batched search receives only the queries without a constraint.
+        - Each query gets its own rows, in the order of the input.
+        """
+        engine = self.engine(auto_reload=False)
+        queries = ["Zoloft side effects", "side effects", "does Prozac help?", "sleep problems"]
+        with mock.patch.object(engine, "search", wraps=engine.search) as search:
+            frames = engine.retrieve_batch(queries, 3, engine.encode(queries))
+        search.assert_called_once()
+        self.assertEqual(search.call_args[0][0].shape, (2, DIMENSION))
+        self.assertEqual(list(frames[0]["drug_name"]), ["Zoloft"])
+        self.assertEqual(set(frames[2]["drug_name"]), {"Prozac"})
+        self.assertEqual([len(frames[1]), len(frames[3])], [3, 3])
+
+    def test_review_vectors_without_reconstruction(self):
+        """
+        Test that reviews are not embedded again when the index cannot reconstruct their vectors.
+
+        Verifies:
+        - The stored vectors are returned when the index maps review IDs to vectors.
+        - Otherwise None is returned, without encoding the reviews.
+        - The warning is printed once only.
+        """
+        engine = self.engine(auto_reload=False)
+        rows = engine.snapshot.metadata.rows([1, 2, 3])
+        self.assertEqual(engine.review_vectors(rows).shape, (3, DIMENSION))
+
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(DIMENSION))
+        index.add_with_ids(np.random.rand(3, DIMENSION).astype("float32"), np.arange(1, 4, dtype="int64"))
+        snapshot = retrieval_engine.IndexSnapshot(index, engine.snapshot.metadata, engine.snapshot.signature)
+        with mock.patch.object(engine, "encode") as encode, mock.patch("builtins.print") as printed:
+            self.assertIsNone(engine.review_vectors(rows, snapshot))
+            self.assertIsNone(engine.review_vectors(rows, snapshot))
+        encode.assert_not_called()
+        printed.assert_called_once()
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+from src.semantic_cache import SemanticCache
+
+class TestSemanticCache(unittest.TestCase):
+    """
+    Unit tests for the embedding-keyed answer cache.
+    """
+
+    def setUp(self):
+        """
+        Create a cache over 8-dimensional embeddings and a few unit test vectors.
+        """
+        self.cache = SemanticCache(dimension=8, threshold=0.9, max_entries=2)
+        self.query = np.eye(8, dtype="float32")[0]
+        # A rephrasing: almost the same direction as the query
+        self.rephrased = self.query + 0.1 * np.eye(8, dtype="float32")[1]
+        self.other = np.eye(8, dtype="float32")[2]
+
+    def test_hit_on_similar_query(self):
+        """
+        Test that a near-duplicate query with the same retrieved reviews is a hit.
+
+        Verifies:
+        - A similar query returns the cached answer.
+        - An unrelated query is a miss.
+        """
+        self.cache.add(self.query, "Prozac", [1, 2, 3])
+        self.assertEqual(self.cache.lookup(self.rephrased, retrieved_ids=[1, 2, 3]), "Prozac")
+        self.assertIsNone(self.cache.lookup(self.other, retrieved_ids=[1, 2, 3]))
+
+    def test_miss_when_retrieved_ids_differ(self):
+        """
+        Test that a similar query retrieving different reviews is a miss.
+        """
+        self.cache.add(self.query, "Prozac", [1, 2, 3])
+        self.assertIsNone(self.cache.lookup(self.rephrased, retrieved_ids=[1, 2, 4]))
+
+    def test_miss_after_store_version_change(self):
+        """
+        Test that answers generated from an older vector store are not reused.
+        """
+        self.cache.add(self.query, "Prozac", [1, 2, 3], version=0)
+        self.assertIsNone(self.cache.lookup(self.query, version=1))
+
+    def test_eviction_and_clear(self):
+        """
+        Test that memory is bounded and that clearing drops every answer.
+
+        Verifies:
+        - The least recently used answer is evicted beyond `max_entries`.
+        - `clear` empties the cache.
+        """
+        self.cache.add(self.query, "Prozac", [1])
+        self.cache.add(self.other, "Lexapro", [2])
+        self.cache.add(np.eye(8, dtype="float32")[3], "Zoloft", [3])
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.lookup(self.query))
+        self.assertEqual(self.cache.lookup(self.other), "Lexapro")
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertIsNone(self.cache.lookup(self.other))
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from src import vector_store
+from src.vector_store import assign_review_ids, build_combined_text, content_hashes
+
+class TestVectorStoreIds(unittest.TestCase):
+    """
+    Unit tests for the stable review IDs and content hashes used by incremental updates.
+    """
+
+    def setUp(self):
+        """
+        Create a small set of cleaned reviews, including two identical ones.
+        """
+        self.df = pd.DataFrame({
+            "drug_name": ["Prozac", "Lexapro", "Prozac"],
+            "condition": ["Depression", "Depression", "Depression"],
+            "gender": ["Female", "Male", "Female"],
+            "age": ["35-44", "25-34", "35-44"],
+            "time_on_drug": ["1 to 6 months", "less than 1 month", "1 to 6 months"],
+            "rating_overall": [5, 3, 5],
+            "text": ["works well", "made me tired", "works well"],
+        })
+
+    def test_ids_are_unique_and_independent_of_row_order(self):
+        """
+        Test that review IDs are unique and do not depend on the position of a row.
+
+        Verifies:
+        - Identical reviews still get distinct IDs.
+        - Shuffling the rows keeps each review's ID.
+        """
+        ids = assign_review_ids(self.df)
+        self.assertTrue(ids.is_unique)
+
+        reordered = self.df.iloc[[1, 0, 2]].reset_index(drop=True)
+        self.assertEqual(sorted(assign_review_ids(reordered)), sorted(ids))
+        self.assertEqual(assign_review_ids(reordered)[0], ids[1])
+
+    def test_rating_change_keeps_id_but_changes_content_hash(self):
+        """
+        Test that editing a review's rating is detected as a change of the same review.
+        """
+        edited = self.df.copy()
+        edited.loc[1, "rating_overall"] = 4
+        self.assertEqual(assign_review_ids(edited)[1], assign_review_ids(self.df)[1])
+        self.assertNotEqual(
+            content_hashes(build_combined_text(edited))[1],
+            content_hashes(build_combined_text(self.df))[1],
+        )
+
+    def test_empty_dataset(self):
+        """
+        Test that building a store from a dataset without reviews fails with a clear error.
+
+        Verifies:
+        - A ValueError naming the dataset is raised, in both full and incremental mode.
+        - No embeddings are generated and no store is written.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            file_path = os.path.join(tmp, "cleaned_reviews.csv")
+            self.df.iloc[:0].to_csv(file_path, index=False)
+            index_path = os.path.join(tmp, "faiss_index")
+            with mock.patch.object(vector_store, "embed_sharded") as embed:
+                for incremental in (False, True):
+                    with self.assertRaisesRegex(ValueError, "no reviews to index"):
+                        vector_store.create_vector_store(file_path, index_path, os.path.join(tmp, "reviews.csv"), incremental=incremental)
+            embed.assert_not_called()
+            self.assertFalse(os.path.exists(index_path))
+
+if __name__ == "__main__":
+    """
+    Main entry point for running the tests.
+    """
+    unittest.main()